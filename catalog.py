@@ -0,0 +1,113 @@
+'''
+Indexed catalog of the files on the card.
+
+The browser keeps its FileRecord objects here instead of a bare list: lookups
+by Treeview item id / FPATH are O(1), every column has a precomputed typed sort
+key, and sorted orders are cached until the listing changes.
+'''
+
+# Typed sort key per browser column
+SORT_KEYS = {
+    "index": lambda record: record.index,
+    "filename": lambda record: record.filename,
+    "filesize": lambda record: record.filebytes,
+    "filetime": lambda record: record.timestamp,
+}
+
+
+class FileCatalog:
+    """
+    Files of the current listing, indexed by FPATH.
+
+    Treeview rows use the FPATH as item id, so the same index serves lookups
+    by item id and by path.
+    """
+
+    def __init__(self, records=()):
+        self._by_path = {}
+        self._orders = {}  # (column, reverse) -> sorted list
+        self._listing = []
+        self.update(list(records))
+
+    def __len__(self):
+        return len(self._listing)
+
+    def __iter__(self):
+        return iter(self._listing)
+
+    def __contains__(self, filepath):
+        return filepath in self._by_path
+
+    def get(self, filepath):
+        """
+        Looks up a record by FPATH (Treeview item id).
+
+        Args:
+            filepath (str): FPATH / item id.
+
+        Returns:
+            FileRecord: The record, or None if it is not in the listing.
+        """
+
+        return self._by_path.get(filepath)
+
+    def update(self, new_records):
+        """
+        Replaces the listing with a freshly fetched one.
+
+        Files already in the catalog keep their index, new files are numbered
+        after the current maximum, so a new clip does not renumber every row.
+
+        Args:
+            new_records (list): Records in device listing order.
+
+        Returns:
+            tuple: (removed, changed) sets of FPATHs. "changed" holds new files
+                and files whose SIZE or TIME differs from the previous listing.
+        """
+
+        old_by_path = self._by_path
+        next_index = max((r.index for r in self._listing), default=0) + 1
+        by_path = {}
+        changed = set()
+        for record in new_records:
+            old = old_by_path.get(record.filepath)
+            if old is None:
+                record.index = next_index
+                next_index += 1
+                changed.add(record.filepath)
+            else:
+                record.index = old.index
+                if (old.filebytes, old.filetime) != (record.filebytes, record.filetime):
+                    changed.add(record.filepath)
+            by_path[record.filepath] = record
+        removed = {path for path in old_by_path if path not in by_path}
+
+        self._by_path = by_path
+        self._listing = list(new_records)
+        self._orders.clear()
+        return removed, changed
+
+    def sorted(self, column, reverse=False):
+        """
+        Returns the records ordered by a browser column, cached per direction.
+
+        Args:
+            column (str): Column name from SORT_KEYS.
+            reverse (bool): Descending order.
+
+        Returns:
+            list: Records in display order (do not modify).
+        """
+
+        key = (column, reverse)
+        order = self._orders.get(key)
+        if order is None:
+            opposite = self._orders.get((column, not reverse))
+            if opposite is not None:
+                # Flipping the direction reuses the other order instead of re-sorting
+                order = opposite[::-1]
+            else:
+                order = sorted(self._listing, key=SORT_KEYS[column], reverse=reverse)
+            self._orders[key] = order
+        return order
@@ -0,0 +1,116 @@
+'''
+Batch deletion of files on the card.
+
+Deletes are pipelined: the paths go through a bounded queue to a few worker
+threads that send cmd=4003, and the outcome of the whole batch is returned at
+once, so the caller shows one summary and updates the listing one time.
+select_reclaim() picks the oldest clips that are not protected, to free a given
+amount of space.
+'''
+import queue
+import threading
+from urllib.parse import quote
+
+# FAT read-only bit, set by the firmware on locked (event) clips
+ATTR_READ_ONLY = 0x01
+# Folders that hold protected / event clips on Novatek firmwares
+PROTECTED_FOLDERS = ("\\RO\\", "\\EMR\\", "\\EVENT\\")
+
+
+def is_protected(record):
+    """
+    Checks whether a clip is locked or lives in an event folder.
+
+    Args:
+        record (FileRecord): Listing entry.
+
+    Returns:
+        bool: True if the clip must not be deleted automatically.
+    """
+
+    if record.attr & ATTR_READ_ONLY:
+        return True
+    path = record.filepath.upper()
+    return any(folder in path for folder in PROTECTED_FOLDERS)
+
+
+def select_reclaim(records, target_bytes):
+    """
+    Picks the oldest unprotected files whose sizes add up to at least target_bytes.
+
+    Args:
+        records (iterable): FileRecord of the current listing.
+        target_bytes (int): Space to free.
+
+    Returns:
+        list: Records to delete, oldest first. May free less than requested if
+            the card does not hold enough unprotected files.
+    """
+
+    selected = []
+    freed = 0
+    for record in sorted(records, key=lambda r: r.timestamp):
+        if freed >= target_bytes:
+            break
+        if is_protected(record):
+            continue
+        selected.append(record)
+        freed += record.filebytes
+    return selected
+
+
+def delete_files(client, filepaths, workers=2, queue_size=8, progress=None, cancel_event=None):
+    """
+    Deletes files with cmd=4003 through a bounded worker pipeline. Blocking.
+
+    Args:
+        client (DeviceClient): Client used for the requests.
+        filepaths (list): FPATHs to delete.
+        workers (int): Deletes in flight at once; the firmware handles few.
+        queue_size (int): Paths queued ahead of the workers.
+        progress (callable): progress(done, total), called from worker threads.
+        cancel_event (threading.Event): Stops feeding new paths when set.
+
+    Returns:
+        tuple: (deleted, failed), the list of deleted FPATHs in completion order
+            and a dict of FPATH -> error text for the failures.
+    """
+
+    paths = queue.Queue(maxsize=queue_size)
+    lock = threading.Lock()
+    deleted = []
+    failed = {}
+    total = len(filepaths)
+
+    def worker():
+        while True:
+            filepath = paths.get()
+            if filepath is None:
+                return
+            try:
+                client.command("4003", str_value=quote(filepath))
+                error = None
+            except Exception as e:
+                error = str(e)
+            with lock:
+                if error is None:
+                    deleted.append(filepath)
+                else:
+                    failed[filepath] = error
+                done = len(deleted) + len(failed)
+            if progress:
+                progress(done, total)
+
+    threads = [threading.Thread(target=worker, name=f"delete-{i}", daemon=True)
+               for i in range(max(1, min(workers, total)))]
+    for thread in threads:
+        thread.start()
+    for filepath in filepaths:
+        if cancel_event is not None and cancel_event.is_set():
+            break
+        paths.put(filepath)
+    for _ in threads:
+        paths.put(None)
+    for thread in threads:
+        thread.join()
+    return deleted, failed
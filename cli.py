@@ -0,0 +1,314 @@
+'''
+Headless command-line interface for scripting the dashcam.
+
+    python cli.py status
+    python cli.py list
+    python cli.py record on
+    python cli.py mode review
+    python cli.py download "A:\\Novatek\\Movie\\2024_0131_123456_F.MP4" --dest clips
+    python cli.py mirror /srv/dashcam/car1
+    python cli.py info --gps
+    python cli.py gpx "A:\\Novatek\\Movie\\2024_0131_123456_F.MP4" --out trip.gpx
+    python cli.py strip "A:\\Novatek\\Movie\\2024_0131_123456_F.MP4" --out strip.jpg
+
+Every command prints one JSON document on stdout and exits with 0 on success,
+1 on a device error or when any file of a batch failed.
+
+Only the device modules are loaded and tkinter is never imported, so it starts
+fast and runs without a display, e.g. from cron. Pillow is imported only by
+"thumbnail --size" and "strip", and PyAV only by "strip".
+'''
+import argparse
+import json
+import sys
+import xml.etree.ElementTree as ET
+
+import dashcam
+from device import DeviceClient, DeviceError, DeviceStatusError
+from mp4 import Mp4Error
+
+
+def _size_arg(text):
+    """argparse type of WIDTHxHEIGHT options."""
+
+    try:
+        width, height = (int(v) for v in text.lower().split("x"))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected WIDTHxHEIGHT, e.g. 320x180, not {text!r}")
+    if width <= 0 or height <= 0:
+        raise argparse.ArgumentTypeError(f"width and height must be positive, not {text!r}")
+    return width, height
+
+
+def _record_dict(record):
+    from cleanup import is_protected
+    return {
+        "index": record.index,
+        "name": record.filename,
+        "path": record.filepath,
+        "size": record.filebytes,
+        "time": record.filetime,
+        "attr": record.attr,
+        "protected": is_protected(record),
+    }
+
+
+def cmd_list(client, args):
+    return [_record_dict(record) for record in dashcam.fetch_listing(client)]
+
+
+def cmd_status(client, args):
+    value = dashcam.read_status(client)
+    return {
+        "mode": dashcam.mode_name(value),
+        "value": value,
+        "recording": value == dashcam.MODE_RECORDING,
+    }
+
+
+def cmd_record(client, args):
+    on = args.state == "on"
+    dashcam.set_recording(client, on)
+    return {"recording": on}
+
+
+def cmd_mode(client, args):
+    name = args.mode
+    if name == "next":
+        name = dashcam.next_mode(dashcam.read_status(client))
+    value = dashcam.set_mode(client, name)
+    return {"mode": name, "value": value}
+
+
+def cmd_sync_time(client, args):
+    if args.quick:
+        return {"time": dashcam.sync_time(client)}
+    return dashcam.sync_time_precise(client, verify=not args.no_verify)
+
+
+def cmd_delete(client, args):
+    from cleanup import delete_files, select_reclaim
+    if args.reclaim is not None:
+        records = select_reclaim(dashcam.fetch_listing(client), int(args.reclaim * 1024 ** 3))
+        paths = [record.filepath for record in records]
+    else:
+        paths = args.paths
+    if args.dry_run:
+        return {"would_delete": paths}
+    deleted, failed = delete_files(client, paths)
+    return {"deleted": deleted, "failed": failed}
+
+
+def cmd_download(client, args):
+    from downloader import DownloadManager
+    downloader = DownloadManager(client, connections=args.connections)
+    return [downloader.download(path, args.dest) for path in args.paths]
+
+
+def cmd_mirror(client, args):
+    from downloader import DownloadManager
+    from mirror import mirror_card
+    downloader = DownloadManager(client, connections=args.connections)
+    return mirror_card(downloader, dashcam.fetch_listing(client), args.dest)
+
+
+def cmd_thumbnail(client, args):
+    data = client.fetch_preview(args.path)
+    if args.size:
+        # Pillow is only needed to scale the preview
+        from thumb_decode import decode_preview
+        _, _, data = decode_preview(data, args.size)
+    with open(args.out, "wb") as f:
+        f.write(data)
+    return {"path": args.out, "bytes": len(data)}
+
+
+def cmd_strip(client, args):
+    from PIL import Image, ImageDraw
+    from mp4 import RangeReader
+    from scrub import build_strip
+    width, height = args.size
+    reader = RangeReader(client, args.path)
+    strip = build_strip(reader, frames=args.frames, size=(width, height))
+    if not strip:
+        raise Mp4Error("No keyframes")
+    columns = min(len(strip), 5)
+    rows = (len(strip) + columns - 1) // columns
+    sheet = Image.new("RGB", (columns * width, rows * height))
+    draw = ImageDraw.Draw(sheet)
+    for position, (seconds, (size, rgb)) in enumerate(strip):
+        x, y = position % columns * width, position // columns * height
+        sheet.paste(Image.frombuffer("RGB", size, rgb, "raw", "RGB", 0, 1), (x, y))
+        draw.text((x + 4, y + 4), f"{int(seconds) // 60}:{int(seconds) % 60:02d}", fill="white")
+    sheet.save(args.out, quality=85)
+    return {"path": args.out, "frames": [round(seconds, 3) for seconds, _ in strip],
+            "bytes_read": reader.bytes_read, "requests": reader.requests}
+
+
+def _clip_records(client, paths):
+    # Listing records of the given clips, every MP4 on the card without paths
+    records = [r for r in dashcam.fetch_listing(client) if r.filename.upper().endswith(".MP4")]
+    if paths:
+        by_path = {record.filepath: record for record in records}
+        missing = [path for path in paths if path not in by_path]
+        if missing:
+            raise DeviceError(f"Not on the card: {', '.join(missing)}")
+        records = [by_path[path] for path in paths]
+    return sorted(records, key=lambda record: record.timestamp)
+
+
+def cmd_info(client, args):
+    from clip_metadata import MetadataCache, clip_metadata
+    cache = MetadataCache()
+    result = []
+    for record in _clip_records(client, args.paths):
+        try:
+            info = clip_metadata(client, record, cache, gps=args.gps)
+        except (DeviceError, Mp4Error) as e:
+            result.append({"path": record.filepath, "error": str(e)})
+            continue
+        entry = {"path": record.filepath}
+        entry.update((name, value) for name, value in info.items() if name != "gps")
+        if args.gps:
+            points = info["gps"]
+            entry["gps"] = {
+                "points": len(points),
+                "start": [points[0]["lat"], points[0]["lon"]] if points else None,
+                "end": [points[-1]["lat"], points[-1]["lon"]] if points else None,
+                "max_speed": max((point["speed"] for point in points), default=None),
+            }
+        result.append(entry)
+    cache.save()
+    return result
+
+
+def cmd_gpx(client, args):
+    from clip_metadata import MetadataCache, clip_metadata, write_gpx
+    cache = MetadataCache()
+    records = _clip_records(client, args.paths)
+    tracks = [clip_metadata(client, record, cache, gps=True)["gps"] for record in records]
+    cache.save()
+    return {"path": args.out, "points": write_gpx(args.out, tracks),
+            "clips": sum(1 for track in tracks if track)}
+
+
+def cmd_gui(client, args):
+    import multiprocessing
+    import main
+    multiprocessing.freeze_support()
+    main.create_file_browser([])
+    return None
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Bob's Looking DB5 Toolbox (command line)")
+    parser.add_argument("--pretty", action="store_true", help="indent the JSON output")
+    parser.add_argument("--url", help="device base URL (default: $DB5_DEVICE_URL or http://192.168.1.254)")
+    parser.add_argument("--metrics", metavar="FILE",
+                        help="write per-command request metrics to FILE "
+                             "(Prometheus text if it ends with .prom, JSON otherwise)")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    sub.add_parser("list", help="list the files on the card").set_defaults(func=cmd_list)
+    sub.add_parser("status", help="show mode and recording status").set_defaults(func=cmd_status)
+
+    p = sub.add_parser("record", help="start or stop recording")
+    p.add_argument("state", choices=["on", "off"])
+    p.set_defaults(func=cmd_record)
+
+    p = sub.add_parser("mode", help="switch the device mode")
+    p.add_argument("mode", choices=sorted(dashcam.MODE_COMMANDS) + ["next"])
+    p.set_defaults(func=cmd_mode)
+
+    p = sub.add_parser("sync-time", help="set the device clock to this computer's time")
+    p.add_argument("--quick", action="store_true",
+                   help="send date and time right away, without latency compensation")
+    p.add_argument("--no-verify", action="store_true", help="do not read the clock back")
+    p.set_defaults(func=cmd_sync_time)
+
+    p = sub.add_parser("delete", help="delete files (FPATH) or reclaim space")
+    p.add_argument("paths", nargs="*", help="FPATH of the files, e.g. A:\\Novatek\\Movie\\x.MP4")
+    p.add_argument("--reclaim", type=float, metavar="GB",
+                   help="delete the oldest unprotected clips to free this many GB")
+    p.add_argument("--dry-run", action="store_true", help="only print what would be deleted")
+    p.set_defaults(func=cmd_delete)
+
+    p = sub.add_parser("download", help="download files (resumable)")
+    p.add_argument("paths", nargs="+")
+    p.add_argument("--dest", default=".", help="destination folder")
+    p.add_argument("--connections", type=int, default=3, help="parallel connections per file")
+    p.set_defaults(func=cmd_download)
+
+    p = sub.add_parser("mirror", help="copy new and changed files to an archive folder")
+    p.add_argument("dest", help="archive folder")
+    p.add_argument("--connections", type=int, default=3, help="parallel connections per file")
+    p.set_defaults(func=cmd_mirror)
+
+    p = sub.add_parser("thumbnail", help="save the preview image of a file")
+    p.add_argument("path")
+    p.add_argument("--out", required=True, help="output JPEG file")
+    p.add_argument("--size", type=_size_arg, help="scale down to WIDTHxHEIGHT (needs Pillow)")
+    p.set_defaults(func=cmd_thumbnail)
+
+    p = sub.add_parser("info", help="duration, resolution and bitrate of clips (reads only their index)")
+    p.add_argument("paths", nargs="*", help="FPATH of the clips, all MP4 files if omitted")
+    p.add_argument("--gps", action="store_true", help="also read the GPS track (summary only)")
+    p.set_defaults(func=cmd_info)
+
+    p = sub.add_parser("gpx", help="export the GPS track of clips as GPX")
+    p.add_argument("paths", nargs="*", help="FPATH of the clips, all MP4 files if omitted")
+    p.add_argument("--out", required=True, help="output GPX file")
+    p.set_defaults(func=cmd_gpx)
+
+    p = sub.add_parser("strip", help="save frames spread across a clip (reads only its keyframes, needs PyAV)")
+    p.add_argument("path")
+    p.add_argument("--out", required=True, help="output JPEG file")
+    p.add_argument("--frames", type=int, default=10)
+    p.add_argument("--size", type=_size_arg, default="320x180", help="size of each frame, WIDTHxHEIGHT")
+    p.set_defaults(func=cmd_strip)
+
+    sub.add_parser("gui", help="start the graphical interface").set_defaults(func=cmd_gui)
+    return parser
+
+
+def main(argv=None):
+    """
+    Runs one command.
+
+    Args:
+        argv (list): Arguments without the program name, defaults to sys.argv[1:].
+
+    Returns:
+        int: Process exit code.
+    """
+
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    if args.command == "delete" and not args.paths and args.reclaim is None:
+        parser.error("delete needs FPATHs or --reclaim")
+
+    client = DeviceClient(base_url=args.url)
+    try:
+        result = args.func(client, args)
+        # Batch commands (delete, mirror) report per-file failures in "failed"
+        code = 1 if isinstance(result, dict) and result.get("failed") else 0
+    except DeviceStatusError as e:
+        result = {"error": str(e), "status": e.status}
+        code = 1
+    except (DeviceError, ET.ParseError, Mp4Error, OSError, ImportError) as e:
+        result = {"error": str(e)}
+        code = 1
+    if args.metrics:
+        with open(args.metrics, "w", encoding="utf-8") as f:
+            if args.metrics.endswith(".prom"):
+                f.write(client.metrics.to_prometheus())
+            else:
+                f.write(client.metrics.to_json(indent=2))
+    if result is not None:
+        json.dump(result, sys.stdout, indent=2 if args.pretty else None, ensure_ascii=False)
+        sys.stdout.write("\n")
+    return code
+
+
+if __name__ == "__main__":
+    sys.exit(main())
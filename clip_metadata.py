@@ -0,0 +1,301 @@
+'''
+Clip metadata and GPS tracks read from the device with Range requests.
+
+Duration, resolution, frame rate and bitrate come from the moov index (see
+mp4.py). Novatek firmware also records one GPS fix per second: each fix is a
+small "free" box tagged "GPS " inside mdat, and moov holds a "gps " box listing
+the (offset, size) of every fix, so the track costs one small read per second
+of video instead of the whole clip. Results are cached on disk per file
+identity (FPATH + SIZE + TIME), like the thumbnails.
+'''
+import json
+import os
+import struct
+import threading
+from datetime import datetime, timezone
+from xml.sax.saxutils import escape
+
+from mp4 import RangeReader, read_movie
+from thumb_cache import ThumbnailCache, default_cache_dir
+
+CACHE_NAME = "metadata.json"
+
+# Bytes read from each GPS box; the fix itself ends at byte 92
+GPS_READ_BYTES = 128
+KNOTS_TO_KMH = 1.852
+
+
+def _nmea_degrees(value, hemisphere):
+    # DDDMM.MMMM -> decimal degrees, negative for the southern / western hemisphere
+    degrees = int(value / 100)
+    result = degrees + (value - degrees * 100) / 60
+    return -result if hemisphere in (b"S", b"W") else result
+
+
+def parse_gps_index(payload):
+    """
+    Reads the moov "gps " box.
+
+    Args:
+        payload (bytes): Payload of the box.
+
+    Returns:
+        list: (file offset, size) of each GPS box, in recording order.
+    """
+
+    # 8 bytes of version / count, then big-endian (offset, size) pairs
+    entries = []
+    for pos in range(8, len(payload) - 7, 8):
+        offset, size = struct.unpack_from(">II", payload, pos)
+        if offset and size:
+            entries.append((offset, size))
+    return entries
+
+
+def parse_gps_box(data):
+    """
+    Decodes one Novatek GPS box.
+
+    Args:
+        data (bytes): Start of the box, at least 88 bytes.
+
+    Returns:
+        dict: time (UTC datetime), lat, lon (decimal degrees), speed (km/h) and
+            course (degrees, None if absent); None without a valid fix.
+    """
+
+    if len(data) < 88 or data[4:8] != b"free" or data[8:12] != b"GPS ":
+        return None
+    (hour, minute, second, year, month, day, active, lat_ref, lon_ref, _,
+     lat, lon, speed) = struct.unpack_from("<IIIIIIccccfff", data, 48)
+    if active != b"A":
+        return None  # No satellite fix for this second
+    try:
+        when = datetime(2000 + year, month, day, hour, minute, second, tzinfo=timezone.utc)
+    except ValueError:
+        return None
+    course = struct.unpack_from("<f", data, 88)[0] if len(data) >= 92 else None
+    return {
+        "time": when,
+        "lat": _nmea_degrees(lat, lat_ref),
+        "lon": _nmea_degrees(lon, lon_ref),
+        "speed": speed * KNOTS_TO_KMH,
+        "course": course,
+    }
+
+
+def read_gps_track(reader, movie, cancel_event=None):
+    """
+    Reads the GPS fixes of a clip.
+
+    Args:
+        reader (RangeReader): Source of the clip.
+        movie (Movie): Its parsed moov.
+        cancel_event (threading.Event): Set to stop early.
+
+    Returns:
+        list: Fix dicts from parse_gps_box(), empty if the clip has no GPS index.
+    """
+
+    index = movie.boxes.get(b"gps ")
+    if index is None:
+        return []
+    points = []
+    for offset, size in parse_gps_index(index):
+        if cancel_event is not None and cancel_event.is_set():
+            break
+        point = parse_gps_box(reader.read(offset, min(size, GPS_READ_BYTES)))
+        if point is not None:
+            points.append(point)
+    return points
+
+
+def read_metadata(reader, gps=False, cancel_event=None):
+    """
+    Reads the metadata of a clip. Blocking.
+
+    Args:
+        reader (RangeReader): Source of the clip.
+        gps (bool): Also read the GPS track (one small request per second of video).
+        cancel_event (threading.Event): Set to stop the GPS read early.
+
+    Returns:
+        dict: duration (seconds), width, height, fps, codec, bitrate (bits/s of
+            the whole file) and, with gps=True, gps (list of fixes).
+    """
+
+    movie = read_movie(reader)
+    track = movie.video_track()
+    duration = movie.seconds or (track.seconds if track else 0)
+    info = {
+        "duration": duration,
+        "width": track.width if track else None,
+        "height": track.height if track else None,
+        "fps": track.sample_count / track.seconds if track and track.seconds else None,
+        "codec": track.codec.decode("ascii", "replace") if track and track.codec else None,
+        "bitrate": reader.size * 8 / duration if duration and reader.size else None,
+    }
+    if gps:
+        info["gps"] = read_gps_track(reader, movie, cancel_event)
+    return info
+
+
+def _point_to_json(point):
+    return [point["time"].timestamp(), point["lat"], point["lon"], point["speed"], point["course"]]
+
+
+def _point_from_json(values):
+    return {
+        "time": datetime.fromtimestamp(values[0], timezone.utc),
+        "lat": values[1],
+        "lon": values[2],
+        "speed": values[3],
+        "course": values[4],
+    }
+
+
+class MetadataCache:
+    """
+    JSON file of clip metadata keyed by file identity.
+
+    Args:
+        path (str): Cache file, metadata.json next to the thumbnail cache by default.
+    """
+
+    def __init__(self, path=None):
+        self.path = path or os.path.join(os.path.dirname(default_cache_dir()), CACHE_NAME)
+        self._entries = {}
+        self._lock = threading.Lock()
+        self._dirty = False
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                self._entries = json.load(f).get("files", {})
+        except (OSError, ValueError):
+            pass
+
+    @staticmethod
+    def make_key(filepath, filesize, filetime):
+        return ThumbnailCache.make_key(filepath, filesize, filetime)
+
+    def get(self, key):
+        """
+        Returns:
+            dict: The cached metadata (with gps only if it was read), None on a miss.
+        """
+
+        with self._lock:
+            entry = self._entries.get(key)
+        if entry is None:
+            return None
+        info = dict(entry)
+        if info.get("gps") is not None:
+            info["gps"] = [_point_from_json(values) for values in info["gps"]]
+        return info
+
+    def put(self, key, info):
+        entry = dict(info)
+        if entry.get("gps") is not None:
+            entry["gps"] = [_point_to_json(point) for point in entry["gps"]]
+        with self._lock:
+            previous = self._entries.get(key)
+            # Keep a track read earlier when only the header was read again
+            if "gps" not in entry and previous and "gps" in previous:
+                entry["gps"] = previous["gps"]
+            self._entries[key] = entry
+            self._dirty = True
+
+    def save(self):
+        """Writes the cache file if anything changed (atomic replace)."""
+
+        with self._lock:
+            if not self._dirty:
+                return
+            data = json.dumps({"version": 1, "files": self._entries})
+            self._dirty = False
+        tmp_path = f"{self.path}.{threading.get_ident()}.tmp"
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                f.write(data)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            print(f"Metadata cache not saved: {e}")
+
+
+def clip_metadata(client, record, cache=None, gps=False, priority=None, cancel_event=None):
+    """
+    Metadata of a listed clip, from the cache or the device.
+
+    Args:
+        client (DeviceClient): Shared device client.
+        record (FileRecord): The clip.
+        cache (MetadataCache): Cache to use, None for no caching.
+        gps (bool): Include the GPS track.
+        priority (int): Governor priority class of the reads.
+        cancel_event (threading.Event): Set to stop the GPS read early.
+
+    Returns:
+        dict: See read_metadata().
+    """
+
+    key = MetadataCache.make_key(record.filepath, record.filebytes, record.filetime)
+    info = cache.get(key) if cache else None
+    if info is not None and (not gps or info.get("gps") is not None):
+        return info
+    kwargs = {} if priority is None else {"priority": priority}
+    reader = RangeReader(client, record.filepath, record.filebytes, **kwargs)
+    info = read_metadata(reader, gps=gps, cancel_event=cancel_event)
+    if cache and not (cancel_event is not None and cancel_event.is_set()):
+        cache.put(key, info)
+    return info
+
+
+def format_duration(seconds):
+    """Duration as m:ss (h:mm:ss from one hour), empty for None."""
+
+    if seconds is None:
+        return ""
+    seconds = int(round(seconds))
+    if seconds >= 3600:
+        return f"{seconds // 3600}:{seconds // 60 % 60:02d}:{seconds % 60:02d}"
+    return f"{seconds // 60}:{seconds % 60:02d}"
+
+
+def write_gpx(path, tracks, creator="Bob's Looking DB5 Toolbox"):
+    """
+    Writes GPS tracks as a GPX 1.0 file (keeps speed and course per point),
+    one track segment per clip.
+
+    Args:
+        path (str): Output file.
+        tracks (list): Point lists from read_gps_track(), one per clip in time order.
+
+    Returns:
+        int: Number of points written.
+    """
+
+    count = 0
+    lines = ['<?xml version="1.0" encoding="UTF-8"?>',
+             f'<gpx version="1.0" creator="{escape(creator)}" xmlns="http://www.topografix.com/GPX/1/0">',
+             "<trk>"]
+    seen = set()
+    for points in tracks:
+        if not points:
+            continue
+        lines.append("<trkseg>")
+        for point in points:
+            # Front and rear clips of the same moment carry the same fixes
+            if point["time"] in seen:
+                continue
+            seen.add(point["time"])
+            lines.append(
+                f'<trkpt lat="{point["lat"]:.7f}" lon="{point["lon"]:.7f}">'
+                f'<time>{point["time"].strftime("%Y-%m-%dT%H:%M:%SZ")}</time>'
+                + (f'<course>{point["course"]:.1f}</course>' if point["course"] is not None else "")
+                + f'<speed>{point["speed"] / 3.6:.2f}</speed></trkpt>')
+            count += 1
+        lines.append("</trkseg>")
+    lines += ["</trk>", "</gpx>", ""]
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("\n".join(lines))
+    return count
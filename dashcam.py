@@ -0,0 +1,296 @@
+'''
+Device operations shared by the GUI and the command-line interface.
+
+Each function performs one dashcam action through a DeviceClient and returns
+plain data. Nothing here imports tkinter or Pillow, so scripts can use it
+without paying for the GUI.
+'''
+import math
+import time
+from datetime import datetime, timezone
+
+from device import DeviceError
+from listing import iter_file_records
+
+# cmd=3037 values: 0 = recording mode (stopped), 1 = recording, 3 = review, 4 = photo
+MODE_RECORDING_IDLE = 0
+MODE_RECORDING = 1
+MODE_REVIEW = 3
+MODE_PHOTO = 4
+
+MODE_NAMES = {
+    MODE_RECORDING_IDLE: "record",
+    MODE_RECORDING: "record",
+    MODE_REVIEW: "review",
+    MODE_PHOTO: "photo",
+}
+
+# Mode name -> (cmd=3001 par, cmd=3037 value right after switching)
+MODE_COMMANDS = {
+    "record": ("1", MODE_RECORDING_IDLE),
+    "photo": ("0", MODE_PHOTO),
+    "review": ("2", MODE_REVIEW),
+}
+
+# Cycle of the mode button: Recording -> Photo -> Review -> Recording
+NEXT_MODE = {"record": "photo", "photo": "review", "review": "record"}
+
+# Heartbeat (cmd=3016) probes measuring the round trip before a clock sync
+SYNC_PROBES = 5
+# Probes reading the device clock from the Date header to verify a sync
+VERIFY_PROBES = 8
+# Seconds left between the date command's answer and sending the time command
+SYNC_MARGIN = 0.2
+# A verified offset at least this large (seconds) is synchronized once more
+SYNC_RETRY_OFFSET = 1.0
+
+
+def read_status(client, priority=None, timeout=None):
+    """
+    Reads the mode / recording status value (cmd=3037).
+
+    Args:
+        client (DeviceClient): Client used for the request.
+        priority (int): Governor priority class, the command's default if None.
+        timeout (float): Overrides the command timeout.
+
+    Returns:
+        int: 0, 1: Recording mode (1 while recording), 3: Review mode, 4: Photo mode
+    """
+
+    root = client.command("3037", check=False, priority=priority, timeout=timeout)
+    try:
+        return int(root.find(".//Value").text)
+    except (AttributeError, TypeError, ValueError):
+        raise DeviceError("cmd=3037 answer has no status value")
+
+
+def is_recording_mode(value):
+    """True if a cmd=3037 value is one of the recording modes."""
+
+    return value in (MODE_RECORDING_IDLE, MODE_RECORDING)
+
+
+def mode_name(value):
+    """Name of a cmd=3037 value ("record", "photo", "review"), None if unknown."""
+
+    return MODE_NAMES.get(value)
+
+
+def set_recording(client, on):
+    """
+    Starts or stops recording (cmd=2001).
+
+    Args:
+        client (DeviceClient): Client used for the request.
+        on (bool): True to start recording.
+    """
+
+    client.command("2001", par="1" if on else "0")
+
+
+def set_mode(client, name):
+    """
+    Switches the device mode (cmd=3001).
+
+    Args:
+        client (DeviceClient): Client used for the request.
+        name (str): "record", "photo" or "review".
+
+    Returns:
+        int: The cmd=3037 value of the new mode.
+    """
+
+    par, value = MODE_COMMANDS[name]
+    client.command("3001", par=par)
+    return value
+
+
+def next_mode(value):
+    """Mode name the mode button switches to from a cmd=3037 value."""
+
+    return NEXT_MODE.get(mode_name(value), "record")
+
+
+def sync_time(client, now=None):
+    """
+    Sets the device clock (cmd=3005 date, cmd=3006 time) right away, without
+    latency compensation (see sync_time_precise()).
+
+    Args:
+        client (DeviceClient): Client used for the requests.
+        now (datetime): Time to set, defaults to the local time.
+
+    Returns:
+        str: The time sent, "YYYY-MM-DD HH:MM:SS".
+    """
+
+    now = now or datetime.now()
+    current_date = now.strftime("%Y-%m-%d")
+    current_time = now.strftime("%H:%M:%S")
+    client.command("3005", str_value=current_date)
+    client.command("3006", str_value=current_time)
+    return f"{current_date} {current_time}"
+
+
+def measure_rtt(client, probes=SYNC_PROBES):
+    """
+    Measures the round-trip time with heartbeat commands (cmd=3016).
+
+    Args:
+        client (DeviceClient): Client used for the requests.
+        probes (int): Number of heartbeats.
+
+    Returns:
+        float: The shortest round trip in seconds, the probe least delayed by queueing.
+    """
+
+    rtts = []
+    for _ in range(probes):
+        sent, received, _ = client.timed_command("3016")
+        rtts.append(received - sent)
+    return min(rtts)
+
+
+def read_clock_offset(client, probes=VERIFY_PROBES):
+    """
+    Estimates how far the device clock is ahead of this computer's clock.
+
+    The HTTP Date header only carries whole seconds, so each probe bounds the
+    offset to a window one second wide (widened by its round trip). The probes
+    leave at different fractions of a second, at least 1 / probes seconds
+    apart, and their windows are intersected, which narrows the estimate to
+    about the longer of 1 / probes seconds and the round trip.
+
+    Args:
+        client (DeviceClient): Client used for the requests.
+        probes (int): Number of probes.
+
+    Returns:
+        tuple: (offset, error) in seconds, device minus local time and the
+            half width of the window; None if the device sends no Date header.
+    """
+
+    low, high = -math.inf, math.inf
+    as_utc = None
+    start = time.time()
+    for i in range(probes):
+        # Slow answers spread the later probes over the second by themselves
+        sent, received, device_time = client.timed_command("3016", send_at=start + i / probes)
+        if device_time is None:
+            return None
+        local = device_time.timestamp()
+        utc = device_time.replace(tzinfo=timezone.utc).timestamp()
+        if as_utc is None:
+            # The firmware has no time zone and labels its local clock GMT;
+            # read it as UTC only when that is clearly closer
+            as_utc = abs(utc - received) < abs(local - received)
+        seconds = utc if as_utc else local
+        # The device read its clock between sent and received
+        low = max(low, seconds - received)
+        high = min(high, seconds + 1 - sent)
+    return (low + high) / 2, abs(high - low) / 2
+
+
+def sync_time_precise(client, probes=SYNC_PROBES, verify=True):
+    """
+    Sets the device clock with latency compensation.
+
+    The round trip is measured first. Date and time are taken from one
+    instant, the next whole second far enough away for the date command to
+    finish first. The time command leaves half a round trip before that
+    second, so it lands as the second starts (the firmware only takes whole
+    seconds). The result is then read back with read_clock_offset(), and the
+    sync is repeated once if the clock is still a second or more off (e.g.
+    the device rolled over midnight between the two commands).
+
+    Args:
+        client (DeviceClient): Client used for the requests.
+        probes (int): Heartbeats used to measure the round trip.
+        verify (bool): Read the device clock back after setting it.
+
+    Returns:
+        dict: time (the time set, "YYYY-MM-DD HH:MM:SS"), rtt (seconds) and
+            offset, error (seconds, see read_clock_offset(); None if not verified).
+    """
+
+    for attempt in range(2):
+        rtt = measure_rtt(client, probes)
+        target = math.ceil(time.time() + 1.5 * rtt + SYNC_MARGIN)
+        moment = datetime.fromtimestamp(target)
+        client.command("3005", str_value=moment.strftime("%Y-%m-%d"))
+        client.timed_command("3006", str_value=moment.strftime("%H:%M:%S"), send_at=target - rtt / 2)
+        result = {"time": moment.strftime("%Y-%m-%d %H:%M:%S"), "rtt": rtt, "offset": None, "error": None}
+        if not verify:
+            break
+        measured = read_clock_offset(client)
+        if measured is not None:
+            result["offset"], result["error"] = measured
+        if measured is None or abs(measured[0]) < SYNC_RETRY_OFFSET:
+            break
+    return result
+
+
+def set_camera_view(client, view):
+    """
+    Selects the live view camera (cmd=3028).
+
+    Args:
+        client (DeviceClient): Client used for the request.
+        view (int): 0: Front, 1: Rear, 2: Dual.
+    """
+
+    client.command("3028", par=view)
+
+
+def take_picture(client):
+    """Takes a picture (cmd=1001); the device must be in photo mode."""
+
+    client.command("1001")
+
+
+def live_view_url(client, value):
+    """
+    Reads the live view URL for the current mode (cmd=2019).
+
+    Args:
+        client (DeviceClient): Client used for the request.
+        value (int): Current cmd=3037 value.
+
+    Returns:
+        str: Movie or photo live view link.
+    """
+
+    root = client.command("2019")
+    if is_recording_mode(value):
+        return root.find(".//MovieLiveViewLink").text
+    elif value == MODE_PHOTO:
+        return root.find(".//PhotoLiveViewLink").text
+    raise DeviceError(f"No live view in mode {value}")
+
+
+def fetch_listing(client, on_batch=None, batch_size=200):
+    """
+    Fetches the file listing (cmd=3015), parsing it while it streams in.
+
+    Args:
+        client (DeviceClient): Client used for the request.
+        on_batch (callable): Called with each list of newly parsed records.
+        batch_size (int): Records per on_batch call.
+
+    Returns:
+        list: A list of FileRecord.
+    """
+
+    file_list = []
+    batch = []
+    for record in iter_file_records(client.command_stream("3015")):
+        file_list.append(record)
+        if on_batch:
+            batch.append(record)
+            if len(batch) >= batch_size:
+                on_batch(batch)
+                batch = []
+    if on_batch and batch:
+        on_batch(batch)
+    return file_list
@@ -0,0 +1,407 @@
+'''
+Shared HTTP client for the dashcam's Novatek command interface.
+
+All device traffic goes through one DeviceClient so connections are reused
+(HTTP keep-alive), every command has a timeout, transient failures are retried
+with backoff, and the <Status> envelope is parsed in one place. Requests are
+admitted by the client's RequestGovernor (see governor.py) and every attempt is
+recorded in its CommandMetrics (see metrics.py).
+'''
+import os
+import time
+import xml.etree.ElementTree as ET
+from email.utils import parsedate_to_datetime
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from governor import RequestGovernor, PRIORITY_CONTROL, PRIORITY_INTERACTIVE, PRIORITY_BULK
+from metrics import CommandMetrics, command_label
+
+DEFAULT_BASE_URL = "http://192.168.1.254"
+# Environment variable overriding the device URL, e.g. to use emulator.py
+BASE_URL_ENV = "DB5_DEVICE_URL"
+
+# Timeout (seconds) per command id, DEFAULT_TIMEOUT for anything else
+DEFAULT_TIMEOUT = 5
+COMMAND_TIMEOUTS = {
+    "3015": 30,  # File listing, grows with the card
+    "4002": 10,  # Preview image
+    "4003": 10,  # Delete file
+    "1001": 15,  # Take picture
+    "3001": 10,  # Change mode
+}
+
+# Transient failures worth another attempt; a Wi-Fi drop in the middle of a
+# body surfaces as ChunkedEncodingError / ContentDecodingError, not ConnectionError
+RETRIED_ERRORS = (
+    requests.exceptions.ConnectionError,
+    requests.exceptions.Timeout,
+    requests.exceptions.ChunkedEncodingError,
+    requests.exceptions.ContentDecodingError,
+)
+
+# Commands that must not be sent twice when the first attempt may have landed
+NO_RETRY_COMMANDS = {"1001", "3018"}
+
+# Governor priority class per command id, PRIORITY_INTERACTIVE for anything else
+COMMAND_PRIORITIES = {
+    "2001": PRIORITY_CONTROL,  # Start/stop recording
+    "3001": PRIORITY_CONTROL,  # Change mode
+    "1001": PRIORITY_CONTROL,  # Take picture
+    "3028": PRIORITY_CONTROL,  # Camera view
+    "3005": PRIORITY_CONTROL,  # Set date
+    "3006": PRIORITY_CONTROL,  # Set time
+    "4002": PRIORITY_BULK,  # Preview image (thumbnails)
+}
+
+# Read-only commands whose identical in-flight requests are merged into one
+COALESCED_COMMANDS = {"3015", "3016", "3037", "2019", "4002"}
+
+
+class DeviceError(Exception):
+    """Raised when the device cannot be reached or answers garbage."""
+
+
+class DeviceStatusError(DeviceError):
+    """
+    Raised when the device answers with a non-zero <Status>.
+
+    Attributes:
+        status (str): The <Status> value returned by the device.
+    """
+
+    def __init__(self, cmd, status):
+        super().__init__(f"cmd={cmd} returned status {status}")
+        self.cmd = cmd
+        self.status = status
+
+
+def parse_status(root):
+    """
+    Reads the <Status> value from a parsed response.
+
+    Args:
+        root (ET.Element): Parsed response.
+
+    Returns:
+        str: The status, or None if the response has no <Status> element.
+    """
+
+    element = root.find(".//Status")
+    return element.text if element is not None else None
+
+
+def wait_until(when):
+    """
+    Blocks until the wall clock (time.time()) reaches a given instant, more
+    precisely than one time.sleep() (spins for the last few milliseconds).
+
+    Args:
+        when (float): Instant to wait for, in time.time() seconds.
+    """
+
+    while True:
+        remaining = when - time.time()
+        if remaining <= 0:
+            return
+        time.sleep(remaining - 0.02 if remaining > 0.02 else 0)
+
+
+def configured_base_url():
+    """
+    Device URL to use when none is given explicitly.
+
+    Returns:
+        str: $DB5_DEVICE_URL if set, otherwise DEFAULT_BASE_URL.
+    """
+
+    return os.environ.get(BASE_URL_ENV) or DEFAULT_BASE_URL
+
+
+class DeviceClient:
+    """
+    Pooled, retrying client for one dashcam.
+
+    Args:
+        base_url (str): Device root URL, configured_base_url() if None.
+        retries (int): Extra attempts for transient failures.
+        backoff (float): Base delay (seconds) between attempts, doubled each time.
+        pool_size (int): Maximum keep-alive connections kept open.
+        governor (RequestGovernor): Admission control shared by all requests.
+        metrics (CommandMetrics): Per-command request metrics.
+    """
+
+    def __init__(self, base_url=None, retries=2, backoff=0.3, pool_size=8,
+                 governor=None, metrics=None):
+        self.base_url = (base_url or configured_base_url()).rstrip("/")
+        self.retries = retries
+        self.backoff = backoff
+        self.governor = governor or RequestGovernor()
+        self.metrics = metrics or CommandMetrics()
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=0)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    def file_url(self, filepath):
+        """
+        Maps a device path (A:\\...) to its HTTP URL.
+
+        Args:
+            filepath (str): FPATH of the file.
+
+        Returns:
+            str: URL of the file on the device.
+        """
+
+        return filepath.replace("A:\\", self.base_url + "/").replace("\\", "/")
+
+    def _send(self, url, priority, timeout, stream=False, headers=None, send_at=None):
+        """
+        One GET attempt inside a governor slot.
+
+        For streamed responses the slot is held until the response is closed,
+        and the metrics are recorded then, with the bytes actually read.
+
+        Args:
+            send_at (float): time.time() instant to send the request at. The
+                slot is taken first, so queueing does not delay the send.
+
+        Returns:
+            requests.Response: The response, whatever its status code.
+        """
+
+        cmd = command_label(url)
+        self.governor.acquire(priority)
+        if send_at is not None:
+            wait_until(send_at)
+        started = time.monotonic()
+        try:
+            response = self.session.get(url, timeout=timeout, stream=stream, headers=headers)
+        except requests.exceptions.RequestException as e:
+            self.governor.release(ok=False)
+            self.metrics.record(cmd, time.monotonic() - started, error=type(e).__name__)
+            raise
+        latency = response.elapsed.total_seconds()
+        ok = response.status_code < 500
+        if not stream:
+            self.governor.release(latency, ok)
+            self.metrics.record(cmd, latency, len(response.content), response.status_code)
+            return response
+
+        close = response.close
+        released = []
+
+        def close_and_release():
+            try:
+                # Bytes pulled from the socket so far (urllib3 response)
+                nbytes = response.raw.tell()
+            except (AttributeError, ValueError, OSError):
+                nbytes = 0
+            try:
+                close()
+            finally:
+                if not released:
+                    released.append(True)
+                    self.governor.release(latency, ok)
+                    self.metrics.record(cmd, latency, nbytes, response.status_code)
+
+        response.close = close_and_release
+        return response
+
+    def _get(self, url, cmd, timeout=None, retry=True, priority=None, stream=False):
+        """
+        GET with timeout and bounded retries on connection errors, bodies cut
+        off mid-transfer and 5xx. Non-streamed bodies are read inside the retry
+        loop; a streamed body is read by the caller and not retried here.
+
+        Returns:
+            requests.Response: The successful response.
+        """
+
+        if timeout is None:
+            timeout = COMMAND_TIMEOUTS.get(cmd, DEFAULT_TIMEOUT)
+        if priority is None:
+            priority = COMMAND_PRIORITIES.get(cmd, PRIORITY_INTERACTIVE)
+        attempts = 1 + (self.retries if retry and cmd not in NO_RETRY_COMMANDS else 0)
+        for attempt in range(attempts):
+            try:
+                response = self._send(url, priority, timeout, stream=stream)
+                if not stream:
+                    response.content  # Whole body read here, so a cut-off body is retried
+                if response.status_code < 500 or attempt == attempts - 1:
+                    try:
+                        response.raise_for_status()
+                    except requests.exceptions.HTTPError:
+                        response.close()
+                        raise
+                    return response
+                response.close()
+            except RETRIED_ERRORS as e:
+                if attempt == attempts - 1:
+                    raise DeviceError(f"cmd={cmd}: {e}") from e
+            except requests.exceptions.RequestException as e:
+                raise DeviceError(f"cmd={cmd}: {e}") from e
+            time.sleep(self.backoff * (2 ** attempt))
+
+    def _get_shared(self, url, cmd, timeout=None, priority=None):
+        """_get() for read commands, merging identical concurrent requests."""
+
+        if cmd in COALESCED_COMMANDS:
+            if priority is None:
+                priority = COMMAND_PRIORITIES.get(cmd, PRIORITY_INTERACTIVE)
+            # A more urgent caller joining the request raises its ticket, so a
+            # probe never waits on a request the governor is holding back
+            return self.governor.coalesce(
+                url, lambda ticket: self._get(url, cmd, timeout=timeout, priority=ticket),
+                priority=priority)
+        return self._get(url, cmd, timeout=timeout, priority=priority)
+
+    def command(self, cmd, par=None, str_value=None, timeout=None, check=True, priority=None):
+        """
+        Sends a ?custom=1&cmd=... command and parses the XML answer.
+
+        Args:
+            cmd (str): Command id.
+            par (str): Optional "par" argument.
+            str_value (str): Optional "str" argument, sent as-is.
+            timeout (float): Overrides the per-command timeout.
+            check (bool): Raise DeviceStatusError on a non-zero <Status>.
+            priority (int): Overrides the governor priority class of the command.
+
+        Returns:
+            ET.Element: Root of the parsed response.
+        """
+
+        url = self._command_url(cmd, par, str_value)
+        response = self._get_shared(url, str(cmd), timeout=timeout, priority=priority)
+        return self._parse_answer(cmd, response, check)
+
+    def _command_url(self, cmd, par=None, str_value=None):
+        # The query is sent verbatim; callers quote "str" themselves where the
+        # firmware expects it (e.g. file paths)
+        url = f"{self.base_url}/?custom=1&cmd={cmd}"
+        if par is not None:
+            url += f"&par={par}"
+        if str_value is not None:
+            url += f"&str={str_value}"
+        return url
+
+    def _parse_answer(self, cmd, response, check):
+        try:
+            root = ET.fromstring(response.content)
+        except ET.ParseError as e:
+            raise DeviceError(f"cmd={cmd}: XML parsing error: {e}") from e
+        status = parse_status(root)
+        self.metrics.record_status(str(cmd), status)
+        if check and status is not None and status != "0":
+            raise DeviceStatusError(str(cmd), status)
+        return root
+
+    def timed_command(self, cmd, par=None, str_value=None, send_at=None):
+        """
+        Sends a command once, timed, for clock measurements: no retries, never
+        merged with other requests, control priority.
+
+        Args:
+            cmd (str): Command id.
+            par (str): Optional "par" argument.
+            str_value (str): Optional "str" argument, sent as-is.
+            send_at (float): time.time() instant to send the request at, now if None.
+
+        Returns:
+            tuple: (sent, received, device_time): time.time() when the request
+                went out and when the answer arrived, and the answer's Date
+                header as a naive datetime (None if the device sent none).
+        """
+
+        url = self._command_url(cmd, par, str_value)
+        timeout = COMMAND_TIMEOUTS.get(str(cmd), DEFAULT_TIMEOUT)
+        try:
+            response = self._send(url, PRIORITY_CONTROL, timeout, send_at=send_at)
+            response.raise_for_status()
+        except requests.exceptions.RequestException as e:
+            raise DeviceError(f"cmd={cmd}: {e}") from e
+        received = time.time()
+        sent = received - response.elapsed.total_seconds()
+        self._parse_answer(cmd, response, check=True)
+        try:
+            device_time = parsedate_to_datetime(response.headers["Date"]).replace(tzinfo=None)
+        except (KeyError, TypeError, ValueError):
+            device_time = None
+        return sent, received, device_time
+
+    def command_stream(self, cmd, chunk_size=64 * 1024, timeout=None):
+        """
+        Sends a ?custom=1&cmd=... command and yields the raw answer as it arrives.
+
+        Args:
+            cmd (str): Command id.
+            chunk_size (int): Bytes per yielded chunk.
+            timeout (float): Overrides the per-command timeout.
+
+        Yields:
+            bytes: Pieces of the response body.
+        """
+
+        url = f"{self.base_url}/?custom=1&cmd={cmd}"
+        response = self._get(url, str(cmd), timeout=timeout, stream=True)
+        try:
+            yield from response.iter_content(chunk_size)
+        except requests.exceptions.RequestException as e:
+            raise DeviceError(f"cmd={cmd}: {e}") from e
+        finally:
+            response.close()
+
+    def open_stream(self, url, headers=None, timeout=(5, 30), priority=PRIORITY_BULK):
+        """
+        Opens a streaming GET for bulk transfers (no automatic retry).
+
+        Args:
+            url (str): Full URL on the device.
+            headers (dict): Extra request headers, e.g. Range.
+            timeout (tuple): (connect, read) timeout in seconds.
+            priority (int): Governor priority class.
+
+        Returns:
+            requests.Response: Open response; the caller must close it, which
+                also frees its governor slot.
+        """
+
+        try:
+            response = self._send(url, priority, timeout, stream=True, headers=headers)
+        except requests.exceptions.RequestException as e:
+            raise DeviceError(f"GET {url}: {e}") from e
+        try:
+            response.raise_for_status()
+        except requests.exceptions.RequestException as e:
+            response.close()
+            raise DeviceError(f"GET {url}: {e}") from e
+        return response
+
+    def fetch_preview(self, filepath, timeout=None, priority=None):
+        """
+        Fetches the cmd=4002 preview image of a file.
+
+        Args:
+            filepath (str): FPATH of the file.
+            timeout (float): Overrides the per-command timeout.
+            priority (int): Governor priority class, bulk by default.
+
+        Returns:
+            bytes: Encoded image data.
+        """
+
+        url = self.file_url(filepath) + "/?custom=1&cmd=4002"
+        response = self._get_shared(url, "4002", timeout=timeout, priority=priority)
+        data = response.content
+        # The firmware answers with a status envelope instead of an image on failure
+        if data.lstrip().startswith(b"<"):
+            try:
+                status = parse_status(ET.fromstring(data))
+            except ET.ParseError:
+                status = None
+            self.metrics.record_status("4002", status)
+            raise DeviceStatusError("4002", status)
+        return data
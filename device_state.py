@@ -0,0 +1,182 @@
+'''
+Cached model of the dashcam's state.
+
+One background poller reads cmd=3037 (mode and recording status in a single
+answer) at a fixed interval and doubles as the keep-alive and health probe:
+its round-trip times feed a LinkHealth, and while the link is offline it
+retries with exponential backoff and pauses the request governor, so queued
+thumbnails, listings and downloads wait for the reconnect. Everything else
+reads the cached values: read() only goes to the device when the cached status
+is older than its TTL, and the results of our own commands are written back
+with update(), so the UI never polls the camera itself. Listeners are told
+which fields changed.
+'''
+import threading
+import time
+
+import dashcam
+from governor import PRIORITY_CONTROL
+from health import LinkHealth, LINK_OFFLINE
+
+FIELDS = ("mode", "recording", "view", "connected", "last_seen", "link")
+
+# Timeout (seconds) of the background probe
+PROBE_TIMEOUT = 3
+
+
+class DeviceState:
+    """
+    Device state shared by the whole application.
+
+    Attributes:
+        mode (int): Last cmd=3037 value (see dashcam.MODE_*), None if unknown.
+        recording (bool): Recording in progress, None if unknown.
+        view (int): Camera view set by this application (0: Front, 1: Rear, 2: Dual).
+        connected (bool): Result of the last exchange with the device, None before the first.
+        last_seen (float): time.time() of the last successful exchange.
+        link (str): health.LINK_OK, LINK_DEGRADED or LINK_OFFLINE, None before the first read.
+
+    Args:
+        client (DeviceClient): Client used for the polls.
+        poll_interval (float): Seconds between two background polls while the link is healthy.
+        ttl (float): Age (seconds) after which read() fetches the status again.
+        health (LinkHealth): Latency statistics, a default LinkHealth if None.
+    """
+
+    def __init__(self, client, poll_interval=10.0, ttl=5.0, health=None):
+        self.client = client
+        self.poll_interval = poll_interval
+        self.ttl = ttl
+        self.health = health or LinkHealth()
+        self.mode = None
+        self.recording = None
+        self.view = None
+        self.connected = None
+        self.last_seen = None
+        self.link = None
+        self._status_at = None  # time.monotonic() of the last status read
+        self._listeners = []
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def subscribe(self, callback):
+        """
+        Registers a change listener.
+
+        Args:
+            callback (callable): callback(changes) with a dict of the changed
+                fields and their new values. Called from the thread that saw the
+                change; GUI listeners must hand it over to the Tk thread.
+        """
+
+        self._listeners.append(callback)
+
+    def snapshot(self):
+        """All fields as a dict."""
+
+        with self._lock:
+            return {name: getattr(self, name) for name in FIELDS}
+
+    def update(self, **fields):
+        """
+        Stores known values (e.g. after our own command succeeded) and notifies listeners.
+
+        A successful exchange also proves the device is reachable, so
+        connected=True implies last_seen=now.
+        """
+
+        if fields.get("connected"):
+            fields.setdefault("last_seen", time.time())
+        if "mode" in fields and "recording" not in fields and fields["mode"] is not None:
+            fields["recording"] = fields["mode"] == dashcam.MODE_RECORDING
+        with self._lock:
+            if "mode" in fields:
+                self._status_at = time.monotonic()
+            changes = {}
+            for name, value in fields.items():
+                if getattr(self, name) != value:
+                    setattr(self, name, value)
+                    changes[name] = value
+        # last_seen changes on every success; only report it with real changes
+        if changes and set(changes) != {"last_seen"}:
+            for callback in list(self._listeners):
+                try:
+                    callback(changes)
+                except Exception as e:
+                    print(f"Device state listener failed: {e}")
+
+    def refresh(self, priority=None, timeout=None):
+        """
+        Reads the status from the device now and records the link health. Blocking.
+
+        Args:
+            priority (int): Governor priority class of the read.
+            timeout (float): Overrides the command timeout.
+
+        Returns:
+            dict: snapshot() after the read.
+
+        Raises:
+            DeviceError: The device did not answer; connected is set to False.
+        """
+
+        started = time.monotonic()
+        try:
+            value = dashcam.read_status(self.client, priority=priority, timeout=timeout)
+        except Exception:
+            self._set_link(self.health.record(ok=False), connected=False)
+            raise
+        link = self.health.record(time.monotonic() - started)
+        self._set_link(link, mode=value, connected=True)
+        return self.snapshot()
+
+    def _set_link(self, link, **fields):
+        # Hold queued work while offline instead of letting it fail
+        if link == LINK_OFFLINE:
+            self.client.governor.pause()
+        else:
+            self.client.governor.resume()
+        self.update(link=link, **fields)
+
+    def read(self, name, max_age=None):
+        """
+        Returns a status field, refreshing it first if the cache is older than the TTL. Blocking.
+
+        Args:
+            name (str): "mode" or "recording".
+            max_age (float): Overrides the TTL; 0 forces a read.
+
+        Returns:
+            The field value.
+        """
+
+        max_age = self.ttl if max_age is None else max_age
+        with self._lock:
+            fresh = self._status_at is not None and time.monotonic() - self._status_at <= max_age
+        if not fresh:
+            self.refresh()
+        return getattr(self, name)
+
+    def start(self):
+        """Starts the background poller (once)."""
+
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._poll, name="device-state", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def _poll(self):
+        # Normal interval while healthy, exponential backoff while reconnecting
+        while not self._stop.wait(self.health.next_delay(self.poll_interval)):
+            with self._lock:
+                age = None if self._status_at is None else time.monotonic() - self._status_at
+            if self.link != LINK_OFFLINE and age is not None and age < self.poll_interval:
+                continue  # Someone else read the status recently
+            try:
+                # The probe passes the governor even while it holds back other work
+                self.refresh(priority=PRIORITY_CONTROL, timeout=PROBE_TIMEOUT)
+            except Exception as e:
+                print(f"Device status poll failed: {e}")
@@ -0,0 +1,236 @@
+'''
+Resumable, multi-connection downloader for files on the dashcam.
+
+A file is split into byte ranges fetched in parallel with HTTP Range requests
+and written straight into a preallocated "<name>.part" file. Progress of every
+range is kept in a "<name>.part.json" sidecar, so a download interrupted by a
+Wi-Fi drop resumes where it stopped on the next attempt.
+'''
+import json
+import os
+import threading
+import time
+
+import requests
+
+from device import DeviceError
+
+PART_SUFFIX = ".part"
+STATE_SUFFIX = ".part.json"
+
+
+class DownloadCancelled(Exception):
+    """Raised when a download is stopped through its cancel event."""
+
+
+class DownloadManager:
+    """
+    Downloads device files over several ranged connections.
+
+    Args:
+        client (DeviceClient): Shared device client.
+        connections (int): Parallel connections per file.
+        block_size (int): Read size per network read (bytes).
+        segment_retries (int): Attempts per range before the download fails.
+        state_interval (float): Seconds between sidecar state saves.
+    """
+
+    def __init__(self, client, connections=3, block_size=256 * 1024,
+                 segment_retries=5, state_interval=1.0):
+        self.client = client
+        self.connections = max(1, connections)
+        self.block_size = block_size
+        self.segment_retries = segment_retries
+        self.state_interval = state_interval
+
+    def download(self, filepath, dest_dir, size=None, progress=None, cancel_event=None,
+                 overwrite=False):
+        """
+        Downloads one device file, resuming a previous partial download.
+
+        Args:
+            filepath (str): FPATH of the file (A:\\...).
+            dest_dir (str): Local directory to store the file in, created if missing.
+            size (int): File size in bytes from the listing, probed if None.
+            progress (callable): Called as progress(done, total, bytes_per_sec).
+            cancel_event (threading.Event): Set to stop the download.
+            overwrite (bool): Fetch the file even if a copy of the same size
+                exists; the copy is replaced only once the download completes.
+
+        Returns:
+            dict: path, bytes, transferred (bytes fetched this run), seconds, rate.
+        """
+
+        url = self.client.file_url(filepath)
+        dest = os.path.join(dest_dir, filepath.replace("\\", "/").rsplit("/", 1)[-1])
+        part_path = dest + PART_SUFFIX
+        state_path = dest + STATE_SUFFIX
+        os.makedirs(dest_dir, exist_ok=True)
+        if size is None:
+            size = self._probe_size(url)
+        if size == 0:
+            # Nothing to fetch (e.g. an aborted recording); no ranges to split
+            with open(part_path, "wb"):
+                pass
+            os.replace(part_path, dest)
+            if os.path.exists(state_path):
+                os.remove(state_path)
+            return {"path": dest, "bytes": 0, "transferred": 0, "seconds": 0.0, "rate": 0.0}
+
+        state = self._load_state(state_path, url, size)
+        if state is None:
+            if not overwrite and os.path.exists(dest) and os.path.getsize(dest) == size:
+                return {"path": dest, "bytes": size, "transferred": 0, "seconds": 0.0, "rate": 0.0}
+            state = {"url": url, "size": size, "segments": self._split(size)}
+            # Preallocate the whole file so every range can be written in place
+            with open(part_path, "wb") as f:
+                f.truncate(size)
+            self._save_state(state_path, state)
+        elif not os.path.exists(part_path):
+            with open(part_path, "wb") as f:
+                f.truncate(size)
+            state["segments"] = self._split(size)
+
+        lock = threading.Lock()
+        errors = []
+        started = time.monotonic()
+        done_at_start = self._done_bytes(state)
+        last_save = [started]
+
+        def report():
+            # Caller holds the lock
+            now = time.monotonic()
+            if now - last_save[0] >= self.state_interval:
+                self._save_state(state_path, state)
+                last_save[0] = now
+            if progress:
+                done = self._done_bytes(state)
+                elapsed = max(now - started, 1e-6)
+                progress(done, size, (done - done_at_start) / elapsed)
+
+        def worker(segment):
+            try:
+                self._fetch_segment(url, part_path, segment, lock, report, cancel_event)
+            except Exception as e:
+                errors.append(e)
+
+        pending = [seg for seg in state["segments"] if seg[2] < seg[1]]
+        threads = [threading.Thread(target=worker, args=(seg,), daemon=True) for seg in pending]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        with lock:
+            self._save_state(state_path, state)
+        if errors:
+            if any(isinstance(e, DownloadCancelled) for e in errors):
+                raise DownloadCancelled(filepath)
+            raise errors[0]
+
+        os.replace(part_path, dest)
+        os.remove(state_path)
+        seconds = time.monotonic() - started
+        transferred = size - done_at_start
+        return {
+            "path": dest,
+            "bytes": size,
+            "transferred": transferred,
+            "seconds": seconds,
+            "rate": transferred / seconds if seconds > 0 else 0.0,
+        }
+
+    def _split(self, size):
+        """Splits [0, size) into [start, end, next_offset] ranges, end exclusive; size > 0."""
+
+        count = self.connections if size >= self.connections * self.block_size else 1
+        step = -(-size // count)
+        return [[start, min(start + step, size), start] for start in range(0, size, step)]
+
+    @staticmethod
+    def _done_bytes(state):
+        return sum(seg[2] - seg[0] for seg in state["segments"])
+
+    def _probe_size(self, url):
+        """Reads the total size from a one-byte ranged request."""
+
+        try:
+            response = self.client.open_stream(url, headers={"Range": "bytes=0-0"})
+        except DeviceError as e:
+            # An empty file has no byte 0: 416 with "Content-Range: bytes */0"
+            failed = getattr(e.__cause__, "response", None)
+            if failed is not None and failed.status_code == 416 and \
+                    failed.headers.get("Content-Range", "").endswith("/0"):
+                return 0
+            raise
+        try:
+            content_range = response.headers.get("Content-Range", "")
+            if response.status_code == 206 and "/" in content_range:
+                return int(content_range.rsplit("/", 1)[1])
+            return int(response.headers["Content-Length"])
+        except (KeyError, ValueError) as e:
+            raise DeviceError(f"Cannot determine size of {url}") from e
+        finally:
+            response.close()
+
+    def _fetch_segment(self, url, part_path, segment, lock, report, cancel_event):
+        """Fetches one range into the part file, retrying from its current offset."""
+
+        failures = 0
+        # Unbuffered, so bytes recorded in the state file are already on disk
+        with open(part_path, "r+b", buffering=0) as f:
+            while segment[2] < segment[1]:
+                if cancel_event is not None and cancel_event.is_set():
+                    raise DownloadCancelled(url)
+                offset = segment[2]
+                headers = {"Range": f"bytes={offset}-{segment[1] - 1}"}
+                try:
+                    response = self.client.open_stream(url, headers=headers)
+                    try:
+                        if response.status_code != 206:
+                            if segment[2] != 0:
+                                raise DeviceError(f"Range requests not supported by {url}")
+                            # Server ignored Range; only usable for a single full-file range
+                            if segment[1] != int(response.headers.get("Content-Length", -1)):
+                                raise DeviceError(f"Range requests not supported by {url}")
+                        f.seek(segment[2])
+                        for block in response.iter_content(self.block_size):
+                            if cancel_event is not None and cancel_event.is_set():
+                                raise DownloadCancelled(url)
+                            block = block[:segment[1] - segment[2]]
+                            f.write(block)
+                            with lock:
+                                segment[2] += len(block)
+                                report()
+                            if segment[2] >= segment[1]:
+                                break
+                    finally:
+                        response.close()
+                    if segment[2] < segment[1]:
+                        raise DeviceError(f"Connection closed early at byte {segment[2]}")
+                except (DeviceError, requests.exceptions.RequestException) as e:
+                    # Only consecutive attempts without progress count as failures
+                    failures = failures + 1 if segment[2] == offset else 1
+                    if failures >= self.segment_retries:
+                        raise
+                    print(f"Download range retry ({failures}): {e}")
+                    time.sleep(min(0.5 * (2 ** failures), 10))
+
+    @staticmethod
+    def _load_state(state_path, url, size):
+        try:
+            with open(state_path, "r", encoding="utf-8") as f:
+                state = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if state.get("url") != url or state.get("size") != size:
+            # File changed on the device since the partial download; start over
+            return None
+        return state
+
+    @staticmethod
+    def _save_state(state_path, state):
+        tmp_path = state_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(state, f)
+        os.replace(tmp_path, state_path)
@@ -0,0 +1,586 @@
+'''
+Local emulator of the Novatek dashcam HTTP interface.
+
+Implements the command surface the toolbox uses, so the app, the CLI and
+performance experiments can run without a camera:
+
+    python emulator.py --clips 2000 --latency 0.05 --bandwidth 2M --max-concurrency 4
+    DB5_DEVICE_URL=http://127.0.0.1:8254 python main.py
+
+Supported: cmd=3015 listing, 4002 previews, 4003 delete, 3037 status, 3016
+heartbeat, 2001 record, 3001 mode, 3005/3006 date and time, 3028 camera view,
+2019 live view links, 1001 take picture, 3003/3004/3018 Wi-Fi, plain file GETs
+with Range, and the MJPEG live view at /liveview.mjpg. The card is synthetic
+(sizes and contents are generated, not stored), so cards of any size cost no
+disk or memory; with --clip every video file serves the bytes of a real MP4
+instead, for the MP4 index readers. Knobs emulate the weaknesses of the real
+firmware: per-request latency, a shared bandwidth cap, a limit of concurrently
+served requests (extra requests stall, as on the device) and dropped
+connections.
+'''
+import argparse
+import base64
+import random
+import re
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime
+from functools import lru_cache
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, unquote, urlsplit
+from xml.sax.saxutils import escape
+
+# cmd=3037 values, see dashcam.MODE_*
+MODE_RECORDING_IDLE = 0
+MODE_RECORDING = 1
+MODE_REVIEW = 3
+MODE_PHOTO = 4
+# cmd=3001 par -> mode
+MODE_PARS = {"0": MODE_PHOTO, "1": MODE_RECORDING_IDLE, "2": MODE_REVIEW}
+
+ATTR_NORMAL = 32
+ATTR_READ_ONLY = 33
+
+STATUS_OK = "0"
+STATUS_FAIL = "-1"
+STATUS_UNKNOWN_COMMAND = "-256"
+
+CHUNK_SIZE = 64 * 1024
+
+# Served as preview when Pillow is not installed (160x90 grey JPEG)
+FALLBACK_JPEG = base64.b64decode(
+    "/9j/4AAQSkZJRgABAQAAAQABAAD/2wBDABALDA4MChAODQ4SERATGCgaGBYWGDEjJR0oOjM9PDkzODdASFxOQERXRTc4UG1RV19iZ2hnPk1xeXBkeFxlZ2P/2wBDARESEhgVGC8aGi9jQjhCY2NjY2NjY2NjY2NjY2NjY2NjY2NjY2NjY2NjY2NjY2NjY2NjY2NjY2NjY2NjY2NjY2P/wAARCABaAKADASIAAhEBAxEB/8QAHwAAAQUBAQEBAQEAAAAAAAAAAAECAwQFBgcICQoL/8QAtRAAAgEDAwIEAwUFBAQAAAF9AQIDAAQRBRIhMUEGE1FhByJxFDKBkaEII0KxwRVS0fAkM2JyggkKFhcYGRolJicoKSo0NTY3ODk6Q0RFRkdISUpTVFVWV1hZWmNkZWZnaGlqc3R1dnd4eXqDhIWGh4iJipKTlJWWl5iZmqKjpKWmp6ipqrKztLW2t7i5usLDxMXGx8jJytLT1NXW19jZ2uHi4+Tl5ufo6erx8vP09fb3+Pn6/8QAHwEAAwEBAQEBAQEBAQAAAAAAAAECAwQFBgcICQoL/8QAtREAAgECBAQDBAcFBAQAAQJ3AAECAxEEBSExBhJBUQdhcRMiMoEIFEKRobHBCSMzUvAVYnLRChYkNOEl8RcYGRomJygpKjU2Nzg5OkNERUZHSElKU1RVVldYWVpjZGVmZ2hpanN0dXZ3eHl6goOEhYaHiImKkpOUlZaXmJmaoqOkpaanqKmqsrO0tba3uLm6wsPExcbHyMnK0tPU1dbX2Nna4uPk5ebn6Onq8vP09fb3+Pn6/9oADAMBAAIRAxEAPwDk6KKKACiiigAooooAKKKKACiiigAooooAKKKKACiiigAooooAKKKKACiiigAooooAKKKKACiiigAooooAKKKKACiiigAooooAKKKKACiiigAooooAKKKKACiiigAooooAKKKKACiiigAooooAKKKKACiiigAooooAKKKKACiiigAooooAKKKKACiiigAooooAKKKKACiiigAooooAKKKKACiiigAooooAKKKKACiiigAooooAKKKKACiiigAooooAKKKKACiiigAooooAKKKKACiiigAooooAKKKKACiiigAooooAKKKKACiiigAooooA/9k=")
+
+
+class EmulatedFile:
+    """One synthetic file on the emulated card."""
+
+    __slots__ = ("name", "fpath", "size", "time", "attr", "seed", "data")
+
+    def __init__(self, name, fpath, size, time, attr=ATTR_NORMAL, seed=0, data=None):
+        self.name = name
+        self.fpath = fpath
+        self.size = len(data) if data is not None else size
+        self.time = time
+        self.attr = attr
+        self.seed = seed
+        self.data = data  # Real contents, None for generated bytes
+
+
+class SyntheticCard:
+    """
+    Generated card contents: front/rear clip pairs in loop-recording order,
+    with some clips locked in the event folder.
+
+    Args:
+        clips (int): Number of recording slots (each has a front and a rear file).
+        clip_bytes (int): Size of a front clip; rear clips are half as big.
+        clip_seconds (int): Length of one clip, i.e. time between two slots.
+        start (datetime): Time of the first clip, defaults to clips * clip_seconds ago.
+        event_every (int): Every n-th slot is an event clip (0 for none).
+        folder (str): Root folder on the card.
+        seed (int): Seed of the generated contents.
+        clip (bytes): MP4 served as the contents of every clip, overriding clip_bytes.
+    """
+
+    def __init__(self, clips=200, clip_bytes=100 * 1024 * 1024, clip_seconds=60, start=None,
+                 event_every=25, folder="Novatek", seed=0, clip=None):
+        self.folder = folder
+        self.files = {}  # FPATH -> EmulatedFile, in card order
+        self._lock = threading.Lock()
+        self._photos = 0
+        rng = random.Random(seed)
+        start = start or datetime.now() - timedelta(seconds=clips * clip_seconds)
+        for slot in range(clips):
+            stamp = start + timedelta(seconds=slot * clip_seconds)
+            event = event_every and slot % event_every == event_every - 1
+            subdir = "RO" if event else "Movie"
+            for suffix, size in (("F", clip_bytes), ("R", clip_bytes // 2)):
+                name = stamp.strftime(f"%Y_%m%d_%H%M%S_{suffix}.MP4")
+                # Real clip sizes vary with the scene
+                size = int(size * rng.uniform(0.9, 1.1))
+                self.add(EmulatedFile(
+                    name, f"A:\\{folder}\\{subdir}\\{name}", size, stamp,
+                    ATTR_READ_ONLY if event else ATTR_NORMAL, rng.getrandbits(32), clip))
+
+    def add(self, file):
+        with self._lock:
+            self.files[file.fpath] = file
+
+    def remove(self, fpath):
+        """Deletes a file; False if it does not exist or is read-only."""
+
+        with self._lock:
+            file = self.files.get(fpath)
+            if file is None or file.attr == ATTR_READ_ONLY:
+                return False
+            del self.files[fpath]
+            return True
+
+    def get(self, fpath):
+        with self._lock:
+            return self.files.get(fpath)
+
+    def find_url_path(self, url_path):
+        """Looks a file up by its HTTP path."""
+
+        return self.get("A:" + url_path.replace("/", "\\"))
+
+    def take_photo(self, when):
+        """Adds a photo file and returns it."""
+
+        self._photos += 1
+        name = when.strftime(f"%Y_%m%d_%H%M%S_{self._photos:03d}.JPG")
+        photo = EmulatedFile(name, f"A:\\{self.folder}\\Photo\\{name}",
+                             random.randint(800_000, 1_500_000), when, seed=self._photos)
+        self.add(photo)
+        return photo
+
+    def listing_xml(self):
+        """cmd=3015 answer for the current contents."""
+
+        with self._lock:
+            files = list(self.files.values())
+        parts = ['<?xml version="1.0" encoding="UTF-8" ?>\n<LIST>\n']
+        for f in files:
+            parts.append(
+                f"<ALLFile><File>\n<NAME>{escape(f.name)}</NAME>\n<FPATH>{escape(f.fpath)}</FPATH>\n"
+                f"<SIZE>{f.size}</SIZE>\n<TIMECODE>{int(f.time.timestamp())}</TIMECODE>\n"
+                f"<TIME>{f.time.strftime('%Y/%m/%d %H:%M:%S')}</TIME>\n<ATTR>{f.attr}</ATTR></File>\n</ALLFile>\n")
+        parts.append("</LIST>\n")
+        return "".join(parts).encode("utf-8")
+
+
+@lru_cache(maxsize=64)
+def _pattern(seed):
+    return random.Random(seed).randbytes(CHUNK_SIZE)
+
+
+def file_bytes(file, start, end):
+    """
+    Generated contents of a file between two offsets.
+
+    Args:
+        file (EmulatedFile): The file.
+        start (int): First byte.
+        end (int): Last byte (inclusive).
+
+    Yields:
+        bytes: Chunks of at most CHUNK_SIZE bytes, identical for every request.
+    """
+
+    if file.data is not None:
+        for position in range(start, end + 1, CHUNK_SIZE):
+            yield file.data[position:min(position + CHUNK_SIZE, end + 1)]
+        return
+    pattern = _pattern(file.seed)
+    position = start
+    while position <= end:
+        offset = position % CHUNK_SIZE
+        length = min(CHUNK_SIZE - offset, end - position + 1)
+        yield pattern[offset:offset + length]
+        position += length
+
+
+@lru_cache(maxsize=256)
+def _preview_jpeg(name, seed):
+    try:
+        from PIL import Image, ImageDraw
+    except ImportError:
+        return FALLBACK_JPEG
+    rng = random.Random(seed)
+    img = Image.new("RGB", (640, 360), tuple(rng.randrange(40, 200) for _ in range(3)))
+    ImageDraw.Draw(img).text((20, 20), name, fill=(255, 255, 255))
+    from io import BytesIO
+    buf = BytesIO()
+    img.save(buf, format="JPEG", quality=80)
+    return buf.getvalue()
+
+
+# Multipart boundary of the live view, as sent by the firmware
+LIVE_BOUNDARY = "arflebarfle"
+
+
+def _live_jpeg(text, phase):
+    """One live view frame: the device clock and a bar moving once a second."""
+
+    try:
+        from PIL import Image, ImageDraw
+    except ImportError:
+        return FALLBACK_JPEG
+    from io import BytesIO
+    img = Image.new("RGB", (640, 360), (30, 60, 90))
+    draw = ImageDraw.Draw(img)
+    x = int(phase * 600)
+    draw.rectangle((x, 300, x + 40, 340), fill=(230, 230, 60))
+    draw.text((20, 20), text, fill=(255, 255, 255))
+    buf = BytesIO()
+    img.save(buf, format="JPEG", quality=70)
+    return buf.getvalue()
+
+
+class Throttle:
+    """
+    Token bucket shared by all connections.
+
+    Args:
+        rate (float): Bytes per second, None for unlimited.
+    """
+
+    def __init__(self, rate=None):
+        self.rate = rate
+        self._lock = threading.Lock()
+        self._next = time.monotonic()
+
+    def consume(self, size):
+        """Blocks until size bytes may be sent."""
+
+        if not self.rate:
+            return
+        with self._lock:
+            now = time.monotonic()
+            self._next = max(self._next, now) + size / self.rate
+            delay = self._next - now - size / self.rate
+        if delay > 0:
+            time.sleep(delay)
+
+
+class DashcamEmulator:
+    """
+    HTTP server emulating one dashcam.
+
+    Args:
+        card (SyntheticCard): Card contents, a default card if None.
+        host (str): Address to listen on.
+        port (int): Port, 0 for any free port.
+        latency (float): Seconds added to every request, half on the way in and
+            half on the way out, like a network round trip.
+        jitter (float): Random extra latency, up to this many seconds.
+        bandwidth (float): Bytes per second shared by all responses, None for unlimited.
+        max_concurrency (int): Requests served at once; more requests wait
+            (the real firmware stalls the same way). None for unlimited.
+        drop_rate (float): Probability (0-1) that a request's connection is
+            dropped, either before the answer or halfway through the body.
+        strict_modes (bool): Reject previews outside review mode, like the firmware.
+        seed (int): Seed of the fault injection.
+        live_fps (float): Frame rate of the live view stream.
+    """
+
+    def __init__(self, card=None, host="127.0.0.1", port=0, latency=0.0, jitter=0.0,
+                 bandwidth=None, max_concurrency=None, drop_rate=0.0, strict_modes=True, seed=0,
+                 live_fps=15):
+        self.card = card or SyntheticCard()
+        self.latency = latency
+        self.jitter = jitter
+        self.throttle = Throttle(bandwidth)
+        self.slots = threading.BoundedSemaphore(max_concurrency) if max_concurrency else None
+        self.drop_rate = drop_rate
+        self.strict_modes = strict_modes
+        self.random = random.Random(seed)
+        self.live_fps = live_fps
+        self.stopped = threading.Event()
+        # Device state
+        self.mode = MODE_RECORDING
+        self.view = 2
+        self.clock_offset = timedelta()
+        self.wifi = {"ssid": "DB5_EMULATOR", "password": "12345678"}
+        self.requests = 0
+
+        # Each emulator gets its own handler class pointing back at it
+        handler = type("Handler", (EmulatorHandler,), {"emulator": self})
+        self.server = ThreadingHTTPServer((host, port), handler)
+        self.server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def base_url(self):
+        """URL to use as the device base URL (e.g. DB5_DEVICE_URL)."""
+
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        """Serves on a background thread; returns base_url."""
+
+        self._thread = threading.Thread(target=self.server.serve_forever, name="emulator", daemon=True)
+        self._thread.start()
+        return self.base_url
+
+    def stop(self):
+        self.stopped.set()  # Ends open live view streams
+        self.server.shutdown()
+        self.server.server_close()
+
+    def device_time(self):
+        return datetime.now() + self.clock_offset
+
+    def command(self, cmd, params):
+        """
+        Runs a ?custom=1&cmd=... command.
+
+        Returns:
+            tuple: (status, extra XML inside <Function>, or a complete XML body)
+        """
+
+        par = params.get("par")
+        value = params.get("str")
+        if cmd == "3016":
+            return STATUS_OK, ""
+        if cmd == "3037":
+            return STATUS_OK, f"<Value>{self.mode}</Value>"
+        if cmd == "2001":
+            if self.mode not in (MODE_RECORDING_IDLE, MODE_RECORDING) or par not in ("0", "1"):
+                return STATUS_FAIL, ""
+            self.mode = MODE_RECORDING if par == "1" else MODE_RECORDING_IDLE
+            return STATUS_OK, ""
+        if cmd == "3001":
+            if par not in MODE_PARS:
+                return STATUS_FAIL, ""
+            self.mode = MODE_PARS[par]
+            return STATUS_OK, ""
+        if cmd in ("3005", "3006"):
+            return self._set_clock(cmd, value)
+        if cmd == "3028":
+            if par not in ("0", "1", "2"):
+                return STATUS_FAIL, ""
+            self.view = int(par)
+            return STATUS_OK, ""
+        if cmd == "2019":
+            host = self.server.server_address[0]
+            return STATUS_OK, (f"<MovieLiveViewLink>rtsp://{host}/xxx.mov</MovieLiveViewLink>"
+                               f"<PhotoLiveViewLink>{self.base_url}/liveview.mjpg</PhotoLiveViewLink>")
+        if cmd == "1001":
+            if self.mode != MODE_PHOTO:
+                return STATUS_FAIL, ""
+            photo = self.card.take_photo(self.device_time())
+            return STATUS_OK, f"<File><NAME>{escape(photo.name)}</NAME><FPATH>{escape(photo.fpath)}</FPATH></File>"
+        if cmd == "4003":
+            return (STATUS_OK if value and self.card.remove(unquote(value)) else STATUS_FAIL), ""
+        if cmd == "3003" and value:
+            self.wifi["ssid"] = value
+            return STATUS_OK, ""
+        if cmd == "3004" and value:
+            self.wifi["password"] = value
+            return STATUS_OK, ""
+        if cmd == "3018":
+            return STATUS_OK, ""
+        return STATUS_UNKNOWN_COMMAND, ""
+
+    def _set_clock(self, cmd, value):
+        try:
+            now = self.device_time()
+            if cmd == "3005":
+                day = datetime.strptime(value, "%Y-%m-%d")
+                target = now.replace(year=day.year, month=day.month, day=day.day)
+            else:
+                clock = datetime.strptime(value, "%H:%M:%S")
+                target = now.replace(hour=clock.hour, minute=clock.minute, second=clock.second,
+                                     microsecond=0)
+        except (TypeError, ValueError):
+            return STATUS_FAIL, ""
+        self.clock_offset = target - datetime.now()
+        return STATUS_OK, ""
+
+
+class EmulatorHandler(BaseHTTPRequestHandler):
+    """Request handler; the server's DashcamEmulator is set as a class attribute."""
+
+    protocol_version = "HTTP/1.1"
+    emulator = None
+    reply_delay = 0
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        emu = self.emulator
+        emu.requests += 1
+        if emu.slots:
+            emu.slots.acquire()
+        try:
+            delay = emu.latency + (emu.random.uniform(0, emu.jitter) if emu.jitter else 0)
+            # The other half is slept in send_response(), after the command ran
+            self.reply_delay = delay / 2
+            if delay:
+                time.sleep(delay / 2)
+            drop = emu.drop_rate and emu.random.random() < emu.drop_rate
+            if drop and emu.random.random() < 0.5:
+                # Connection lost before any answer
+                self.close_connection = True
+                return
+            self._dispatch(drop)
+        except (BrokenPipeError, ConnectionResetError):
+            self.close_connection = True
+        finally:
+            if emu.slots:
+                emu.slots.release()
+
+    def send_response(self, code, message=None):
+        if self.reply_delay:
+            time.sleep(self.reply_delay)
+        super().send_response(code, message)
+
+    def date_time_string(self, timestamp=None):
+        # Like the firmware: the device clock, labeled GMT
+        return format_datetime(self.emulator.device_time().replace(tzinfo=timezone.utc), usegmt=True)
+
+    def _dispatch(self, drop):
+        emu = self.emulator
+        url = urlsplit(self.path)
+        params = {k: v[0] for k, v in parse_qs(url.query, keep_blank_values=True).items()}
+        # Keep "str" verbatim apart from the URL decoding (parse_qs turns "+" into spaces)
+        raw_str = re.search(r"(?:^|&)str=([^&]*)", url.query)
+        if raw_str:
+            params["str"] = raw_str.group(1)
+        path = url.path.rstrip("/")
+        if params.get("custom") == "1" and "cmd" in params:
+            cmd = params["cmd"]
+            if cmd == "3015":
+                return self._send(200, "text/xml", emu.card.listing_xml(), drop)
+            if cmd == "4002":
+                return self._preview(unquote(path), drop)
+            status, extra = emu.command(cmd, params)
+            body = (f'<?xml version="1.0" encoding="UTF-8" ?>\n<Function>\n<Cmd>{cmd}</Cmd>\n'
+                    f"<Status>{status}</Status>\n{extra}</Function>\n").encode("utf-8")
+            return self._send(200, "text/xml", body, drop)
+        if path == "/liveview.mjpg":
+            return self._live_view()
+        file = emu.card.find_url_path(unquote(path))
+        if file is None:
+            return self._send(404, "text/plain", b"Not Found", drop)
+        self._send_file(file, drop)
+
+    def _status_body(self, cmd, status):
+        return (f'<?xml version="1.0" encoding="UTF-8" ?>\n<Function>\n<Cmd>{cmd}</Cmd>\n'
+                f"<Status>{status}</Status>\n</Function>\n").encode("utf-8")
+
+    def _preview(self, path, drop):
+        emu = self.emulator
+        file = emu.card.find_url_path(path)
+        if file is None or (emu.strict_modes and emu.mode != MODE_REVIEW):
+            return self._send(200, "text/xml", self._status_body("4002", STATUS_FAIL), drop)
+        self._send(200, "image/jpeg", _preview_jpeg(file.name, file.seed), drop)
+
+    def _live_view(self):
+        """Streams multipart MJPEG frames until the client leaves."""
+
+        emu = self.emulator
+        self.send_response(200)
+        self.send_header("Content-Type", f"multipart/x-mixed-replace; boundary={LIVE_BOUNDARY}")
+        self.send_header("Connection", "close")
+        self.end_headers()
+        self.close_connection = True
+        interval = 1 / emu.live_fps
+        next_frame = time.monotonic()
+        while not emu.stopped.is_set():
+            now = emu.device_time()
+            jpeg = _live_jpeg(now.strftime("%Y-%m-%d %H:%M:%S.%f")[:-3], now.microsecond / 1e6)
+            part = (f"--{LIVE_BOUNDARY}\r\nContent-Type: image/jpeg\r\n"
+                    f"Content-Length: {len(jpeg)}\r\n\r\n").encode("ascii") + jpeg + b"\r\n"
+            emu.throttle.consume(len(part))
+            self.wfile.write(part)
+            self.wfile.flush()
+            next_frame = max(next_frame + interval, time.monotonic())
+            time.sleep(max(0, next_frame - time.monotonic()))
+
+    def _send(self, code, content_type, body, drop):
+        self.send_response(code)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        if drop:
+            body = body[:len(body) // 2]
+            self.close_connection = True
+        for i in range(0, len(body), CHUNK_SIZE):
+            chunk = body[i:i + CHUNK_SIZE]
+            self.emulator.throttle.consume(len(chunk))
+            self.wfile.write(chunk)
+
+    def _send_file(self, file, drop):
+        start, end = 0, file.size - 1
+        code = 200
+        match = re.match(r"bytes=(\d*)-(\d*)$", self.headers.get("Range", ""))
+        if match and (match.group(1) or match.group(2)):
+            if match.group(1):
+                start = int(match.group(1))
+                end = min(int(match.group(2)), file.size - 1) if match.group(2) else file.size - 1
+            else:  # Suffix range: the last n bytes
+                start = max(0, file.size - int(match.group(2)))
+            if start >= file.size or start > end:
+                self.send_response(416)
+                self.send_header("Content-Range", f"bytes */{file.size}")
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return
+            code = 206
+        self.send_response(code)
+        self.send_header("Content-Type", "video/mp4")
+        self.send_header("Accept-Ranges", "bytes")
+        self.send_header("Content-Length", str(end - start + 1))
+        if code == 206:
+            self.send_header("Content-Range", f"bytes {start}-{end}/{file.size}")
+        self.end_headers()
+        if drop:
+            # Connection lost halfway through the body
+            end = start + (end - start) // 2
+            self.close_connection = True
+        for chunk in file_bytes(file, start, end):
+            self.emulator.throttle.consume(len(chunk))
+            self.wfile.write(chunk)
+
+
+def parse_bytes(text):
+    """Parses sizes like 2M, 512K or 1.5G (bytes)."""
+
+    units = {"K": 1024, "M": 1024 ** 2, "G": 1024 ** 3}
+    text = text.strip().upper().rstrip("B")
+    if text and text[-1] in units:
+        return int(float(text[:-1]) * units[text[-1]])
+    return int(float(text))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Emulated Novatek dashcam for testing")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8254)
+    parser.add_argument("--clips", type=int, default=200, help="recording slots (front + rear file each)")
+    parser.add_argument("--clip-size", type=parse_bytes, default=100 * 1024 ** 2, help="front clip size, e.g. 100M")
+    parser.add_argument("--event-every", type=int, default=25, help="every n-th slot is a locked event clip")
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds added to every request")
+    parser.add_argument("--jitter", type=float, default=0.0, help="random extra latency (seconds)")
+    parser.add_argument("--bandwidth", type=parse_bytes, default=None, help="shared cap, bytes/s, e.g. 2M")
+    parser.add_argument("--max-concurrency", type=int, default=None, help="requests served at once")
+    parser.add_argument("--drop-rate", type=float, default=0.0, help="probability of a dropped connection")
+    parser.add_argument("--mode", choices=["record", "photo", "review"], default="record")
+    parser.add_argument("--any-mode-previews", action="store_true",
+                        help="serve previews outside review mode")
+    parser.add_argument("--clip", help="MP4 file served as the contents of every clip")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--live-fps", type=float, default=15, help="frame rate of /liveview.mjpg")
+    args = parser.parse_args(argv)
+
+    clip = None
+    if args.clip:
+        with open(args.clip, "rb") as f:
+            clip = f.read()
+    card = SyntheticCard(clips=args.clips, clip_bytes=args.clip_size,
+                         event_every=args.event_every, seed=args.seed, clip=clip)
+    emulator = DashcamEmulator(
+        card, host=args.host, port=args.port, latency=args.latency, jitter=args.jitter,
+        bandwidth=args.bandwidth, max_concurrency=args.max_concurrency,
+        drop_rate=args.drop_rate, strict_modes=not args.any_mode_previews, seed=args.seed,
+        live_fps=args.live_fps)
+    emulator.mode = {"record": MODE_RECORDING, "photo": MODE_PHOTO, "review": MODE_REVIEW}[args.mode]
+    print(f"Emulated dashcam with {len(card.files)} files at {emulator.base_url}")
+    print(f"Point the toolbox at it with DB5_DEVICE_URL={emulator.base_url}")
+    try:
+        emulator.server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        emulator.server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,199 @@
+'''
+Device-wide request governor.
+
+The dashcam's embedded HTTP server stalls when it gets too many requests at
+once, and its limit differs between models and firmware. Every request to the
+device takes a slot from one RequestGovernor, which:
+
+* adapts the number of slots from observed latency and errors (AIMD: grow by
+  1/limit per fast success, halve on errors or slow answers),
+* hands free slots to control commands first, then interactive requests, then
+  bulk traffic (thumbnails, downloads), and keeps a reserved slot for control
+  commands so buttons never wait behind bulk transfers,
+* coalesces identical in-flight read requests into one, raising the shared
+  request's priority when a more urgent caller joins it,
+* can be paused while the link is offline: queued requests wait instead of
+  failing, and only control traffic (e.g. the health probe) is admitted.
+'''
+import threading
+import time
+from concurrent.futures import Future
+
+# Priority classes, lower runs first
+PRIORITY_CONTROL = 0
+PRIORITY_INTERACTIVE = 1
+PRIORITY_BULK = 2
+
+
+class RequestTicket:
+    """
+    Priority of one request, which a more urgent caller may raise while the
+    request still waits for a slot (see RequestGovernor.raise_priority()).
+    """
+
+    __slots__ = ("priority", "waiting")
+
+    def __init__(self, priority):
+        self.priority = priority
+        self.waiting = False
+
+
+class RequestGovernor:
+    """
+    Adaptive concurrency limiter shared by all device traffic.
+
+    Args:
+        initial_limit (int): Starting number of concurrent requests.
+        min_limit (int): Lower bound of the limit.
+        max_limit (int): Upper bound of the limit.
+        target_latency (float): Time to first byte (seconds) considered healthy.
+        control_reserve (int): Extra slots only control commands may use.
+        decrease_interval (float): Minimum seconds between two decreases, so
+            one burst of failures halves the limit only once.
+    """
+
+    def __init__(self, initial_limit=3, min_limit=1, max_limit=8, target_latency=1.0,
+                 control_reserve=1, decrease_interval=1.0):
+        self.limit = float(initial_limit)
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.target_latency = target_latency
+        self.control_reserve = control_reserve
+        self.decrease_interval = decrease_interval
+        self.in_flight = 0
+        self.paused = False
+        self._waiting = [0, 0, 0]
+        self._last_decrease = 0.0
+        self._cond = threading.Condition()
+        self._coalesce_lock = threading.Lock()
+        self._coalesced = {}  # key -> (Future, RequestTicket)
+
+    def _can_run(self, priority):
+        if self.paused and priority != PRIORITY_CONTROL:
+            return False
+        cap = int(self.limit)
+        if priority == PRIORITY_CONTROL:
+            cap += self.control_reserve
+        if self.in_flight >= cap:
+            return False
+        # Waiters of a more urgent class go first
+        return not any(self._waiting[p] for p in range(priority))
+
+    def acquire(self, priority=PRIORITY_INTERACTIVE):
+        """
+        Blocks until a slot for the given priority class is free.
+
+        Args:
+            priority (int): Priority class, or a RequestTicket whose class
+                may be raised while it waits.
+        """
+
+        ticket = priority if isinstance(priority, RequestTicket) else RequestTicket(priority)
+        with self._cond:
+            self._waiting[ticket.priority] += 1
+            ticket.waiting = True
+            try:
+                while not self._can_run(ticket.priority):
+                    self._cond.wait()
+            finally:
+                self._waiting[ticket.priority] -= 1
+                ticket.waiting = False
+            self.in_flight += 1
+
+    def raise_priority(self, ticket, priority):
+        """
+        Moves a request to a more urgent class; no effect once it has a slot
+        or if it is already at least as urgent.
+
+        Args:
+            ticket (RequestTicket): The request.
+            priority (int): New priority class.
+        """
+
+        with self._cond:
+            if priority >= ticket.priority:
+                return
+            if ticket.waiting:
+                self._waiting[ticket.priority] -= 1
+                self._waiting[priority] += 1
+            ticket.priority = priority
+            self._cond.notify_all()
+
+    def release(self, latency=None, ok=True):
+        """
+        Returns a slot and feeds the outcome into the limit.
+
+        Args:
+            latency (float): Time to first byte of the request, if known.
+            ok (bool): False for connection errors, timeouts and 5xx answers.
+        """
+
+        with self._cond:
+            self.in_flight -= 1
+            if not ok or (latency is not None and latency > 2 * self.target_latency):
+                now = time.monotonic()
+                if now - self._last_decrease >= self.decrease_interval:
+                    self.limit = max(float(self.min_limit), self.limit / 2)
+                    self._last_decrease = now
+            elif latency is not None and latency <= self.target_latency:
+                self.limit = min(float(self.max_limit), self.limit + 1 / self.limit)
+            self._cond.notify_all()
+
+    def pause(self):
+        """Holds back every request except control commands until resume()."""
+
+        with self._cond:
+            self.paused = True
+
+    def resume(self):
+        """Releases the requests held back by pause()."""
+
+        with self._cond:
+            self.paused = False
+            self._cond.notify_all()
+
+    def coalesce(self, key, func, priority=PRIORITY_INTERACTIVE):
+        """
+        Runs func() once for concurrent callers with the same key.
+
+        A caller of a more urgent class joining a request that still waits for
+        a slot raises the request to its class, so it never waits behind bulk
+        traffic.
+
+        Args:
+            key (hashable): Identity of the request (e.g. its URL).
+            func (callable): Performs the request, called as func(ticket);
+                the RequestTicket is what it passes to acquire().
+            priority (int): Priority class of this caller.
+
+        Returns:
+            The shared result of func(); its exception is raised to every caller.
+        """
+
+        with self._coalesce_lock:
+            entry = self._coalesced.get(key)
+            owner = entry is None
+            if owner:
+                entry = (Future(), RequestTicket(priority))
+                self._coalesced[key] = entry
+        future, ticket = entry
+        if not owner:
+            self.raise_priority(ticket, priority)
+            return future.result()
+        try:
+            result = func(ticket)
+            future.set_result(result)
+            return result
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._coalesce_lock:
+                del self._coalesced[key]
+
+    def snapshot(self):
+        """Current limit, in-flight count and waiters per class (for diagnostics)."""
+
+        with self._cond:
+            return {"limit": self.limit, "in_flight": self.in_flight,
+                    "waiting": list(self._waiting), "paused": self.paused}
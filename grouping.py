@@ -0,0 +1,164 @@
+'''
+Front/rear clip pairing and trip grouping.
+
+Dual-channel recording leaves one front ("..._F.MP4") and one rear
+("..._R.MP4") file per loop-recording slot. group_trips() walks the listing
+once in time order: a file joins the previous clip pair when it is the other
+channel of the same slot (same name stem, or start times within
+PAIR_TOLERANCE_SECONDS when the firmware stamped them a second apart), and a
+pair starts a new trip when more than TRIP_GAP_SECONDS passed since the
+previous pair started. Photos and other files become single-file pairs inside
+the trip they were taken in.
+'''
+import re
+from datetime import datetime
+
+# Seconds between the front and rear file of one slot that still count as a pair
+PAIR_TOLERANCE_SECONDS = 2
+# Seconds between two clip starts that split a trip (longer than a 3 minute loop)
+TRIP_GAP_SECONDS = 300
+
+_CLIP_NAME = re.compile(r"^(?P<stem>.+?)_?(?P<channel>[FR])\.(?:MP4|MOV|TS)$", re.IGNORECASE)
+
+
+def clip_channel(filename):
+    """
+    Splits a clip name into its slot stem and channel.
+
+    Args:
+        filename (str): NAME of the file, e.g. "2024_0131_123456_F.MP4".
+
+    Returns:
+        tuple: (stem, "F" or "R"), or (filename, None) for other files.
+    """
+
+    match = _CLIP_NAME.match(filename)
+    if not match:
+        return filename, None
+    return match.group("stem"), match.group("channel").upper()
+
+
+class ClipPair:
+    """
+    Files of one recording slot.
+
+    Attributes:
+        front (FileRecord): Front clip, None if missing.
+        rear (FileRecord): Rear clip, None if missing.
+        other (FileRecord): A file that is not a channel clip (e.g. a photo).
+        timestamp (float): Start time of the earliest file.
+    """
+
+    __slots__ = ("stem", "front", "rear", "other", "timestamp")
+
+    def __init__(self, stem, timestamp):
+        self.stem = stem
+        self.front = None
+        self.rear = None
+        self.other = None
+        self.timestamp = timestamp
+
+    @property
+    def files(self):
+        """The files of the pair, front first."""
+
+        return [f for f in (self.front, self.rear, self.other) if f is not None]
+
+    @property
+    def main(self):
+        """File representing the pair in lists: the front clip if present."""
+
+        return self.front or self.rear or self.other
+
+    @property
+    def secondary(self):
+        """The rear clip when a front clip represents the pair."""
+
+        return self.rear if self.front is not None else None
+
+    @property
+    def filebytes(self):
+        return sum(f.filebytes for f in self.files)
+
+
+class Trip:
+    """
+    Clip pairs recorded without a long break.
+
+    Attributes:
+        pairs (list): ClipPair objects in time order.
+    """
+
+    __slots__ = ("pairs",)
+
+    def __init__(self):
+        self.pairs = []
+
+    @property
+    def start(self):
+        return self.pairs[0].timestamp
+
+    @property
+    def end(self):
+        return self.pairs[-1].timestamp
+
+    @property
+    def files(self):
+        return [f for pair in self.pairs for f in pair.files]
+
+    @property
+    def filebytes(self):
+        return sum(pair.filebytes for pair in self.pairs)
+
+    @property
+    def key(self):
+        """Stable id of the trip (its first file), e.g. for Treeview item ids."""
+
+        return self.pairs[0].main.filepath
+
+    def label(self):
+        """Start - end time of the trip."""
+
+        start = datetime.fromtimestamp(self.start)
+        end = datetime.fromtimestamp(self.end)
+        if start.date() == end.date():
+            return f"{start:%Y/%m/%d %H:%M} - {end:%H:%M}"
+        return f"{start:%Y/%m/%d %H:%M} - {end:%Y/%m/%d %H:%M}"
+
+
+def group_trips(records, gap=TRIP_GAP_SECONDS, pair_tolerance=PAIR_TOLERANCE_SECONDS):
+    """
+    Pairs front/rear clips and groups the pairs into trips, in one pass.
+
+    Args:
+        records (list): FileRecord sorted by timestamp (oldest first), e.g.
+            FileCatalog.sorted("filetime").
+        gap (float): Seconds between two pair starts that begin a new trip.
+        pair_tolerance (float): Seconds between the two channels of one slot.
+
+    Returns:
+        list: Trip objects, oldest first.
+    """
+
+    trips = []
+    trip = None
+    pair = None  # Latest slot with a channel clip, open for its other channel
+    for record in records:
+        stem, channel = clip_channel(record.filename)
+        timestamp = record.timestamp or 0
+        slot = "rear" if channel == "R" else "front"
+        if (channel is not None and pair is not None and getattr(pair, slot) is None
+                and (stem == pair.stem or abs(timestamp - pair.timestamp) <= pair_tolerance)):
+            setattr(pair, slot, record)
+            continue
+        if trip is None or timestamp - trip.end > gap:
+            trip = Trip()
+            trips.append(trip)
+        new_pair = ClipPair(stem, timestamp)
+        if channel is None:
+            new_pair.other = record  # Nothing pairs with a photo
+        else:
+            setattr(new_pair, slot, record)
+            pair = new_pair
+        trip.pairs.append(new_pair)
+    return trips
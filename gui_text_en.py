@@ -67,4 +67,74 @@ TEXTS = {
     "view_unknown": "View Toggle: Unknown cam",
     "dl_light": "Light mode",
     "dl_dark": "Dark mode",
+    "download_btn": "Download",
+    "download_dir_title": "Choose download folder",
+    "download_progress": "Downloading {name}: {pct:.0f}% ({rate:.1f} MB/s)",
+    "download_done": "Download complete: {count} file(s), {rate:.1f} MB/s average",
+    "error_download": "Download failed: ",
+    "virtual_list_on": "Virtual list ON",
+    "virtual_list_off": "Virtual list OFF",
+    "delete_confirmation_multi": "Are you sure you want to delete the {count} selected files ({gb:.2f} GB)?",
+    "delete_progress": "Deleting {done}/{total}...",
+    "delete_summary": "Deleted {count} file(s), {gb:.2f} GB freed",
+    "delete_summary_failed": "{count} file(s) could not be deleted:",
+    "reclaim_btn": "Reclaim space",
+    "reclaim_title": "Reclaim space",
+    "reclaim_prompt": "How much space to free (GB)?\nThe oldest unprotected clips will be deleted",
+    "reclaim_none": "There are no unprotected clips to delete",
+    "reclaim_confirm": "This deletes the {count} oldest files ({gb:.2f} GB)\n{oldest} ~ {newest}\nContinue?",
+    "mirror_btn": "Mirror card",
+    "mirror_dir_title": "Choose archive folder",
+    "mirror_progress": "Mirroring {position}/{count} {name}: {pct:.0f}% ({rate:.1f} MB/s)",
+    "mirror_done": "Mirror complete: {files} file(s) copied ({gb:.2f} GB), {skipped} already up to date",
+    "mirror_failed": "{count} file(s) could not be copied:",
+    "error_mirror": "Mirror failed: ",
+    "link_unknown": "Link: —",
+    "link_ok": "Link: good",
+    "link_degraded": "Link: degraded",
+    "link_offline": "Link: offline, reconnecting...",
+    "link_latency": " ({p50:.0f}/{p90:.0f} ms)",
+    "diag_btn": "Diagnostics",
+    "diag_title": "Diagnostics (per command)",
+    "diag_cmd": "Command",
+    "diag_count": "Count",
+    "diag_errors": "Errors",
+    "diag_avg": "Avg (ms)",
+    "diag_p50": "p50 (ms)",
+    "diag_p90": "p90 (ms)",
+    "diag_p99": "p99 (ms)",
+    "diag_bytes": "Data (MB)",
+    "diag_http": "HTTP status",
+    "diag_status": "Device status",
+    "diag_summary": "Collected for {minutes:.1f} min | link probe p50/p90: {p50}/{p90} ms ({samples} samples, {failures} consecutive failures) | concurrency limit {limit:.1f}, in flight {in_flight}, paused: {paused}",
+    "diag_export_json": "Export JSON",
+    "diag_export_prom": "Export Prometheus",
+    "diag_export_title": "Export metrics",
+    "diag_reset": "Reset",
+    "error_diag_export": "Export failed: ",
+    "diag_stalls": "UI stalls: {count}, p50/p90/max: {p50}/{p90}/{max} ms, worst: {worst}",
+    "scrub_btn": "Scrub preview",
+    "scrub_title": "Scrub preview - {name}",
+    "scrub_loading": "Reading the clip index...",
+    "scrub_progress": "Loading frame {done}/{count}...",
+    "scrub_done": "{count} frames from {kb:.0f} KB ({requests} requests)",
+    "scrub_no_decoder": "Decoding frames needs PyAV: pip install av",
+    "scrub_no_index": "Cannot read the clip index (still recording?): ",
+    "tree_duration_text": "Length",
+    "gps_btn": "Export GPS",
+    "gps_title": "Export GPS track (GPX)",
+    "gps_select": "Select the clips of the trip first",
+    "gps_progress": "Reading GPS {position}/{count}: {name}",
+    "gps_done": "Exported {points} track points from {clips} clip(s)\n{path}",
+    "gps_none": "The selected clips contain no GPS data",
+    "error_gps": "GPS export failed: ",
+    "trip_view_on": "Group trips ON",
+    "trip_view_off": "Group trips OFF",
+    "trip_label": "Trip {label} ({count} clips)",
+    "sync_time_offset": "Device clock offset {offset:+.0f} ms (±{error:.0f} ms), round trip {rtt:.0f} ms",
+    "sync_time_unverified": "The device does not report its clock, not verified (round trip {rtt:.0f} ms)",
+    "live_view_title": "Live view",
+    "live_view_connecting": "Connecting...",
+    "live_view_stats": "Showing {fps:.1f} fps (receiving {received:.1f} fps, {dropped} skipped), latency about {latency} ms",
+    "live_view_ended": "Live view ended",
 }
@@ -67,4 +67,74 @@ TEXTS = {
     "view_unknown": "目前視角：未知",
     "dl_light": "淺色模式",
     "dl_dark": "深色模式",
+    "download_btn": "下載檔案",
+    "download_dir_title": "選擇下載資料夾",
+    "download_progress": "下載中 {name}: {pct:.0f}% ({rate:.1f} MB/s)",
+    "download_done": "下載完成: {count} 個檔案, 平均 {rate:.1f} MB/s",
+    "error_download": "下載失敗: ",
+    "virtual_list_on": "虛擬列表 ON",
+    "virtual_list_off": "虛擬列表 OFF",
+    "delete_confirmation_multi": "您確定要刪除選取的 {count} 個文件 ({gb:.2f} GB) 嗎？",
+    "delete_progress": "正在刪除 {done}/{total}...",
+    "delete_summary": "已刪除 {count} 個文件，釋放 {gb:.2f} GB",
+    "delete_summary_failed": "{count} 個文件刪除失敗:",
+    "reclaim_btn": "釋放空間",
+    "reclaim_title": "釋放空間",
+    "reclaim_prompt": "要釋放多少空間 (GB)？\n將刪除最舊且未受保護的影片",
+    "reclaim_none": "沒有可刪除的未受保護影片",
+    "reclaim_confirm": "將刪除 {count} 個最舊的文件 ({gb:.2f} GB)\n{oldest} ~ {newest}\n確定要刪除嗎？",
+    "mirror_btn": "同步到電腦",
+    "mirror_dir_title": "選擇封存資料夾",
+    "mirror_progress": "同步 {position}/{count} {name}: {pct:.0f}% ({rate:.1f} MB/s)",
+    "mirror_done": "同步完成：傳送 {files} 個文件 ({gb:.2f} GB)，{skipped} 個已是最新",
+    "mirror_failed": "{count} 個文件同步失敗:",
+    "error_mirror": "同步失敗: ",
+    "link_unknown": "連線：—",
+    "link_ok": "連線：良好",
+    "link_degraded": "連線：不穩定",
+    "link_offline": "連線：中斷，自動重新連線中...",
+    "link_latency": " ({p50:.0f}/{p90:.0f} ms)",
+    "diag_btn": "連線診斷",
+    "diag_title": "連線診斷 (各指令統計)",
+    "diag_cmd": "指令",
+    "diag_count": "次數",
+    "diag_errors": "錯誤",
+    "diag_avg": "平均(ms)",
+    "diag_p50": "p50(ms)",
+    "diag_p90": "p90(ms)",
+    "diag_p99": "p99(ms)",
+    "diag_bytes": "流量(MB)",
+    "diag_http": "HTTP 狀態",
+    "diag_status": "設備 Status",
+    "diag_summary": "統計 {minutes:.1f} 分鐘 | 連線探測 p50/p90: {p50}/{p90} ms ({samples} 筆, 連續失敗 {failures}) | 同時請求上限 {limit:.1f}, 進行中 {in_flight}, 暫停: {paused}",
+    "diag_export_json": "匯出 JSON",
+    "diag_export_prom": "匯出 Prometheus",
+    "diag_export_title": "匯出統計資料",
+    "diag_reset": "清除統計",
+    "error_diag_export": "匯出失敗: ",
+    "diag_stalls": "介面卡頓 {count} 次, p50/p90/最長: {p50}/{p90}/{max} ms, 最耗時: {worst}",
+    "scrub_btn": "快速預覽(影片多格畫面)",
+    "scrub_title": "快速預覽 - {name}",
+    "scrub_loading": "讀取影片索引...",
+    "scrub_progress": "載入畫面 {done}/{count}...",
+    "scrub_done": "{count} 格畫面，只讀取了 {kb:.0f} KB ({requests} 次請求)",
+    "scrub_no_decoder": "需要安裝 PyAV 才能解碼影片畫面: pip install av",
+    "scrub_no_index": "無法讀取影片索引(可能仍在錄製中): ",
+    "tree_duration_text": "長度",
+    "gps_btn": "匯出GPS軌跡",
+    "gps_title": "匯出 GPS 軌跡 (GPX)",
+    "gps_select": "請先選取要匯出軌跡的影片",
+    "gps_progress": "讀取 GPS {position}/{count}: {name}",
+    "gps_done": "已匯出 {points} 個軌跡點 ({clips} 段影片)\n{path}",
+    "gps_none": "選取的影片中沒有 GPS 資料",
+    "error_gps": "GPS 軌跡匯出失敗: ",
+    "trip_view_on": "行程分組 ON",
+    "trip_view_off": "行程分組 OFF",
+    "trip_label": "行程 {label} ({count} 段)",
+    "sync_time_offset": "設備時間誤差 {offset:+.0f} ms (±{error:.0f} ms)，連線延遲 {rtt:.0f} ms",
+    "sync_time_unverified": "設備未提供時間，無法驗證 (連線延遲 {rtt:.0f} ms)",
+    "live_view_title": "即時影像",
+    "live_view_connecting": "連線中...",
+    "live_view_stats": "顯示 {fps:.1f} fps (接收 {received:.1f} fps，略過 {dropped} 張)，延遲約 {latency} ms",
+    "live_view_ended": "即時影像已中斷",
 }
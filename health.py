@@ -0,0 +1,127 @@
+'''
+Link health of the dashcam Wi-Fi connection.
+
+LinkHealth keeps a rolling window of probe round-trip times and the number of
+consecutive failed probes, classifies the link as ok / degraded / offline and
+tells the poller when to probe next: the normal interval while the link works,
+exponential backoff (1, 2, 4 ... seconds) while reconnecting.
+'''
+import math
+import threading
+from collections import deque
+
+LINK_OK = "ok"
+LINK_DEGRADED = "degraded"
+LINK_OFFLINE = "offline"
+
+
+def percentile(samples, pct):
+    """
+    Nearest-rank percentile.
+
+    Args:
+        samples (iterable): Values.
+        pct (float): Percentile, 0-100.
+
+    Returns:
+        float: The percentile, or None without samples.
+    """
+
+    ordered = sorted(samples)
+    if not ordered:
+        return None
+    rank = max(1, math.ceil(pct / 100 * len(ordered)))
+    return ordered[min(rank, len(ordered)) - 1]
+
+
+class LinkHealth:
+    """
+    Rolling latency statistics and link classification.
+
+    Args:
+        window (int): Number of recent round-trip samples kept.
+        degraded_latency (float): p90 round-trip (seconds) above which the link is degraded.
+        offline_after (int): Consecutive failed probes before the link is offline.
+        backoff_base (float): First reconnect delay (seconds), doubled per failure.
+        backoff_max (float): Upper bound of the reconnect delay.
+    """
+
+    def __init__(self, window=30, degraded_latency=1.0, offline_after=2,
+                 backoff_base=1.0, backoff_max=30.0):
+        self.samples = deque(maxlen=window)
+        self.degraded_latency = degraded_latency
+        self.offline_after = offline_after
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.failures = 0
+        self._lock = threading.Lock()
+
+    def record(self, latency=None, ok=True):
+        """
+        Feeds one probe result.
+
+        Args:
+            latency (float): Round-trip time in seconds (successful probes).
+            ok (bool): False if the probe failed.
+
+        Returns:
+            str: Link state after this probe.
+        """
+
+        with self._lock:
+            if ok:
+                self.failures = 0
+                if latency is not None:
+                    self.samples.append(latency)
+            else:
+                self.failures += 1
+        return self.state()
+
+    def state(self):
+        """Current link state: LINK_OK, LINK_DEGRADED or LINK_OFFLINE."""
+
+        with self._lock:
+            if self.failures >= self.offline_after:
+                return LINK_OFFLINE
+            if self.failures:
+                return LINK_DEGRADED
+            p90 = percentile(self.samples, 90)
+        if p90 is not None and p90 > self.degraded_latency:
+            return LINK_DEGRADED
+        return LINK_OK
+
+    def stats(self):
+        """
+        Latency percentiles of the window.
+
+        Returns:
+            dict: p50, p90, p99 (seconds, None without samples), samples, failures.
+        """
+
+        with self._lock:
+            samples = list(self.samples)
+            failures = self.failures
+        return {
+            "p50": percentile(samples, 50),
+            "p90": percentile(samples, 90),
+            "p99": percentile(samples, 99),
+            "samples": len(samples),
+            "failures": failures,
+        }
+
+    def next_delay(self, interval):
+        """
+        Seconds until the next probe.
+
+        Args:
+            interval (float): Normal polling interval.
+
+        Returns:
+            float: interval while healthy, the exponential backoff delay after failures.
+        """
+
+        with self._lock:
+            failures = self.failures
+        if not failures:
+            return interval
+        return min(self.backoff_max, self.backoff_base * 2 ** (failures - 1))
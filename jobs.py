@@ -0,0 +1,141 @@
+'''
+Asyncio job engine for device I/O, bridged to the Tk main loop.
+
+An asyncio event loop runs on its own thread next to root.mainloop(). Jobs are
+coroutines or plain blocking callables (run on the loop's thread pool), so any
+number of device operations can be in flight without blocking the window.
+State changes and results are queued and delivered on the Tk thread by a
+root.after() poll, so callbacks may touch widgets freely.
+'''
+import asyncio
+import functools
+import itertools
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+# Job states
+PENDING = "pending"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+
+
+class Job:
+    """
+    Handle of one submitted job.
+
+    Attributes:
+        id (int): Sequence number.
+        name (str): Label for logs and diagnostics.
+        state (str): PENDING, RUNNING, DONE or FAILED (updated on the Tk thread).
+        result: Return value once DONE.
+        error (Exception): Raised exception once FAILED.
+    """
+
+    _ids = itertools.count(1)
+
+    def __init__(self, name):
+        self.id = next(self._ids)
+        self.name = name
+        self.state = PENDING
+        self.result = None
+        self.error = None
+
+    def __repr__(self):
+        return f"Job({self.id}, {self.name!r}, {self.state})"
+
+
+class JobEngine:
+    """
+    Runs jobs on a background asyncio loop and reports back to Tk.
+
+    Args:
+        max_workers (int): Threads available to blocking jobs.
+        poll_ms (int): Interval of the Tk-side result poll.
+    """
+
+    def __init__(self, max_workers=8, poll_ms=20):
+        self.poll_ms = poll_ms
+        self.active = set()  # Jobs not finished yet (Tk thread only)
+        self._callbacks = queue.SimpleQueue()
+        self._tk = None
+        self.loop = asyncio.new_event_loop()
+        self.loop.set_default_executor(
+            ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="job"))
+        threading.Thread(target=self.loop.run_forever, name="job-engine", daemon=True).start()
+
+    def attach(self, tk_root):
+        """Starts delivering job callbacks on the given Tk root's thread."""
+
+        self._tk = tk_root
+        self._poll()
+
+    def _poll(self):
+        while True:
+            try:
+                callback, args = self._callbacks.get_nowait()
+            except queue.Empty:
+                break
+            try:
+                callback(*args)
+            except Exception as e:
+                print(f"Job callback failed: {e}")
+        self._tk.after(self.poll_ms, self._poll)
+
+    def _post(self, callback, *args):
+        self._callbacks.put((callback, args))
+
+    def submit(self, func, *args, name=None, on_done=None, on_error=None, on_state=None):
+        """
+        Schedules a job. Call from the Tk thread.
+
+        Args:
+            func (callable): Coroutine function, or blocking function run on a worker thread.
+            *args: Arguments for func.
+            name (str): Label, defaults to func's name.
+            on_done (callable): on_done(result), called on the Tk thread.
+            on_error (callable): on_error(exception), called on the Tk thread.
+            on_state (callable): on_state(job), called on the Tk thread at every state change.
+
+        Returns:
+            Job: Handle whose state follows the job.
+        """
+
+        job = Job(name or getattr(func, "__name__", "job"))
+        self.active.add(job)
+        if on_state:
+            on_state(job)
+        asyncio.run_coroutine_threadsafe(
+            self._run(job, func, args, on_done, on_error, on_state), self.loop)
+        return job
+
+    async def _run(self, job, func, args, on_done, on_error, on_state):
+        self._post(self._set_state, job, RUNNING, on_state)
+        try:
+            if asyncio.iscoroutinefunction(func):
+                result = await func(*args)
+            else:
+                result = await self.loop.run_in_executor(None, functools.partial(func, *args))
+        except Exception as e:
+            self._post(self._finish, job, FAILED, None, e, on_error, on_state)
+        else:
+            self._post(self._finish, job, DONE, result, None, on_done, on_state)
+
+    def _set_state(self, job, state, on_state):
+        if job.state == PENDING:
+            job.state = state
+            if on_state:
+                on_state(job)
+
+    def _finish(self, job, state, result, error, callback, on_state):
+        job.state = state
+        job.result = result
+        job.error = error
+        self.active.discard(job)
+        if on_state:
+            on_state(job)
+        if callback:
+            callback(error if state == FAILED else result)
+        elif error is not None:
+            print(f"Job {job.name} failed: {error}")
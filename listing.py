@@ -0,0 +1,113 @@
+'''
+Streaming parser for the cmd=3015 file listing.
+
+The listing is parsed incrementally while it is still arriving, and every
+<File> becomes a compact FileRecord with typed fields, so large cards neither
+hold the whole XML tree in memory nor wait for the last byte before the first
+row can be shown.
+'''
+import xml.etree.ElementTree as ET
+from datetime import datetime
+
+# Format of the <TIME> field, e.g. "2024/01/31 12:34:56"
+TIME_FORMAT = "%Y/%m/%d %H:%M:%S"
+
+
+def parse_time(text):
+    """
+    Parses a listing <TIME> value.
+
+    Args:
+        text (str): Time string from the device.
+
+    Returns:
+        float: POSIX timestamp, or 0.0 if the value cannot be parsed.
+    """
+
+    try:
+        return datetime.strptime(text.strip(), TIME_FORMAT).timestamp()
+    except (AttributeError, ValueError):
+        return 0.0
+
+
+class FileRecord:
+    """
+    One file of the listing.
+
+    Attributes:
+        index (int): Row number shown in the browser.
+        filename (str): NAME of the file.
+        filepath (str): FPATH of the file (A:\\...), its stable identity.
+        filebytes (int): SIZE in bytes.
+        filetime (str): TIME as reported by the device.
+        timestamp (float): filetime parsed once to a POSIX timestamp.
+        attr (int): ATTR bits (e.g. read-only / protected clips).
+    """
+
+    __slots__ = ("index", "filename", "filepath", "filebytes", "filetime", "timestamp", "attr")
+
+    def __init__(self, index, filename, filepath, filebytes, filetime, attr=0):
+        self.index = index
+        self.filename = filename
+        self.filepath = filepath
+        self.filebytes = filebytes
+        self.filetime = filetime
+        self.timestamp = parse_time(filetime)
+        self.attr = attr
+
+    @property
+    def filesize(self):
+        """Size in MB, rounded for display."""
+
+        return round(self.filebytes / (1024 * 1024), 2)
+
+    def __repr__(self):
+        return f"FileRecord({self.index}, {self.filepath!r}, {self.filebytes}, {self.filetime!r})"
+
+
+def _text(element, tag, default=""):
+    child = element.find(tag)
+    return child.text if child is not None and child.text is not None else default
+
+
+def iter_file_records(chunks, start_index=1):
+    """
+    Incrementally parses a cmd=3015 listing.
+
+    Args:
+        chunks (iterable): Raw response bytes, in pieces as they arrive.
+        start_index (int): Index of the first record.
+
+    Yields:
+        FileRecord: One record per <File>, as soon as it is complete.
+    """
+
+    parser = ET.XMLPullParser(events=("start", "end"))
+    stack = []
+    index = start_index
+    for chunk in chunks:
+        parser.feed(chunk)
+        for event, element in parser.read_events():
+            if event == "start":
+                stack.append(element)
+                continue
+            stack.pop()
+            if element.tag == "File":
+                try:
+                    size = int(_text(element, "SIZE", "0"))
+                    attr = int(_text(element, "ATTR", "0"))
+                except ValueError:
+                    size, attr = 0, 0
+                yield FileRecord(
+                    index,
+                    _text(element, "NAME"),
+                    _text(element, "FPATH"),
+                    size,
+                    _text(element, "TIME"),
+                    attr,
+                )
+                index += 1
+            if element.tag in ("File", "ALLFile") and stack:
+                # Drop finished entries so memory stays flat for any card size
+                stack[-1].remove(element)
+    parser.close()
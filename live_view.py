@@ -0,0 +1,293 @@
+'''
+Embedded MJPEG live view.
+
+The photo-mode live view (PhotoLiveViewLink of cmd=2019) is a
+multipart/x-mixed-replace stream of JPEG frames. MjpegParser appends the stream
+to one reusable buffer and finds the frame boundaries in place (the part's
+Content-Length when present, the JPEG end marker otherwise); only the frame that
+is handed to the decoder is ever copied out. LiveView reads and decodes on two
+threads and the decoder always takes the newest complete frame, so frames that
+arrive while it is busy are dropped instead of queueing up as delay.
+'''
+import re
+import threading
+import time
+from collections import deque
+from io import BytesIO
+
+from governor import PRIORITY_INTERACTIVE
+
+# Receive buffer; must hold at least one frame plus one read
+BUFFER_SIZE = 2 * 1024 * 1024
+# Bytes asked for per read (fewer are returned as soon as any arrive)
+READ_SIZE = 64 * 1024
+# Bounding box of the displayed frames
+LIVE_SIZE = (640, 360)
+# Seconds of history behind the frame rates
+RATE_WINDOW = 2.0
+
+SOI = b"\xff\xd8"
+EOI = b"\xff\xd9"
+_CONTENT_LENGTH = re.compile(rb"content-length:[ \t]*(\d+)", re.IGNORECASE)
+
+
+class LiveViewError(Exception):
+    """Raised when the stream cannot be parsed (e.g. a frame larger than the buffer)."""
+
+
+class MjpegParser:
+    """
+    Splits a multipart MJPEG stream into frames, keeping only the newest one.
+
+    Not thread-safe; LiveView calls it under its lock.
+
+    Args:
+        buffer_size (int): Size of the receive buffer.
+
+    Attributes:
+        frames (int): Complete frames found so far.
+        dropped (int): Frames replaced by a newer one before they were taken.
+    """
+
+    def __init__(self, buffer_size=BUFFER_SIZE):
+        self.buffer = bytearray(buffer_size)
+        self.view = memoryview(self.buffer)
+        self.end = 0  # Bytes in the buffer
+        self.pos = 0  # Start of the unparsed data
+        self.scan = 0  # Where the end marker search resumes
+        self.latest = None  # (start, end, received) of the newest untaken frame
+        self.frames = 0
+        self.dropped = 0
+
+    def _compact(self, needed):
+        # Move the data still needed (newest frame, unparsed bytes) to the front
+        keep = self.latest[0] if self.latest else self.pos
+        if keep:
+            size = self.end - keep
+            self.view[:size] = self.view[keep:self.end]
+            self.end = size
+            self.pos -= keep
+            self.scan = max(self.scan - keep, 0)
+            if self.latest:
+                start, end, received = self.latest
+                self.latest = (start - keep, end - keep, received)
+        if self.end + needed > len(self.buffer):
+            raise LiveViewError("Live view frame larger than the receive buffer")
+
+    def feed(self, data, received=None):
+        """
+        Appends received bytes and parses the frames they complete.
+
+        Args:
+            data (bytes): Bytes read from the stream.
+            received (float): time.monotonic() of the read, now if None.
+
+        Returns:
+            int: Number of frames completed by this data.
+        """
+
+        if self.end + len(data) > len(self.buffer):
+            self._compact(len(data))
+        self.buffer[self.end:self.end + len(data)] = data
+        self.end += len(data)
+        received = time.monotonic() if received is None else received
+        count = 0
+        while True:
+            frame = self._next_frame()
+            if frame is None:
+                return count
+            if self.latest is not None:
+                self.dropped += 1
+            self.latest = (frame[0], frame[1], received)
+            self.frames += 1
+            count += 1
+
+    def _next_frame(self):
+        buf = self.buffer
+        start = buf.find(SOI, self.pos, self.end)
+        if start < 0:
+            return None
+        # Part headers between the previous frame and this one
+        match = _CONTENT_LENGTH.search(buf, self.pos, start)
+        if match:
+            end = start + int(match.group(1))
+            if end > self.end:
+                return None
+        else:
+            marker = buf.find(EOI, max(self.scan, start + 2), self.end)
+            if marker < 0:
+                self.scan = max(self.end - 1, start + 2)
+                return None
+            end = marker + 2
+        self.pos = self.scan = end
+        return start, end
+
+    def take_latest(self):
+        """
+        Takes the newest complete frame out of the buffer.
+
+        Returns:
+            tuple: (jpeg_bytes, received), None if no new frame arrived.
+        """
+
+        if self.latest is None:
+            return None
+        start, end, received = self.latest
+        self.latest = None
+        return bytes(self.view[start:end]), received
+
+
+class RateMeter:
+    """Events per second over the last RATE_WINDOW seconds."""
+
+    def __init__(self, window=RATE_WINDOW):
+        self.window = window
+        self._times = deque()
+
+    def tick(self, now=None):
+        now = time.monotonic() if now is None else now
+        self._times.append(now)
+        while self._times and self._times[0] < now - self.window:
+            self._times.popleft()
+
+    def rate(self):
+        if len(self._times) < 2:
+            return 0.0
+        span = self._times[-1] - self._times[0]
+        return (len(self._times) - 1) / span if span > 0 else 0.0
+
+
+def decode_frame(data, size=LIVE_SIZE):
+    """
+    Decodes a live view frame, scaled down while decoding (JPEG draft mode).
+
+    Args:
+        data (bytes): JPEG frame.
+        size (tuple): Bounding box of the result.
+
+    Returns:
+        tuple: ((width, height), rgb_bytes), as thumb_decode.to_photo() expects.
+    """
+
+    from PIL import Image
+
+    img = Image.open(BytesIO(data))
+    img.draft("RGB", size)
+    img = img.convert("RGB")
+    img.thumbnail(size, reducing_gap=2.0)
+    return img.size, img.tobytes()
+
+
+class LiveView:
+    """
+    Plays an MJPEG live view on background threads.
+
+    Args:
+        client (DeviceClient): Shared device client.
+        url (str): Stream URL (PhotoLiveViewLink).
+        size (tuple): Bounding box of the decoded frames.
+        on_frame (callable): Called from the decoder thread as
+            on_frame(frame, received) with frame = ((width, height), rgb_bytes)
+            and received the time.monotonic() its last byte arrived.
+        on_end (callable): Called once when the stream stops, with the
+            exception that ended it or None.
+    """
+
+    def __init__(self, client, url, size=LIVE_SIZE, on_frame=None, on_end=None):
+        self.client = client
+        self.url = url
+        self.size = size
+        self.on_frame = on_frame
+        self.on_end = on_end
+        self.parser = MjpegParser()
+        self.received_rate = RateMeter()
+        self.decoded_rate = RateMeter()
+        self.decoded = 0
+        self.bytes_read = 0
+        self._cond = threading.Condition()
+        self._stopped = False
+        self._ended = False
+        self._response = None
+
+    def start(self):
+        threading.Thread(target=self._read_loop, name="live_view_read", daemon=True).start()
+        threading.Thread(target=self._decode_loop, name="live_view_decode", daemon=True).start()
+
+    def stop(self):
+        """Stops both threads and closes the stream."""
+
+        with self._cond:
+            self._stopped = True
+            self._cond.notify_all()
+        response = self._response
+        if response is not None:
+            # Unblocks a read waiting for data
+            response.close()
+
+    def stats(self):
+        """
+        Returns:
+            dict: received_fps, decoded_fps, frames, decoded, dropped, bytes_read.
+        """
+
+        with self._cond:
+            return {
+                "received_fps": self.received_rate.rate(),
+                "decoded_fps": self.decoded_rate.rate(),
+                "frames": self.parser.frames,
+                "decoded": self.decoded,
+                "dropped": self.parser.dropped,
+                "bytes_read": self.bytes_read,
+            }
+
+    def _read_loop(self):
+        error = None
+        try:
+            self._response = self.client.open_stream(
+                self.url, timeout=(5, 10), priority=PRIORITY_INTERACTIVE)
+            self._response.raise_for_status()
+            raw = self._response.raw
+            # read1() returns whatever has arrived instead of waiting for READ_SIZE
+            read = getattr(raw, "read1", raw.read)
+            while not self._stopped:
+                data = read(READ_SIZE)
+                if not data:
+                    break
+                now = time.monotonic()
+                with self._cond:
+                    self.bytes_read += len(data)
+                    completed = self.parser.feed(data, now)
+                    for _ in range(completed):
+                        self.received_rate.tick(now)
+                    if completed:
+                        self._cond.notify_all()
+        except Exception as e:
+            if not self._stopped:
+                error = e
+        finally:
+            if self._response is not None:
+                self._response.close()
+            with self._cond:
+                self._ended = True
+                self._cond.notify_all()
+            if self.on_end and not self._stopped:
+                self.on_end(error)
+
+    def _decode_loop(self):
+        while True:
+            with self._cond:
+                while self.parser.latest is None and not (self._stopped or self._ended):
+                    self._cond.wait()
+                if self._stopped or self.parser.latest is None:
+                    return
+                data, received = self.parser.take_latest()
+            try:
+                frame = decode_frame(data, self.size)
+            except Exception as e:
+                print(f"Live view frame not decoded: {e}")
+                continue
+            with self._cond:
+                self.decoded += 1
+                self.decoded_rate.tick()
+            if self.on_frame:
+                self.on_frame(frame, received)
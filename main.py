@@ -1,7 +1,6 @@
-import requests
 import xml.etree.ElementTree as ET
 import tkinter as tk
-from tkinter import ttk, messagebox, font, PhotoImage
+from tkinter import ttk, messagebox, font, PhotoImage, filedialog, simpledialog
 from tkinter.ttk import Label
 from urllib.parse import quote
 from datetime import datetime
@@ -9,50 +8,114 @@ from io import BytesIO
 from PIL import Image, ImageTk
 import sv_ttk
 import threading
+import multiprocessing
+import os
+import time
+from collections import deque
 from queue import Queue
 
 # Import the text definitions from gui_text.py
 from gui_text import TEXTS
+from thumb_cache import ThumbnailCache
+from device import DeviceClient, DeviceError, DeviceStatusError
+from governor import PRIORITY_INTERACTIVE, PRIORITY_BULK
+from downloader import DownloadManager
+from virtual_list import VirtualTreeview
+from catalog import FileCatalog
+from thumb_decode import ThumbDecoder, to_photo
+from thumb_scheduler import ThumbnailScheduler
+from jobs import JobEngine, PENDING, RUNNING
+from cleanup import select_reclaim, delete_files
+from mirror import mirror_card
+import dashcam
+from device_state import DeviceState
+from health import LINK_OK, LINK_DEGRADED, LINK_OFFLINE
+from stall_watchdog import StallWatchdog
+from mp4 import Mp4Error, RangeReader
+from scrub import DecoderUnavailable, build_strip
+from live_view import LiveView
+from clip_metadata import MetadataCache, clip_metadata, format_duration, write_gpx
+from grouping import group_trips
+
+# Parallel connections per downloaded file (the firmware is fastest with 2-3)
+DOWNLOAD_CONNECTIONS = 3
+
+# Thumbnail loading: parallel downloads, idle time after scrolling before
+# loading starts, and how many screens ahead of the scroll direction to prefetch
+THUMB_WORKERS = 3
+THUMB_SETTLE_MS = 120
+THUMB_PREFETCH_SCREENS = 2
+
+# Clips whose moov index is read at the same time for the duration column
+METADATA_WORKERS = 1
+
+# Set DB5_DEBUG=1 to print diagnostics such as the startup timing breakdown
+DEBUG = bool(os.environ.get("DB5_DEBUG"))
+
+# Set DB5_STALL_MS=200 to log every callback that blocks the Tk event loop
+# longer than that, with its stack (see stall_watchdog.py)
+STALL_THRESHOLD_MS = int(os.environ.get("DB5_STALL_MS") or 0)
+
+# Treeview item id prefix of trip rows in the grouped view (see grouping.py)
+TRIP_PREFIX = "trip:"
+
+# Shared client for every request sent to the dashcam
+device = DeviceClient()
+downloader = DownloadManager(device, connections=DOWNLOAD_CONNECTIONS)
+# Cached mode / recording / connection state, fed by one background poller
+device_state = DeviceState(device)
+# Device I/O runs on an asyncio loop next to the Tk main loop
+jobs = JobEngine()
+# Event loop stall watchdog, only created when STALL_THRESHOLD_MS is set
+watchdog = None
+
+
+def job_button(button):
+    """
+    Builds an on_state callback that disables a button while its job is pending
+    or running, then restores the state it had before.
+
+    Args:
+        button (ttk.Button): The button that started the job.
+
+    Returns:
+        callable: Callback for JobEngine.submit(on_state=...).
+    """
+
+    previous = []
+
+    def on_state(job):
+        try:
+            if job.state == PENDING:
+                previous.append(str(button.cget("state")))
+            if job.state in (PENDING, RUNNING):
+                button.config(state=tk.DISABLED)
+            else:
+                button.config(state=previous[0] if previous else tk.NORMAL)
+        except tk.TclError:
+            pass  # Window already closed
+    return on_state
 
 
-def fetch_file_data(url):
+def fetch_file_data(on_batch=None, batch_size=200):
     """
-    Fetches file data from a URL and parses the XML response.
+    Fetches the file listing (cmd=3015) from the device, parsing it while it streams in.
+    Blocking; run it as a job.
 
     Args:
-        url (str): The URL to fetch data from.
+        on_batch (callable): Called with each list of newly parsed records, so
+            rows can be shown before the whole listing has arrived.
+        batch_size (int): Records per on_batch call.
 
     Returns:
-        list: A list of dictionaries containing file information.
+        list: A list of FileRecord.
+
+    Raises:
+        DeviceError: The listing could not be fetched.
+        ET.ParseError: The listing is not valid XML.
     """
 
-    try:
-        response = requests.get(url)
-        response.raise_for_status()
-        root = ET.fromstring(response.text)
-
-        file_list = []
-        for index, file_element in enumerate(root.findall(".//File")):
-            filesize_in_bytes = int(file_element.find("SIZE").text)
-            filesize_in_mb = round(filesize_in_bytes / (1024 * 1024), 2)
-            file_info = {
-                "index": index + 1,
-                "filename": file_element.find("NAME").text,
-                "filesize": filesize_in_mb,
-                "filetime": file_element.find("TIME").text,
-                "filepath": file_element.find("FPATH").text,
-            }
-            file_list.append(file_info)
-        return file_list
-
-    except requests.exceptions.RequestException as e:
-        print(f"Failed to connect to URL: {e}")
-        messagebox.showerror(
-            TEXTS["error_msg"], TEXTS["error_connection_failed_message"])
-        return []
-    except ET.ParseError as e:
-        print(f"XML parsing error: {e}")
-        return []
+    return dashcam.fetch_listing(device, on_batch=on_batch, batch_size=batch_size)
 
 
 def wifi_config_window():
@@ -106,43 +169,32 @@ def wifi_config_window():
             messagebox.showerror(TEXTS["error_msg"],
                                  TEXTS["error_wifi_len_password"])
             return
-        error_flag = False
-        # Send Wi-Fi SSID
-        try:
-            response = requests.get(
-                f"http://192.168.1.254/?custom=1&cmd=3003&str={ssid}")
-            response.raise_for_status()
-            root = ET.fromstring(response.text)
-            status = root.find(".//Status").text
-            if status != "0":
-                error_flag = True
-                print(f"Failed to send Wi-Fi SSID: {status}")
-                messagebox.showerror(
-                    TEXTS["error_msg"], TEXTS["error_wifi_config_ssid"])
-        except Exception as e:
-            error_flag = True
-            print(f"Failed to send Wi-Fi SSID: {e}")
-            messagebox.showerror(TEXTS["error_msg"],
-                                 TEXTS["error_wifi_config_ssid"])
 
-        # Send Wi-Fi Password
-        try:
-            response = requests.get(
-                f"http://192.168.1.254/?custom=1&cmd=3004&str={password}")
-            response.raise_for_status()
-            if status != "0":
-                error_flag = True
-                print(f"Failed to send Wi-Fi SSID: {status}")
-                messagebox.showerror(
-                    TEXTS["error_msg"], TEXTS["error_wifi_config_ssid"])
-        except Exception as e:
-            error_flag = True
-            print(f"Failed to send Wi-Fi Password: {e}")
-            messagebox.showerror(TEXTS["error_msg"],
-                                 TEXTS["error_wifi_config_password"])
-        if not error_flag:
-            messagebox.showinfo(
-                TEXTS["success_msg"], TEXTS["wifi_config_setup_success"])
+        def send():
+            """Sends SSID and password; returns the error texts of the failed steps."""
+            failed = []
+            for cmd, value, label, error_key in (
+                    ("3003", ssid, "SSID", "error_wifi_config_ssid"),
+                    ("3004", password, "Password", "error_wifi_config_password")):
+                try:
+                    device.command(cmd, str_value=value)
+                except DeviceStatusError as e:
+                    print(f"Failed to send Wi-Fi {label}: {e.status}")
+                    failed.append(error_key)
+                except Exception as e:
+                    print(f"Failed to send Wi-Fi {label}: {e}")
+                    failed.append(error_key)
+            return failed
+
+        def done(failed):
+            for error_key in failed:
+                messagebox.showerror(TEXTS["error_msg"], TEXTS[error_key])
+            if not failed:
+                messagebox.showinfo(
+                    TEXTS["success_msg"], TEXTS["wifi_config_setup_success"])
+
+        jobs.submit(send, name="wifi_config", on_done=done,
+                    on_state=job_button(send_wifi_config_button))
 
     send_wifi_config_button = ttk.Button(
         popup, text=TEXTS["wifi_config_send_btn"], command=send_wifi_config)
@@ -150,22 +202,16 @@ def wifi_config_window():
 
     # Button to restart device Wi-Fi
     def restart_wifi():
-        try:
-            response = requests.get("http://192.168.1.254/?custom=1&cmd=3018")
-            response.raise_for_status()
-            root = ET.fromstring(response.text)
-            status = root.find(".//Status").text
-            if status == "0":
-                messagebox.showinfo(
-                    TEXTS["success_msg"], TEXTS["wifi_config_restart_success"])
-            else:
-                messagebox.showerror(
-                    TEXTS["error_msg"], TEXTS["error_wifi_config_restart"])
-        except Exception as e:
+        def failed(e):
             print(f"Failed to restart device Wi-Fi: {e}")
             messagebox.showerror(TEXTS["error_msg"],
                                  TEXTS["error_wifi_config_restart"])
 
+        jobs.submit(device.command, "3018", name="wifi_restart",
+                    on_done=lambda _: messagebox.showinfo(
+                        TEXTS["success_msg"], TEXTS["wifi_config_restart_success"]),
+                    on_error=failed, on_state=job_button(restart_wifi_button))
+
     restart_wifi_button = ttk.Button(
         popup, text=TEXTS["wifi_config_restart_btn"], command=restart_wifi)
     restart_wifi_button.pack(pady=5)
@@ -174,34 +220,43 @@ def wifi_config_window():
 def show_playback_url(filepath):
     """
     Displays a popup window with the playback URL for a file.
+    The preview image is fetched in the background first.
 
     Args:
         filepath (str): The path of the file.
     """
 
-    playback_url = filepath.replace(
-        "A:\\", "http://192.168.1.254/").replace("\\", "/")
+    playback_url = device.file_url(filepath)
 
-    try:
+    def load_preview():
         # Fetch preview image
-        preview_url = f"{playback_url}/?custom=1&cmd=4002"
-        response = requests.get(preview_url)
-        response.raise_for_status()
-        image_data = response.content
+        image_data = device.fetch_preview(filepath, priority=PRIORITY_INTERACTIVE)
         img = Image.open(BytesIO(image_data))
         new_height = int(400 / img.width * img.height)
-        img = img.resize(size=(400, new_height),
-                         resample=Image.Resampling.BICUBIC)
-        photo = ImageTk.PhotoImage(img)
+        return img.resize(size=(400, new_height),
+                          resample=Image.Resampling.BICUBIC)
 
-    except Exception as e:
-        photo = None
-        try:
-            root = ET.fromstring(response.text)
-            status = root.find(".//Status").text
-            print(f"Failed to fetch preview image: {status}")
-        except Exception as e:
+    def failed(e):
+        if isinstance(e, DeviceStatusError):
+            print(f"Failed to fetch preview image: {e.status}")
+        else:
             print(f"Failed to fetch preview image: {e}")
+        playback_popup(playback_url, None, filepath)
+
+    jobs.submit(load_preview, name="playback_preview",
+                on_done=lambda img: playback_popup(playback_url, ImageTk.PhotoImage(img), filepath),
+                on_error=failed)
+
+
+def playback_popup(playback_url, photo, filepath=None):
+    """
+    Builds the playback URL popup.
+
+    Args:
+        playback_url (str): URL shown in the popup.
+        photo (ImageTk.PhotoImage): Preview image, or None if unavailable.
+        filepath (str): FPATH of the file, enables the scrub preview of videos.
+    """
 
     popup = tk.Toplevel()
     popup.title(TEXTS["playback_url_title"])
@@ -230,6 +285,140 @@ def show_playback_url(filepath):
         popup, text=TEXTS["copy_url_btn_text"], command=lambda: copy_to_clipboard(popup, playback_url))
     copy_button.pack(pady=5)
 
+    if filepath and filepath.upper().endswith(".MP4"):
+        scrub_button = ttk.Button(
+            popup, text=TEXTS["scrub_btn"], command=lambda: scrub_window(filepath))
+        scrub_button.pack(pady=5)
+
+
+def scrub_window(filepath):
+    """
+    Shows frames spread across a clip, fetched from its keyframes with Range
+    requests instead of downloading the clip.
+
+    Args:
+        filepath (str): FPATH of the clip.
+    """
+
+    popup = tk.Toplevel()
+    popup.title(TEXTS["scrub_title"].format(name=filepath.rsplit("\\", 1)[-1]))
+    frames_frame = ttk.Frame(popup)
+    frames_frame.pack(padx=10, pady=5)
+    scrub_status = Label(popup, text=TEXTS["scrub_loading"], anchor="w")
+    scrub_status.pack(fill=tk.X, padx=10, pady=5)
+    photos = []  # Keep references to prevent garbage collection
+    cancel_event = threading.Event()
+    popup.bind("<Destroy>", lambda event: cancel_event.set() if event.widget is popup else None)
+    reader = RangeReader(device, filepath)
+    columns = 5
+
+    def add_frame(position, count, seconds, frame):
+        if not popup.winfo_exists():
+            return
+        photo = to_photo(*frame)
+        photos.append(photo)
+        cell = ttk.Frame(frames_frame)
+        cell.grid(row=position // columns, column=position % columns, padx=2, pady=2)
+        Label(cell, image=photo).pack()
+        Label(cell, text=f"{int(seconds) // 60}:{int(seconds) % 60:02d}").pack()
+        scrub_status.config(text=TEXTS["scrub_progress"].format(done=position + 1, count=count))
+
+    def on_frame(position, count, seconds, frame):
+        popup.after(0, lambda: add_frame(position, count, seconds, frame))
+
+    def done(strip):
+        if popup.winfo_exists():
+            scrub_status.config(text=TEXTS["scrub_done"].format(
+                count=len(strip), kb=reader.bytes_read / 1024, requests=reader.requests))
+
+    def failed(e):
+        print(f"Scrub preview failed: {e}")
+        if not popup.winfo_exists():
+            return
+        if isinstance(e, DecoderUnavailable):
+            scrub_status.config(text=TEXTS["scrub_no_decoder"])
+        elif isinstance(e, Mp4Error):
+            scrub_status.config(text=TEXTS["scrub_no_index"] + str(e))
+        else:
+            scrub_status.config(text=TEXTS["error_msg"] + ": " + str(e))
+
+    jobs.submit(lambda: build_strip(reader, on_frame=on_frame, cancel_event=cancel_event),
+                name="scrub_strip", on_done=done, on_error=failed)
+
+
+def live_view_window(stream_url):
+    """
+    Plays the MJPEG live view inside the app, always showing the newest frame,
+    with the measured frame rate and latency.
+
+    Args:
+        stream_url (str): URL of the MJPEG stream (PhotoLiveViewLink).
+    """
+
+    popup = tk.Toplevel()
+    popup.title(TEXTS["live_view_title"])
+    image_label = Label(popup, text=TEXTS["live_view_connecting"])
+    image_label.pack(padx=10, pady=5)
+    live_status = Label(popup, text="", anchor="w")
+    live_status.pack(fill=tk.X, padx=10)
+    url_frame = ttk.Frame(popup)
+    url_frame.pack(fill=tk.X, padx=10, pady=5)
+    url_entry = ttk.Entry(url_frame, width=50)
+    url_entry.insert(0, stream_url)
+    url_entry.configure(state="readonly")
+    url_entry.pack(side=tk.LEFT, fill=tk.X, expand=True)
+    ttk.Button(url_frame, text=TEXTS["copy_url_btn_text"],
+               command=lambda: copy_to_clipboard(popup, stream_url)).pack(side=tk.LEFT, padx=5)
+
+    pending = []  # Newest decoded frame not shown yet
+    pending_lock = threading.Lock()
+    latencies = deque(maxlen=30)  # Seconds from the last byte received to display
+    ended = []
+
+    def show_frame():
+        if not popup.winfo_exists():
+            return
+        with pending_lock:
+            if not pending:
+                return
+            frame, received = pending.pop()
+        photo = to_photo(*frame)
+        image_label.config(image=photo, text="")
+        image_label.image = photo  # Keep a reference to prevent garbage collection
+        latencies.append(time.monotonic() - received)
+
+    def on_frame(frame, received):
+        # 主執行緒尚未顯示上一張時直接取代，只排一次顯示
+        with pending_lock:
+            scheduled = bool(pending)
+            pending[:] = [(frame, received)]
+        if not scheduled:
+            popup.after(0, show_frame)
+
+    def on_end(error):
+        ended.append(error)
+
+    def update_status():
+        if not popup.winfo_exists():
+            return
+        if ended:
+            error = ended[0]
+            live_status.config(text=TEXTS["live_view_ended"] + (f": {error}" if error else ""))
+            return
+        stats = live.stats()
+        # 串流本身沒有時間戳記，設備到電腦的傳輸以連線延遲的一半估計
+        rtt = device_state.health.stats()["p50"] or 0
+        latency = sum(latencies) / len(latencies) + rtt / 2 if latencies else None
+        live_status.config(text=TEXTS["live_view_stats"].format(
+            fps=stats["decoded_fps"], received=stats["received_fps"], dropped=stats["dropped"],
+            latency="-" if latency is None else f"{latency * 1000:.0f}"))
+        popup.after(500, update_status)
+
+    live = LiveView(device, stream_url, on_frame=on_frame, on_end=on_end)
+    popup.bind("<Destroy>", lambda event: live.stop() if event.widget is popup else None)
+    live.start()
+    update_status()
+
 # Function to copy text to the clipboard
 
 
@@ -247,38 +436,92 @@ def copy_to_clipboard(popup, text):
     popup.update()
     messagebox.showinfo(TEXTS["success_msg"], TEXTS["copy_url_success_msg"])
 
-# Function to send a delete file request
-
 
-def delete_file(filepath, refresh_func):
+def diagnostics_window():
     """
-    Sends a delete file request to the server and refreshes the file list if successful.
-
-    Args:
-        filepath (str): The path of the file to delete.
-        refresh_func: A function to refresh the file list.
+    Shows the per-command request metrics, refreshed every 2 seconds,
+    with JSON / Prometheus export.
     """
 
-    encoded_path = quote(filepath)
-    delete_url = f"http://192.168.1.254/?custom=1&cmd=4003&str={encoded_path}"
-
-    try:
-        response = requests.get(delete_url)
-        response.raise_for_status()
-        root = ET.fromstring(response.text)
-        status = root.find(".//Status").text
-        if status == "0":
-            messagebox.showinfo(
-                TEXTS["success_msg"], TEXTS["success_file_deleted_message"] + f"\n{filepath}")
-            # If enable "refrech after delete, activate this"
-            if del_refresh:
-                refresh_func()  # Refresh file list after successful deletion
-        else:
-            messagebox.showerror(
-                TEXTS["error_msg"], TEXTS["error_delete_failed_message"] + status + ".")
-    except Exception as e:
-        messagebox.showerror(
-            TEXTS["error_msg"], TEXTS["error_file_delete"].format(e))
+    popup = tk.Toplevel()
+    popup.title(TEXTS["diag_title"])
+    popup.geometry("900x400")
+
+    columns = ("count", "errors", "avg", "p50", "p90", "p99", "bytes", "http", "status")
+    table = ttk.Treeview(popup, columns=columns)
+    table.heading("#0", text=TEXTS["diag_cmd"])
+    table.column("#0", width=70, stretch=False)
+    for column in columns:
+        table.heading(column, text=TEXTS["diag_" + column])
+        table.column(column, width=70, anchor="e")
+    table.column("http", width=160, anchor="w")
+    table.column("status", width=120, anchor="w")
+    table.pack(fill=tk.BOTH, expand=True, padx=10, pady=5)
+
+    summary_label = Label(popup, text="", anchor="w")
+    summary_label.pack(fill=tk.X, padx=10)
+    stall_label = Label(popup, text="", anchor="w")
+    if watchdog:
+        stall_label.pack(fill=tk.X, padx=10)
+
+    def ms(seconds):
+        return "" if seconds is None else f"{seconds * 1000:.0f}"
+
+    def counts_text(counts):
+        return " ".join(f"{key}×{count}" for key, count in sorted(counts.items()))
+
+    def refresh():
+        # 只讀取記憶體中的統計，不會對設備送出請求
+        table.delete(*table.get_children())
+        for cmd, stats in device.metrics.snapshot().items():
+            table.insert("", "end", text=cmd, values=(
+                stats["count"], stats["errors"], ms(stats["latency_avg"]),
+                ms(stats["latency_p50"]), ms(stats["latency_p90"]), ms(stats["latency_p99"]),
+                f"{stats['bytes_sum'] / 1024 ** 2:.2f}",
+                counts_text(stats["http_status"]), counts_text(stats["device_status"])))
+        link = device_state.health.stats()
+        summary_label.config(text=TEXTS["diag_summary"].format(
+            minutes=(time.time() - device.metrics.started) / 60,
+            p50=ms(link["p50"]) or "—", p90=ms(link["p90"]) or "—",
+            samples=link["samples"], failures=link["failures"], **device.governor.snapshot()))
+        if watchdog:
+            stalls = watchdog.stats()
+            worst = stalls["callbacks"][0][0] if stalls["callbacks"] else "—"
+            stall_label.config(text=TEXTS["diag_stalls"].format(
+                count=stalls["count"], p50=ms(stalls["p50"]) or "—",
+                p90=ms(stalls["p90"]) or "—", max=ms(stalls["max"]) or "—", worst=worst))
+
+    def tick():
+        if popup.winfo_exists():
+            refresh()
+            popup.after(2000, tick)
+
+    def export(prometheus):
+        path = filedialog.asksaveasfilename(
+            parent=popup, title=TEXTS["diag_export_title"],
+            defaultextension=".prom" if prometheus else ".json",
+            filetypes=[("Prometheus", "*.prom")] if prometheus else [("JSON", "*.json")])
+        if not path:
+            return
+        text = device.metrics.to_prometheus() if prometheus else device.metrics.to_json(indent=2)
+        try:
+            with open(path, "w", encoding="utf-8") as f:
+                f.write(text)
+        except OSError as e:
+            messagebox.showerror(TEXTS["error_msg"], TEXTS["error_diag_export"] + str(e), parent=popup)
+
+    def reset():
+        device.metrics.reset()
+        refresh()
+
+    button_row = ttk.Frame(popup)
+    button_row.pack(pady=5)
+    ttk.Button(button_row, text=TEXTS["diag_export_json"],
+               command=lambda: export(False)).pack(side=tk.LEFT, padx=5)
+    ttk.Button(button_row, text=TEXTS["diag_export_prom"],
+               command=lambda: export(True)).pack(side=tk.LEFT, padx=5)
+    ttk.Button(button_row, text=TEXTS["diag_reset"], command=reset).pack(side=tk.LEFT, padx=5)
+    tick()
 
 # Function to create a tkinter window to display file information, allow sorting, and deletion
 
@@ -288,22 +531,38 @@ def create_file_browser(initial_file_list):
     Creates a tkinter window to display file information, allow sorting, and deletion.
 
     Args:
-        initial_file_list (list): A list of dictionaries containing initial file information.
+        initial_file_list (list): A list of FileRecord with the initial file information.
     """
 
     class ThumbnailManager:
         def __init__(self, tree_widget):
             self.tree = tree_widget
-            self.cache = {}
-            self.loading_indices = set()
-            self.semaphore = threading.Semaphore(3) # 限制併發數
+            self.cache = {}  # 以檔案身分 (FPATH + SIZE + TIME) 為鍵的 PhotoImage
+            self.disk_cache = ThumbnailCache()
+            self.decoder = ThumbDecoder()  # 縮圖解碼在獨立的工作池進行
+            # 固定數量的下載執行緒，依與可見範圍的距離排序工作
+            self.scheduler = ThumbnailScheduler(self._load, workers=THUMB_WORKERS)
+            # 影片長度：以 Range 讀取 moov 索引，排程方式與縮圖相同
+            self.meta_scheduler = ThumbnailScheduler(self._load_metadata, workers=METADATA_WORKERS)
+            self.durations = {}  # 檔案身分 -> 秒數 (讀取失敗為 None)
+            self.meta_save_id = None
             self.debounce_id = None # 用於紀錄 after 的 ID
+            self.last_top = 0  # 上次可見範圍的第一列，用來判斷捲動方向
+            self.direction = 1  # 1: 向下, -1: 向上
 
         def on_scroll_event(self, *args):
             """處理滾動條事件"""
             if args: self.tree.yview(*args)
             self._trigger_debounce()
 
+        def duration_text(self, file_info):
+            """影片長度欄位的文字 (尚未讀取則為空白)"""
+            return format_duration(self.durations.get(self._key(file_info)))
+
+        def cached_photo(self, file_info):
+            """回傳記憶體中已載入的縮圖 (沒有則為 None)"""
+            return self.cache.get(self._key(file_info))
+
         def on_resize_event(self, event=None):
             """處理視窗大小改變事件"""
             # 只有當 Treeview 真的有資料時才觸發，避免啟動時的虛假觸發
@@ -311,63 +570,165 @@ def create_file_browser(initial_file_list):
                 self._trigger_debounce()
 
         def _trigger_debounce(self):
-            """統一的防抖觸發邏輯"""
+            """捲動停止 (短暫無事件) 後立即重新排程"""
             if self.debounce_id:
                 root.after_cancel(self.debounce_id)
-            self.debounce_id = root.after(1000, self._process_visible_area)
+            self.debounce_id = root.after(THUMB_SETTLE_MS, self._process_visible_area)
+
+        @staticmethod
+        def _key(file_info):
+            return ThumbnailCache.make_key(
+                file_info.filepath, file_info.filebytes, file_info.filetime)
+
+        def _viewport(self):
+            """
+            回傳 (列資料, 第一個可見列, 可見列數)；
+            一般模式的列為 item id，虛擬列表模式則為整份 FileRecord 清單
+            """
+            if virtual_list:
+                return vlist.records, vlist.offset, vlist.visible_count()
+            all_items = self._displayed_rows() if trip_view else self.tree.get_children()
+            if not all_items:
+                return all_items, 0, 0
+            y_top, y_bottom = self.tree.yview()
+            total = len(all_items)
+            start = int(y_top * total)
+            return all_items, start, max(1, int(round((y_bottom - y_top) * total)))
+
+        def _displayed_rows(self, parent=""):
+            """行程分組模式下畫面上依序顯示的列 (包含已展開節點的子列)"""
+            rows = []
+            for item_id in self.tree.get_children(parent):
+                rows.append(item_id)
+                if self.tree.item(item_id, "open"):
+                    rows.extend(self._displayed_rows(item_id))
+            return rows
 
         def _process_visible_area(self):
-            # ... 保持之前的邏輯：計算 y_top, y_bottom 並下載縮圖 ...
-            all_items = self.tree.get_children()
-            if not all_items or "loading_placeholder" in all_items: return
+            """依與可見範圍的距離排定縮圖下載優先順序，並預先載入捲動方向的列"""
+            self.debounce_id = None
+            rows, start, visible = self._viewport()
+            if not rows or "loading_placeholder" in rows[:1]: return
+            total = len(rows)
+
+            if start != self.last_top:
+                self.direction = 1 if start > self.last_top else -1
+                self.last_top = start
+
+            # 優先順序：可見列 (由上而下) > 捲動方向的預載列 > 反方向的少量緩衝
+            ahead = visible * THUMB_PREFETCH_SCREENS
+            end = min(start + visible, total)
+            ranked = list(range(start, end))
+            if self.direction > 0:
+                ranked += list(range(end, min(end + ahead, total)))
+                ranked += list(range(start - 1, max(start - 1 - visible, -1), -1))
+            else:
+                ranked += list(range(start - 1, max(start - 1 - ahead, -1), -1))
+                ranked += list(range(end, min(end + visible, total)))
+
+            thumb_jobs = []
+            meta_jobs = []
+            for priority, i in enumerate(ranked):
+                row = rows[i]
+                if virtual_list:
+                    file_info = row
+                elif row in trip_items:
+                    # 行程列顯示第一段影片的縮圖
+                    file_info = trip_items[row].pairs[0].main
+                else:
+                    file_info = catalog.get(row)
+                if file_info is None:
+                    continue
+                key = self._key(file_info)
+                if key not in self.durations and file_info.filename.upper().endswith(".MP4"):
+                    meta_jobs.append((key, priority, file_info))
+                photo = self.cache.get(key)
+                if photo is not None:
+                    # 記憶體中已有相同檔案的縮圖 (例如重新整理後)，直接套用
+                    item_id = file_info.filepath if virtual_list else row
+                    if self.tree.exists(item_id) and not self.tree.item(item_id, "image"):
+                        self.tree.item(item_id, image=photo, text="")
+                    continue
+                thumb_jobs.append((key, priority, file_info.filepath))
+            # 取代整個佇列：已捲出範圍、尚未開始的工作會被取消
+            self.scheduler.schedule(thumb_jobs)
+            self.meta_scheduler.schedule(meta_jobs)
+
+        def _load_metadata(self, key, file_info):
+            """在工作執行緒中讀取影片長度 (快取命中時不需連線)"""
+            try:
+                duration = clip_metadata(
+                    device, file_info, metadata_cache, priority=PRIORITY_BULK)["duration"]
+            except Exception as e:
+                # 錄製中的檔案還沒有索引，本次執行不再重試
+                print(f"Metadata read failed: {e}")
+                duration = None
+            self.tree.after(0, lambda: self._apply_duration(file_info.filepath, key, duration))
 
-            y_top, y_bottom = self.tree.yview()
-            total = len(all_items)
-            
-            # 這裡多加一個緩衝 Buffer，避免邊緣項目沒抓到
-            start_idx = max(0, int(y_top * total) - 1)
-            end_idx = min(int(y_bottom * total) + 2, total)
-
-            for i in range(start_idx, end_idx):
-                item_id = all_items[i]
-                if not self.tree.item(item_id, "image") and int(item_id) not in self.loading_indices:
-                    file_info = next((f for f in file_list if str(f["index"]) == item_id), None)
-                    if file_info:
-                        self._start_download(item_id, file_info["filepath"])
-
-        def _start_download(self, item_id, filepath):
-            idx = int(item_id)
-            self.loading_indices.add(idx)
-            
-            def worker():
-                with self.semaphore:
-                    try:
-                        # 轉換為預覽圖網址
-                        url = filepath.replace("A:\\", "http://192.168.1.254/").replace("\\", "/") + "/?custom=1&cmd=4002"
-                        resp = requests.get(url, timeout=5)
-                        if resp.status_code == 200:
-                            img = Image.open(BytesIO(resp.content))
-                            img.thumbnail((160, 90))
-                            photo = ImageTk.PhotoImage(img)
-                            self.cache[idx] = photo
-                            # 更新 UI
-                            self.tree.after(0, lambda: self._update_item(item_id, photo))
-                    except Exception as e:
-                        print(f"Download failed: {e}")
-                    finally:
-                        self.loading_indices.remove(idx)
-
-            threading.Thread(target=worker, daemon=True).start()
+        def _apply_duration(self, item_id, key, duration):
+            self.durations[key] = duration
+            if self.tree.exists(item_id):
+                self.tree.set(item_id, "duration", format_duration(duration))
+            # 數秒內的多筆結果合併為一次寫入磁碟快取
+            if self.meta_save_id is None:
+                self.meta_save_id = root.after(5000, self._save_metadata)
+
+        def _save_metadata(self):
+            self.meta_save_id = None
+            jobs.submit(metadata_cache.save, name="metadata_cache_save")
+
+        def _load(self, key, filepath):
+            """在工作執行緒中取得並解碼一張縮圖"""
+            try:
+                # 先查詢磁碟快取，命中時不需連線
+                data = self.disk_cache.get(key)
+                if data is None:
+                    preview = device.fetch_preview(filepath)
+                    # JPEG draft 模式直接以縮小比例解碼
+                    size, rgb, jpeg = self.decoder.decode_preview(preview)
+                    self.disk_cache.put(key, jpeg)
+                else:
+                    size, rgb = self.decoder.decode_cached(data)
+                # PhotoImage 只能在 Tk 主執行緒建立
+                self.tree.after(0, lambda: self._apply_thumbnail(filepath, key, size, rgb))
+            except Exception as e:
+                print(f"Download failed: {e}")
+
+        def _apply_thumbnail(self, item_id, key, size, rgb):
+            photo = to_photo(size, rgb)
+            self.cache[key] = photo
+            self._update_item(item_id, photo)
 
         def _update_item(self, item_id, photo):
-            if self.tree.exists(item_id):
-                # 設定圖片，並清空 Loading 文字 (text 屬性對應 #0 欄位的文字)
-                self.tree.item(item_id, image=photo, text="")
+            # 以該檔案開始的行程列也使用同一張縮圖
+            for row_id in (item_id, TRIP_PREFIX + item_id):
+                if self.tree.exists(row_id):
+                    # 設定圖片，並清空 Loading 文字 (text 屬性對應 #0 欄位的文字)
+                    self.tree.item(row_id, image=photo, text="")
 
-    global current_mode, del_refresh, dl_stat
+    global current_mode, del_refresh, dl_stat, virtual_list, trip_view, watchdog
 
     root = tk.Tk()
     root.title(TEXTS["title"])
+    # 背景工作的結果由 Tk 主執行緒接收
+    jobs.attach(root)
+    # 主迴圈卡住監測 (選用)：超過門檻時記錄當下執行的回呼與堆疊
+    if STALL_THRESHOLD_MS:
+        watchdog = StallWatchdog(root, threshold=STALL_THRESHOLD_MS / 1000)
+        root.after_idle(watchdog.start)
+
+    # 啟動各階段的耗時 (DEBUG 模式下於列表載入完成時輸出)
+    startup_started = time.perf_counter()
+    startup_phases = {}
+
+    def startup_mark(phase):
+        """記錄啟動階段第一次完成的時間"""
+        if phase in startup_phases or "listing" in startup_phases:
+            return
+        startup_phases[phase] = time.perf_counter() - startup_started
+        if phase == "listing" and DEBUG:
+            print("Startup timing: " + ", ".join(
+                f"{name} {seconds * 1000:.0f} ms" for name, seconds in startup_phases.items()))
     root.geometry("800x450")
     # Load the fallback font list
     sv_ttk.load_fallback_list([
@@ -391,11 +752,21 @@ def create_file_browser(initial_file_list):
     button_frame2 = ttk.Frame(root)
     button_frame2.pack(pady=5, fill=tk.X)
 
-    file_list = initial_file_list
+    # 檔案目錄：以 FPATH (即 item id) 索引，並快取各欄位的排序結果
+    catalog = FileCatalog(initial_file_list)
+
+    def display_order():
+        """目前排序方式下的檔案順序"""
+        return catalog.sorted(last_sort_column, last_sort_direction)
+
+    # 行程分組模式：行程列 item id -> Trip，配對主檔 FPATH -> ClipPair
+    trip_items = {}
+    pair_items = {}
 
     # 重新定義欄位：將 index 移出第一欄，縮圖由 #0 負責
-    columns = ("index", "filename", "filesize", "filetime")
+    columns = ("index", "filename", "filesize", "filetime", "duration")
     tree = ttk.Treeview(root, columns=columns, show="tree headings") # 這裡要寫 "tree headings"
+    metadata_cache = MetadataCache()
     thumb_mgr = ThumbnailManager(tree)
     
     # 設定 #0 欄位為縮圖欄位
@@ -410,75 +781,158 @@ def create_file_browser(initial_file_list):
                  command=lambda: sort_column("filesize"))
     tree.heading("filetime", text=TEXTS["tree_ftime_text"],
                  command=lambda: sort_column("filetime"))
+    tree.heading("duration", text=TEXTS["tree_duration_text"])
 
     tree.column("index", width=50, anchor="center")
     tree.column("filename", width=300, anchor="w")
     tree.column("filesize", width=100, anchor="e")
     tree.column("filetime", width=150, anchor="center")
+    tree.column("duration", width=70, anchor="e")
 
     treev_scrl = ttk.Scrollbar(root, orient="vertical", command=tree.yview)
     treev_scrl.pack(side="right", fill="y")
     tree.configure(yscrollcommand=treev_scrl.set)
 
-    def check_connection():
+    def on_device_state(changes):
         """
-        Pings the device every 10 seconds to keep the connection alive.
+        Applies device state changes to the UI (Tk thread).
+        The poller also acts as the keep-alive and health probe; a lost link is
+        shown in the status bar and reconnects on its own instead of exiting.
         """
-        try:
-            response = requests.get("http://192.168.1.254/?custom=1&cmd=3016")
-            response.raise_for_status()  # Raise an exception for bad status codes
-            xmlroot = ET.fromstring(response.text)
-            status = xmlroot.find(".//Status").text
-            if status == "0":
-                # Connection successful
-                print("Ping Success.")
+
+        global current_mode
+        nonlocal current_view
+        if "mode" in changes or "recording" in changes:
+            current_mode = device_state.mode
+            print(f"Current mode number: {current_mode}")
+            toggle_mode_button.config(text=get_mode_text(current_mode))
+            if ui_state == tk.NORMAL:
+                update_functional_buttons()
             else:
-                # Connection failed, handle the error
-                print(f"Connection failed: Status code {status}")
-                messagebox.showerror(
-                    TEXTS["error_msg"], TEXTS["error_connection_failed_message"])
-                exit()  # Exit the program
-        except requests.exceptions.RequestException as e:
-            print(f"Connection error: {e}")
-            messagebox.showerror(
-                TEXTS["error_msg"], TEXTS["error_connection_failed_message"])
-            exit()  # Exit the program
-        except ET.ParseError as e:
-            print(f"XML parsing error: {e}")
-            messagebox.showerror(
-                TEXTS["error_msg"], TEXTS["error_xml_parsing"])
-            exit()  # Exit the program
-        # Schedule next task
-        root.after(10000, check_connection)
+                update_record_button(device_state.recording)
+        if "view" in changes:
+            current_view = device_state.view
+            update_view_button_text()
+        if "link" in changes:
+            print(f"Link state: {changes['link']}")
+            update_link_label()
+            # 重新連線後，若列表仍是空的 (例如啟動時設備未回應) 則自動讀取
+            if changes["link"] == LINK_OK and not len(catalog) and ui_state == tk.NORMAL:
+                refresh_file_list()
+
+    # 狀態變更可能由任何執行緒通知，交回 Tk 主執行緒處理
+    device_state.subscribe(lambda changes: root.after(0, lambda: on_device_state(changes)))
+
+    def row_values(file):
+        return (file.index, file.filename, file.filesize, file.filetime,
+                thumb_mgr.duration_text(file))
+
+    def insert_trip_children(trip_id):
+        """展開行程時才插入其中的配對列 (後鏡頭檔案為前鏡頭列的子列)"""
+        tree.delete(*tree.get_children(trip_id))
+        for pair in trip_items[trip_id].pairs:
+            main_file = pair.main
+            tree.insert(trip_id, "end", iid=main_file.filepath, text=TEXTS["loading_text"],
+                        values=row_values(main_file))
+            if pair.secondary is not None:
+                tree.insert(main_file.filepath, "end", iid=pair.secondary.filepath,
+                            text=TEXTS["loading_text"], values=row_values(pair.secondary))
+
+    def render_trips():
+        """依行程分組重建列表 (最新的行程在最上方)，保留原本展開的行程"""
+        opened = {item_id for item_id in tree.get_children() if tree.item(item_id, "open")}
+        tree.delete(*tree.get_children())
+        trip_items.clear()
+        pair_items.clear()
+        trips = group_trips(catalog.sorted("filetime"))
+        for trip in reversed(trips):
+            trip_id = TRIP_PREFIX + trip.key
+            trip_items[trip_id] = trip
+            for pair in trip.pairs:
+                pair_items[pair.main.filepath] = pair
+            first = trip.pairs[0].main
+            tree.insert("", "end", iid=trip_id, text=TEXTS["loading_text"], values=(
+                "", TEXTS["trip_label"].format(label=trip.label(), count=len(trip.pairs)),
+                round(trip.filebytes / (1024 * 1024), 2), first.filetime, ""))
+            if trip_id in opened:
+                insert_trip_children(trip_id)
+                tree.item(trip_id, open=True)
+            else:
+                # 佔位子列讓行程列可以展開，展開時才換成實際的列
+                tree.insert(trip_id, "end", iid=trip_id + "/", text=TEXTS["loading_text"])
+        thumb_mgr.on_scroll_event()
+
+    def on_tree_open(event=None):
+        item_id = tree.focus()
+        if item_id in trip_items and tree.exists(item_id + "/"):
+            insert_trip_children(item_id)
+        thumb_mgr.on_scroll_event()
+
+    tree.bind("<<TreeviewOpen>>", on_tree_open)
+    tree.bind("<<TreeviewClose>>", lambda e: thumb_mgr.on_scroll_event())
 
     def update_treeview():
+        if trip_view:
+            render_trips()
+            return
+        order = display_order()
+        if virtual_list:
+            # 虛擬列表只需重新繪製可見範圍
+            vlist.set_records(order)
+            return
         tree.delete(*tree.get_children())
-        for file in file_list:
+        for file in order:
+            # 以 FPATH 作為 item id，重新整理後仍可辨識同一個檔案
             # 初始狀態：text="載入中..." 會顯示在 #0 欄位，直到 image 被載入為止
-            tree.insert("", "end", iid=file["index"], text=TEXTS["loading_text"], 
-                        values=(file["index"], file["filename"], file["filesize"], file["filetime"]))
+            tree.insert("", "end", iid=file.filepath, text=TEXTS["loading_text"], 
+                        values=row_values(file))
         # 手動觸發一次可見區域檢查
         thumb_mgr._process_visible_area()
 
+    # 虛擬列表模式：只有可見範圍內的列存在於 Treeview 中
+    vlist = VirtualTreeview(
+        tree, treev_scrl, row_values,
+        placeholder_text=TEXTS["loading_text"],
+        image_for=thumb_mgr.cached_photo,
+        on_render=thumb_mgr.on_scroll_event)
+
+    def on_resize(event=None):
+        if virtual_list:
+            vlist.render()
+        else:
+            thumb_mgr.on_resize_event(event)
+
+    def on_scrollbar(*args):
+        if virtual_list:
+            vlist.yview(*args)
+        else:
+            thumb_mgr.on_scroll_event(*args)
+
+    def on_mousewheel(event):
+        if virtual_list:
+            return vlist.on_mousewheel(event)
+        thumb_mgr.on_scroll_event()
+
     # 1. 綁定視窗大小改變事件 (Configure)
-    tree.bind("<Configure>", thumb_mgr.on_resize_event)
+    tree.bind("<Configure>", on_resize)
 
     # 2. 綁定滾動條 (Scrollbar)
-    treev_scrl.config(command=thumb_mgr.on_scroll_event)
+    treev_scrl.config(command=on_scrollbar)
     tree.configure(yscrollcommand=treev_scrl.set)
 
-    # 3. 綁定滑鼠滾輪 (MouseWheel)
-    tree.bind("<MouseWheel>", lambda e: thumb_mgr.on_scroll_event())
+    # 3. 綁定滑鼠滾輪 (MouseWheel；Linux 為 Button-4/5)
+    tree.bind("<MouseWheel>", on_mousewheel)
+    tree.bind("<Button-4>", lambda e: vlist.on_mousewheel(e) if virtual_list else None)
+    tree.bind("<Button-5>", lambda e: vlist.on_mousewheel(e) if virtual_list else None)
 
     def update_functional_buttons():
         """根據目前的設備模式 (current_mode) 決定按鈕可用性"""
         try:
             # 錄影按鈕：僅在錄影模式 (0, 1) 可用
             is_recording_mode = (current_mode == 0 or current_mode == 1)
-            record_button.config(
-                state=tk.NORMAL if is_recording_mode else tk.DISABLED,
-                text=TEXTS["record_button_stop"] if (is_recording_mode and check_recording_status()) else TEXTS["record_button_start"]
-            )
+            record_button.config(state=tk.NORMAL if is_recording_mode else tk.DISABLED)
+            # 錄影狀態讀取快取，不必每次都詢問設備
+            update_record_button(is_recording_mode and device_state.recording)
 
             # 拍照按鈕：僅在拍照模式 (4) 可用
             take_picture_button.config(
@@ -492,14 +946,19 @@ def create_file_browser(initial_file_list):
         except Exception as e:
             print(f"Update functional buttons failed: {e}")
 
+    ui_state = tk.NORMAL
+
     def set_ui_state(state):
         """控制介面鎖定狀態 (網路存取時調用)"""
+        nonlocal ui_state
+        ui_state = state
         # 基本 Treeview 鎖定
-        tree.configure(selectmode='none' if state == tk.DISABLED else 'browse')
+        tree.configure(selectmode='none' if state == tk.DISABLED else 'extended')
         
         # 1. 處理永遠可以點擊或無條件鎖定的按鈕
         for btn in [refresh_button, toggle_mode_button, sync_time_button, 
-                    wifi_config_button, del_refresh_btn, view_button, dl_toggle_btn]:
+                    wifi_config_button, del_refresh_btn, view_button, dl_toggle_btn,
+                    download_button, virtual_list_btn, trip_view_btn, reclaim_button]:
             try: btn.config(state=state)
             except: pass
 
@@ -516,39 +975,96 @@ def create_file_browser(initial_file_list):
         """非同步重新整理檔案列表"""
         # 1. 進入載入狀態
         set_ui_state(tk.DISABLED)
-        tree.delete(*tree.get_children())
-        # 在第一行顯示載入中訊息
-        tree.insert("", "end", iid="loading_placeholder", text=TEXTS["loading_list_text"])
-
-        def worker():
-            nonlocal file_list
-            try:
-                # 執行原本的網路獲取動作
-                new_data = fetch_file_data("http://192.168.1.254/?custom=1&cmd=3015")
-                
-                # 回到主執行緒更新 UI
-                root.after(0, lambda: finalize_refresh(new_data))
-            except Exception as e:
-                root.after(0, lambda: messagebox.showerror(TEXTS["error_msg"], str(e)))
-                root.after(0, lambda: set_ui_state(tk.NORMAL))
+        status_label.config(text=TEXTS["loading_list_text"])
+        # 列表為空時才在第一行顯示載入中訊息，否則保留現有的列與縮圖
+        if not tree.get_children():
+            tree.insert("", "end", iid="loading_placeholder", text=TEXTS["loading_list_text"])
+
+        # 列表為空 (首次載入) 時，邊接收邊顯示，不必等整份列表下載完成
+        streaming = not len(catalog)
+
+        def append_rows(batch):
+            startup_mark("first_rows")
+            if tree.exists("loading_placeholder"):
+                tree.delete("loading_placeholder")
+            if virtual_list:
+                vlist.append(batch)
+                return
+            if trip_view:
+                return  # 行程在整份列表收完後才能分組
+            for file in batch:
+                if not tree.exists(file.filepath):
+                    tree.insert("", "end", iid=file.filepath, text=TEXTS["loading_text"],
+                                values=row_values(file))
+
+        def failed(e):
+            # 讀取失敗時保留目前的列表
+            if isinstance(e, DeviceError):
+                print(f"Failed to fetch file list: {e}")
+                messagebox.showerror(
+                    TEXTS["error_msg"], TEXTS["error_connection_failed_message"])
+            else:
+                print(f"XML parsing error: {e}")
+            finalize_refresh(None)
 
         def finalize_refresh(new_data):
-            nonlocal file_list
-            file_list = new_data
-            if last_sort_column:
-                file_list.sort(key=lambda x: x.get(last_sort_column, 0), reverse=last_sort_direction)
-            
-            # 2. 清除暫存文字並填入正式資料
-            tree.delete(*tree.get_children())
-            update_treeview()
-            
-            # 3. 恢復介面
+            """比對新舊列表 (以 FPATH 為鍵)，只新增、移除或更新有變動的列"""
+            startup_mark("listing")
+            if tree.exists("loading_placeholder"):
+                tree.delete("loading_placeholder")
+            if new_data is None:
+                # 讀取失敗時保留目前的列表 (並移除僅部分接收的列)
+                if not len(catalog):
+                    tree.delete(*tree.get_children())
+                status_label.config(text="")
+                set_ui_state(tk.NORMAL)
+                return
+
+            # 2. 更新目錄 (既有檔案沿用原本的索引)，並移除卡片上已不存在的檔案
+            removed, changed = catalog.update(new_data)
+            if trip_view:
+                # 分組可能因任一檔案改變，直接重建 (未展開的行程只有一列)
+                render_trips()
+                status_label.config(text="")
+                set_ui_state(tk.NORMAL)
+                return
+            removed = [p for p in removed if tree.exists(p)]
+            if removed:
+                tree.delete(*removed)
+            order = display_order()
+
+            if virtual_list:
+                # 虛擬列表直接換上新資料，只重繪可見範圍
+                vlist.set_records(order, changed)
+            else:
+                # 3. 依排序後的位置插入新列；內容變動的列更新欄位並清除舊縮圖
+                # 先暫時卸下變動的列，剩下未變動的列相對順序不變，
+                # 再依最終位置由前往後放回，因此只需處理有變動的列
+                # (首次載入時邊接收邊插入的列也會在此依排序放回正確位置)
+                moved = [p for p in changed if tree.exists(p)]
+                if moved:
+                    tree.detach(*moved)
+                for position, file in enumerate(order):
+                    item_id = file.filepath
+                    if item_id not in changed:
+                        continue
+                    if tree.exists(item_id):
+                        tree.item(item_id, values=row_values(file), image="", text=TEXTS["loading_text"])
+                        tree.move(item_id, "", position)
+                    else:
+                        tree.insert("", position, iid=item_id, text=TEXTS["loading_text"],
+                                    values=row_values(file))
+
+            # 4. 恢復介面
+            status_label.config(text="")
             set_ui_state(tk.NORMAL)
             # 載入完成後觸發一次縮圖掃描
             thumb_mgr.on_scroll_event()
 
-        # 啟動執行緒
-        threading.Thread(target=worker, daemon=True).start()
+        # 在背景取得列表；批次結果經由 root.after 交回主執行緒
+        on_batch = (lambda batch: root.after(0, lambda: append_rows(batch))) if streaming else None
+        jobs.submit(fetch_file_data, on_batch, name="refresh_file_list",
+                    on_done=finalize_refresh, on_error=failed)
 
     # Initialize file list
     # update_treeview()
@@ -560,10 +1076,9 @@ def create_file_browser(initial_file_list):
 
         selected_item = tree.selection()
         if selected_item:
-            item_values = tree.item(selected_item[0], "values")
-            file = next(
-                f for f in file_list if f["index"] == int(item_values[0]))
-            show_playback_url(file["filepath"])
+            file = catalog.get(selected_item[0])
+            if file:
+                show_playback_url(file.filepath)
 
     tree.bind("<Double-1>", on_double_click)
 
@@ -575,106 +1090,163 @@ def create_file_browser(initial_file_list):
         Sorts the file list by the specified column.
         """
 
-        nonlocal file_list, last_sort_column, last_sort_direction
+        nonlocal last_sort_column, last_sort_direction
+        if trip_view:
+            return  # 行程固定依時間排列
         reverse = sort_direction[column]
         sort_direction[column] = not reverse
         last_sort_column = column
         last_sort_direction = reverse
-        file_list.sort(key=lambda x: x[column], reverse=reverse)
-        update_treeview()
+        order = catalog.sorted(column, reverse)
+        if virtual_list:
+            vlist.set_records(order)
+        else:
+            # 以重新排列既有列的方式排序 (單一 Tk 呼叫)，保留已載入的縮圖
+            tree.set_children("", *[f.filepath for f in order])
+            thumb_mgr.on_scroll_event()
+
+    def selected_files():
+        """
+        目前選取的檔案 (虛擬列表模式包含已捲出畫面的選取)
+        行程分組模式下，選取行程代表其中所有檔案，選取配對列代表前後鏡頭兩個檔案
+        """
+        selection = vlist.selection() if virtual_list else tree.selection()
+        if trip_view:
+            paths = set()
+            for item_id in selection:
+                if item_id in trip_items:
+                    paths.update(f.filepath for f in trip_items[item_id].files)
+                elif item_id in pair_items:
+                    paths.update(f.filepath for f in pair_items[item_id].files)
+                else:
+                    paths.add(item_id)
+            return [file for file in catalog.sorted("filetime") if file.filepath in paths]
+        return [file for file in display_order() if file.filepath in selection]
 
     def on_right_click(event):
         """
         Handles right-click events on the Treeview.
+        Deletes the selected files, or the clicked file if it is not selected.
         """
 
         selected_item = tree.identify_row(event.y)
-        if selected_item:
-            tree.selection_set(selected_item)  # Select the right-clicked item
-            item_values = tree.item(selected_item, "values")
-            file = next(
-                f for f in file_list if f["index"] == int(item_values[0]))
-            if messagebox.askyesno(TEXTS["delete_confirmation_title"], TEXTS["delete_confirmation_message"] + file["filename"] + "?"):
-                delete_file(file["filepath"], refresh_file_list)
-
-    # Recording status detection
-    def check_recording_status():
+        if not selected_item:
+            return
+        if selected_item not in tree.selection():
+            # Select the right-clicked item only (also drops off-screen selections)
+            if virtual_list:
+                vlist.selection_set([selected_item])
+            else:
+                tree.selection_set(selected_item)
+        files = selected_files()
+        if len(files) == 1:
+            message = TEXTS["delete_confirmation_message"] + files[0].filename + "?"
+        else:
+            message = TEXTS["delete_confirmation_multi"].format(
+                count=len(files), gb=sum(f.filebytes for f in files) / 1024 ** 3)
+        if files and messagebox.askyesno(TEXTS["delete_confirmation_title"], message):
+            delete_records(files)
+
+    def reclaim_space():
+        """刪除最舊、未受保護的檔案，直到釋放指定的空間"""
+        gigabytes = simpledialog.askfloat(
+            TEXTS["reclaim_title"], TEXTS["reclaim_prompt"], minvalue=0.1, parent=root)
+        if not gigabytes:
+            return
+        files = select_reclaim(catalog, int(gigabytes * 1024 ** 3))
+        if not files:
+            messagebox.showinfo(TEXTS["reclaim_title"], TEXTS["reclaim_none"])
+            return
+        message = TEXTS["reclaim_confirm"].format(
+            count=len(files), gb=sum(f.filebytes for f in files) / 1024 ** 3,
+            oldest=files[0].filetime, newest=files[-1].filetime)
+        if messagebox.askyesno(TEXTS["delete_confirmation_title"], message):
+            delete_records(files)
+
+    def delete_records(files):
         """
-        Checks the recording status from the server.
+        Deletes files in one background batch, then reports and updates the list once.
 
-        Returns:
-            bool: True if recording is in progress, False otherwise.
+        Args:
+            files (list): FileRecord to delete.
         """
 
-        try:
-            response = requests.get("http://192.168.1.254/?custom=1&cmd=3037")
-            response.raise_for_status()
-            root = ET.fromstring(response.text)
-            status = root.find(".//Status").text
-            value = int(root.find(".//Value").text)
-            if status != "0":
-                messagebox.showerror(
-                    TEXTS["error_msg"], TEXTS["error_recording_status_message"] + status)
-                return False
-            if value == 1:
-                return True  # Recording in progress
-            return False
-        except Exception as e:
-            messagebox.showerror(
-                TEXTS["error_msg"], TEXTS["error_recording_status_message"] + str(e))
-            return False
+        set_ui_state(tk.DISABLED)
+        sizes = {file.filepath: file.filebytes for file in files}
+
+        def progress(done, total):
+            text = TEXTS["delete_progress"].format(done=done, total=total)
+            root.after(0, lambda: status_label.config(text=text))
+
+        def done(result):
+            deleted, failed = result
+            # 先在本機移除已刪除的列，不必為每個檔案重新讀取列表
+            gone = set(deleted)
+            removed, _ = catalog.update([f for f in catalog if f.filepath not in gone])
+            if virtual_list:
+                vlist.set_records(display_order())
+            elif trip_view:
+                # 刪除前鏡頭列會連同其下的後鏡頭列一起移除，改為重新分組
+                render_trips()
+            else:
+                rows = [p for p in removed if tree.exists(p)]
+                if rows:
+                    tree.delete(*rows)
+            status_label.config(text="")
+            set_ui_state(tk.NORMAL)
 
-    def toggle_recording(is_recording):
-        """
-        Toggles the recording status on the server.
+            message = TEXTS["delete_summary"].format(
+                count=len(deleted), gb=sum(sizes[p] for p in deleted) / 1024 ** 3)
+            if failed:
+                details = "\n".join(f"{p}: {e}" for p, e in list(failed.items())[:10])
+                messagebox.showerror(TEXTS["error_msg"], message + "\n" + TEXTS["delete_summary_failed"].format(
+                    count=len(failed)) + "\n" + details)
+            else:
+                messagebox.showinfo(TEXTS["success_msg"], message)
+            # If enable "refrech after delete, activate this"
+            if del_refresh:
+                refresh_file_list()  # 整批完成後只重新整理一次
 
-        Args:
-            is_recording (bool): True if recording is currently in progress, False otherwise.
+        def failed(e):
+            status_label.config(text="")
+            set_ui_state(tk.NORMAL)
+            messagebox.showerror(TEXTS["error_msg"], TEXTS["error_file_delete"].format(e))
+
+        jobs.submit(lambda: delete_files(device, list(sizes), progress=progress),
+                    name="delete_files", on_done=done, on_error=failed)
+
+    def update_record_button(is_recording):
+        record_button.config(
+            text=TEXTS["record_button_stop"] if is_recording else TEXTS["record_button_start"])
+
+    def toggle_recording():
+        """
+        Toggles the recording status on the server, based on its current status.
         """
 
-        try:
-            par_value = "0" if is_recording else "1"
-            response = requests.get(
-                f"http://192.168.1.254/?custom=1&cmd=2001&par={par_value}")
-            response.raise_for_status()
-            root = ET.fromstring(response.text)
-            status = root.find(".//Status").text
-            if status == "0":
-                new_status = not is_recording
-                record_button.config(
-                    text=TEXTS["record_button_stop"] if new_status else TEXTS["record_button_start"])
-            else:
+        def work():
+            # 快取的狀態超過 TTL 才會重新詢問設備
+            is_recording = device_state.read("recording")
+            dashcam.set_recording(device, not is_recording)
+            device_state.update(
+                mode=dashcam.MODE_RECORDING_IDLE if is_recording else dashcam.MODE_RECORDING,
+                connected=True)
+            return not is_recording
+
+        def failed(e):
+            if isinstance(e, DeviceStatusError):
                 messagebox.showerror(
                     TEXTS["error_msg"], TEXTS["error_toggle_recording_message"])
-        except Exception as e:
-            messagebox.showerror(
-                TEXTS["error_msg"], TEXTS["error_toggle_recording_message"] + str(e))
-
-    def check_mode():
-        """
-        Checks the current review mode status from the server.
+            else:
+                messagebox.showerror(
+                    TEXTS["error_msg"], TEXTS["error_toggle_recording_message"] + str(e))
 
-        Returns:
-            int: 
-                0, 1: Recording mode
-                3: Review mode
-                4: Photo mode
-        """
-        try:
-            response = requests.get("http://192.168.1.254/?custom=1&cmd=3037")
-            response.raise_for_status()
-            root = ET.fromstring(response.text)
-            value = int(root.find(".//Value").text)
-            print(f"Current mode number: {value}")
-            return value
-        except Exception as e:
-            messagebox.showerror(
-                TEXTS["error_msg"], TEXTS["error_toggle_mode_message"] + str(e))
-            return None  # Return None on error
+        jobs.submit(work, name="toggle_recording",
+                    on_error=failed, on_state=job_button(record_button))
 
-    def toggle_mode(current_mode):
+    def send_mode(current_mode):
         """
-        Toggles the review mode on the server.
+        Switches the server to the next mode. Blocking; run it as a job.
 
         Args:
             current_mode (int): Current mode (0, 1: Recording, 3: Review, 4: Photo)
@@ -682,67 +1254,57 @@ def create_file_browser(initial_file_list):
         Returns:
             int: New mode after toggling
         """
-        try:
-            if current_mode == 0 or current_mode == 1:  # Recording -> Photo
-                par_value = "0"
-            elif current_mode == 4:  # Photo -> Review
-                par_value = "2"
-            else:  # Review -> Recording
-                par_value = "1"
-
-            response = requests.get(
-                f"http://192.168.1.254/?custom=1&cmd=3001&par={par_value}")
-            response.raise_for_status()
-            root = ET.fromstring(response.text)
-            status = root.find(".//Status").text
-            if status == "0":
-                if current_mode == 0 or current_mode == 1:
-                    return 4  # Switch to Photo mode
-                elif current_mode == 4:
-                    return 3  # Switch to Review mode
-                else:
-                    return 0  # Switch to Recording mode
-            else:
+        # Recording -> Photo -> Review -> Recording
+        new_mode = dashcam.set_mode(device, dashcam.next_mode(current_mode))
+        device_state.update(mode=new_mode, connected=True)
+        return new_mode
+
+    def toggle_mode():
+        """
+        Toggles the review mode on the server.
+        Uses the cached mode, re-read first if older than the state TTL.
+        """
+
+        def failed(e):
+            if isinstance(e, DeviceStatusError):
                 messagebox.showerror(
                     TEXTS["error_msg"], TEXTS["error_toggle_mode_message"])
-                return current_mode
-        except Exception as e:
-            messagebox.showerror(
-                TEXTS["error_msg"], TEXTS["error_toggle_mode_message"] + str(e))
-            return current_mode
+            else:
+                messagebox.showerror(
+                    TEXTS["error_msg"], TEXTS["error_toggle_mode_message"] + str(e))
+            update_mode(current_mode)
+
+        set_ui_state(tk.DISABLED)
+        jobs.submit(lambda: send_mode(device_state.read("mode")), name="toggle_mode",
+                    on_done=update_mode, on_error=failed)
 
     def sync_time():
         """
         Synchronizes the time with the server.
         """
-        try:
-            current_date = datetime.now().strftime("%Y-%m-%d")
-            current_time = datetime.now().strftime("%H:%M:%S")
-
-            # Send date
-            response_date = requests.get(
-                f"http://192.168.1.254/?custom=1&cmd=3005&str={current_date}")
-            response_date.raise_for_status()
-            root_date = ET.fromstring(response_date.text)
-            status_date = root_date.find(".//Status").text
-
-            # Send time
-            response_time = requests.get(
-                f"http://192.168.1.254/?custom=1&cmd=3006&str={current_time}")
-            response_time.raise_for_status()
-            root_time = ET.fromstring(response_time.text)
-            status_time = root_time.find(".//Status").text
-
-            if status_date == "0" and status_time == "0":
-                messagebox.showinfo(
-                    TEXTS["success_msg"], TEXTS["success_sync_time_message"] + f"{current_date} {current_time}")
+
+        def work():
+            return dashcam.sync_time_precise(device)
+
+        def done(result):
+            if result["offset"] is None:
+                detail = TEXTS["sync_time_unverified"].format(rtt=result["rtt"] * 1000)
             else:
+                detail = TEXTS["sync_time_offset"].format(
+                    offset=result["offset"] * 1000, error=result["error"] * 1000, rtt=result["rtt"] * 1000)
+            messagebox.showinfo(
+                TEXTS["success_msg"], TEXTS["success_sync_time_message"] + result["time"] + "\n" + detail)
+
+        def failed(e):
+            if isinstance(e, DeviceStatusError):
                 messagebox.showerror(
                     TEXTS["error_msg"], TEXTS["error_sync_time_message"])
+            else:
+                messagebox.showerror(
+                    TEXTS["error_msg"], TEXTS["error_sync_time_message"] + str(e))
 
-        except Exception as e:
-            messagebox.showerror(
-                TEXTS["error_msg"], TEXTS["error_sync_time_message"] + str(e))
+        jobs.submit(work, name="sync_time", on_done=done,
+                    on_error=failed, on_state=job_button(sync_time_button))
 
     def get_live_stream_url(current_mode):
         """
@@ -751,37 +1313,44 @@ def create_file_browser(initial_file_list):
         Args:
             current_mode (int): Current mode (0: Recording, 3: Review, 4: Photo)
         """
-        try:
-            response = requests.get("http://192.168.1.254/?custom=1&cmd=2019")
-            response.raise_for_status()
-            root = ET.fromstring(response.text)
-            if current_mode == 0 or current_mode == 1:
-                movie_link = root.find(".//MovieLiveViewLink").text
-            elif current_mode == 4:
-                movie_link = root.find(".//PhotoLiveViewLink").text
-            show_playback_url(movie_link)
-        except Exception as e:
+
+        def work():
+            return dashcam.live_view_url(device, current_mode)
+
+        def done(movie_link):
+            if movie_link.lower().startswith("http"):
+                # MJPEG 串流直接在程式內播放；RTSP 仍需複製到外部播放器
+                live_view_window(movie_link)
+            else:
+                show_playback_url(movie_link)
+            update_functional_buttons()
+
+        def failed(e):
             messagebox.showerror(
                 TEXTS["error_msg"], TEXTS["error_live_stream_url_message"] + str(e))
+            update_functional_buttons()
+
+        jobs.submit(work, name="live_stream_url", on_done=done, on_error=failed,
+                    on_state=job_button(live_stream_button))
 
     def take_picture():
         """
         Sends the command to take a picture.
         """
-        try:
-            response = requests.get("http://192.168.1.254/?custom=1&cmd=1001")
-            response.raise_for_status()
-            root = ET.fromstring(response.text)
-            status = root.find(".//Status").text
-            if status == "0":
-                messagebox.showinfo(
-                    TEXTS["success_msg"], TEXTS["take_pic_success"])
-            else:
-                messagebox.showerror(
-                    TEXTS["error_msg"], TEXTS["error_take_pic"])
-        except Exception as e:
-            print(f"Failed to take picture: {e}")
+
+        def done(_):
+            messagebox.showinfo(
+                TEXTS["success_msg"], TEXTS["take_pic_success"])
+            update_functional_buttons()
+
+        def failed(e):
+            if not isinstance(e, DeviceStatusError):
+                print(f"Failed to take picture: {e}")
             messagebox.showerror(TEXTS["error_msg"], TEXTS["error_take_pic"])
+            update_functional_buttons()
+
+        jobs.submit(dashcam.take_picture, device, name="take_picture", on_done=done,
+                    on_error=failed, on_state=job_button(take_picture_button))
 
     # Helper function for getting mode text
     def get_mode_text(mode):
@@ -808,6 +1377,44 @@ def create_file_browser(initial_file_list):
 
     dl_stat = False
 
+    # Initial virtual list state
+    virtual_list = False
+
+    def virtual_list_toggle():
+        global virtual_list
+        # Filp status
+        virtual_list = not virtual_list
+        if virtual_list:
+            if trip_view:
+                trip_view_toggle()  # 行程分組只支援一般列表
+            vlist.enable(display_order())
+        else:
+            vlist.disable()
+            update_treeview()
+        # Update button text
+        virtual_list_btn.config(
+            text=TEXTS["virtual_list_on"] if virtual_list else TEXTS["virtual_list_off"]
+        )
+
+    # Initial trip grouping state
+    trip_view = False
+
+    def trip_view_toggle():
+        global trip_view
+        # Filp status
+        trip_view = not trip_view
+        if not trip_view:
+            trip_items.clear()
+            pair_items.clear()
+        if trip_view and virtual_list:
+            virtual_list_toggle()  # 行程分組只支援一般列表 (切回時會重建列表)
+        else:
+            update_treeview()
+        # Update button text
+        trip_view_btn.config(
+            text=TEXTS["trip_view_on"] if trip_view else TEXTS["trip_view_off"]
+        )
+
     def dl_toggle():
         global dl_stat
         # Filp status
@@ -825,8 +1432,155 @@ def create_file_browser(initial_file_list):
             text=TEXTS["dl_light"] if dl_stat else TEXTS["dl_dark"],
         )
 
+    def download_selected():
+        """下載選取的檔案 (多連線、可續傳)"""
+        files = selected_files()
+        if not files:
+            return
+        dest_dir = filedialog.askdirectory(title=TEXTS["download_dir_title"])
+        if not dest_dir:
+            return
+        def work():
+            transferred, seconds = 0, 0.0
+            for file in files:
+                def progress(done, total, rate, name=file.filename):
+                    text = TEXTS["download_progress"].format(
+                        name=name, pct=100 * done / max(total, 1), rate=rate / (1024 * 1024))
+                    root.after(0, lambda: status_label.config(text=text))
+
+                result = downloader.download(
+                    file.filepath, dest_dir, size=file.filebytes, progress=progress)
+                transferred += result["transferred"]
+                seconds += result["seconds"]
+            return TEXTS["download_done"].format(
+                count=len(files), rate=transferred / max(seconds, 1e-6) / (1024 * 1024))
+
+        def failed(e):
+            print(f"Download failed: {e}")
+            messagebox.showerror(TEXTS["error_msg"], TEXTS["error_download"] + str(e))
+
+        jobs.submit(work, name="download", on_done=lambda text: status_label.config(text=text),
+                    on_error=failed, on_state=job_button(download_button))
+
+    mirror_dir = None
+
+    def mirror_to_disk():
+        """將卡片上新增或變動的檔案同步到本機封存資料夾 (只傳送差異)"""
+        nonlocal mirror_dir
+        dest_root = filedialog.askdirectory(
+            title=TEXTS["mirror_dir_title"], initialdir=mirror_dir or None)
+        if not dest_root:
+            return
+        mirror_dir = dest_root
+
+        def progress(position, count, record, done, total, rate):
+            text = TEXTS["mirror_progress"].format(
+                position=position, count=count, name=record.filename,
+                pct=100 * done / max(total, 1), rate=rate / (1024 * 1024))
+            root.after(0, lambda: status_label.config(text=text))
+
+        def work():
+            # 以最新的列表比對本機清單，而非畫面上可能過期的列表
+            return mirror_card(downloader, fetch_file_data(), dest_root, progress=progress)
+
+        def done(summary):
+            text = TEXTS["mirror_done"].format(
+                files=summary["files"], skipped=summary["skipped"],
+                gb=summary["bytes"] / 1024 ** 3)
+            status_label.config(text=text)
+            if summary["failed"]:
+                details = "\n".join(f"{p}: {e}" for p, e in list(summary["failed"].items())[:10])
+                messagebox.showerror(TEXTS["error_msg"], text + "\n" + TEXTS["mirror_failed"].format(
+                    count=len(summary["failed"])) + "\n" + details)
+
+        def failed(e):
+            print(f"Mirror failed: {e}")
+            status_label.config(text="")
+            messagebox.showerror(TEXTS["error_msg"], TEXTS["error_mirror"] + str(e))
+
+        jobs.submit(work, name="mirror", on_done=done, on_error=failed,
+                    on_state=job_button(mirror_button))
+
+    def export_gps():
+        """將選取影片內的 GPS 軌跡匯出為 GPX (只讀取 GPS 區塊，不下載影片)"""
+        files = sorted((f for f in selected_files() if f.filename.upper().endswith(".MP4")),
+                       key=lambda f: f.timestamp)
+        if not files:
+            messagebox.showinfo(TEXTS["gps_title"], TEXTS["gps_select"])
+            return
+        path = filedialog.asksaveasfilename(
+            title=TEXTS["gps_title"], defaultextension=".gpx", filetypes=[("GPX", "*.gpx")])
+        if not path:
+            return
+
+        def work():
+            tracks = []
+            for position, file in enumerate(files, 1):
+                text = TEXTS["gps_progress"].format(position=position, count=len(files), name=file.filename)
+                root.after(0, lambda text=text: status_label.config(text=text))
+                tracks.append(clip_metadata(device, file, metadata_cache, gps=True)["gps"])
+            metadata_cache.save()
+            return write_gpx(path, tracks), sum(1 for track in tracks if track)
+
+        def done(result):
+            points, clips = result
+            status_label.config(text="")
+            if points:
+                messagebox.showinfo(TEXTS["gps_title"], TEXTS["gps_done"].format(
+                    points=points, clips=clips, path=path))
+            else:
+                messagebox.showinfo(TEXTS["gps_title"], TEXTS["gps_none"])
+
+        def failed(e):
+            print(f"GPS export failed: {e}")
+            status_label.config(text="")
+            messagebox.showerror(TEXTS["error_msg"], TEXTS["error_gps"] + str(e))
+
+        jobs.submit(work, name="gps_export", on_done=done, on_error=failed,
+                    on_state=job_button(gps_button))
+
+    # 狀態列 (下載進度等)
+    status_frame = ttk.Frame(root)
+    status_frame.pack(side=tk.BOTTOM, fill=tk.X, padx=10)
+    status_label = Label(status_frame, text="", anchor="w")
+    status_label.pack(side=tk.LEFT, fill=tk.X, expand=True)
+
+    # 連線品質 (延遲百分位數與連線狀態)
+    link_label = Label(status_frame, text=TEXTS["link_unknown"], anchor="e")
+    link_label.pack(side=tk.RIGHT)
+    link_label.bind("<Button-1>", lambda event: diagnostics_window())
+    link_colors = {LINK_DEGRADED: "orange", LINK_OFFLINE: "red"}
+
+    def update_link_label():
+        link = device_state.link
+        if link == LINK_OFFLINE:
+            text = TEXTS["link_offline"]
+        elif link is None:
+            text = TEXTS["link_unknown"]
+        else:
+            text = TEXTS["link_ok"] if link == LINK_OK else TEXTS["link_degraded"]
+            stats = device_state.health.stats()
+            if stats["p50"] is not None:
+                text += TEXTS["link_latency"].format(
+                    p50=stats["p50"] * 1000, p90=stats["p90"] * 1000)
+        link_label.config(text=text, foreground=link_colors.get(link, ""))
+
+    def link_label_tick():
+        # 延遲統計只在本機計算，定期更新顯示不會增加設備請求
+        update_link_label()
+        root.after(2000, link_label_tick)
+
+    link_label_tick()
+
     tree.bind("<Button-3>", on_right_click)
 
+    def on_left_click(event):
+        """虛擬列表模式下，單純點選 (未按 Shift/Ctrl) 會取代選取，一併清除已捲出畫面的選取"""
+        if virtual_list and not event.state & 0x0005 and tree.identify_row(event.y):
+            vlist.selection_set(())
+
+    tree.bind("<Button-1>", on_left_click)
+
     tree.pack(fill=tk.BOTH, expand=True)
 
     # Refresh button
@@ -834,25 +1588,22 @@ def create_file_browser(initial_file_list):
         button_frame, text=TEXTS["refresh_button"], command=refresh_file_list)
     refresh_button.pack(side=tk.LEFT, padx=10)
 
-    # Get initial mode
-    current_mode = check_mode()
+    # 模式與錄影狀態在視窗顯示後於背景查詢 (見檔案結尾的啟動流程)
+    current_mode = None
 
     # Review Mode Button
     toggle_mode_button = ttk.Button(
         button_frame,
         text=get_mode_text(current_mode),  # Use helper function for text
-        command=lambda: update_mode(toggle_mode(check_mode()))  # Check mode on toggle mode to ensure status is correct
+        command=toggle_mode
     )
     toggle_mode_button.pack(side=tk.LEFT, padx=10)
 
-    # Get initial recording status
-    recording_status = check_recording_status()
-
     # Recording toggle button
     record_button = ttk.Button(
         button_frame,
-        text=TEXTS["record_button_stop"] if recording_status else TEXTS["record_button_start"],
-        command=lambda: toggle_recording(check_recording_status()),
+        text=TEXTS["record_button_start"],
+        command=toggle_recording,
         state=tk.NORMAL if current_mode == 0 or current_mode == 1 else tk.DISABLED
     )
     record_button.pack(side=tk.LEFT, padx=10)
@@ -911,20 +1662,23 @@ def create_file_browser(initial_file_list):
 
     def set_camera_view(view_mode):
         """傳送指令切換視角"""
-        nonlocal current_view
-        try:
-            response = requests.get(f"http://192.168.1.254/?custom=1&cmd=3028&par={view_mode}")
-            response.raise_for_status()
-            root_xml = ET.fromstring(response.text)
-            status = root_xml.find(".//Status").text
-            
-            if status == "0":
-                current_view = view_mode
-                update_view_button_text()
+
+        def work():
+            dashcam.set_camera_view(device, view_mode)
+            # 按鈕文字由狀態變更通知更新
+            device_state.update(view=view_mode, connected=True)
+
+        def done(_):
+            startup_mark("camera_view")
+
+        def failed(e):
+            if isinstance(e, DeviceStatusError):
+                print(f"Failed to set view: {e.status}")
             else:
-                print(f"Failed to set view: {status}")
-        except Exception as e:
-            print(f"Error setting camera view: {e}")
+                print(f"Error setting camera view: {e}")
+
+        jobs.submit(work, name="set_camera_view",
+                    on_done=done, on_error=failed, on_state=job_button(view_button))
 
     def toggle_view():
         """循環切換視角：0 -> 1 -> 2 -> 0"""
@@ -939,6 +1693,38 @@ def create_file_browser(initial_file_list):
     )
     view_button.pack(side=tk.LEFT, padx=10)
 
+    download_button = ttk.Button(
+        button_frame2, text=TEXTS["download_btn"], command=download_selected)
+    download_button.pack(side=tk.LEFT, padx=10)
+
+    virtual_list_btn = ttk.Button(
+        button_frame2,
+        text=TEXTS["virtual_list_on"] if virtual_list else TEXTS["virtual_list_off"],
+        command=virtual_list_toggle)
+    virtual_list_btn.pack(side=tk.LEFT, padx=10)
+
+    trip_view_btn = ttk.Button(
+        button_frame2,
+        text=TEXTS["trip_view_on"] if trip_view else TEXTS["trip_view_off"],
+        command=trip_view_toggle)
+    trip_view_btn.pack(side=tk.LEFT, padx=10)
+
+    reclaim_button = ttk.Button(
+        button_frame2, text=TEXTS["reclaim_btn"], command=reclaim_space)
+    reclaim_button.pack(side=tk.LEFT, padx=10)
+
+    mirror_button = ttk.Button(
+        button_frame2, text=TEXTS["mirror_btn"], command=mirror_to_disk)
+    mirror_button.pack(side=tk.LEFT, padx=10)
+
+    gps_button = ttk.Button(
+        button_frame2, text=TEXTS["gps_btn"], command=export_gps)
+    gps_button.pack(side=tk.LEFT, padx=10)
+
+    diagnostics_button = ttk.Button(
+        button_frame2, text=TEXTS["diag_btn"], command=diagnostics_window)
+    diagnostics_button.pack(side=tk.LEFT, padx=10)
+
     def update_view_button_text():
         """根據狀態更新按鈕文字"""
         mapping = {
@@ -955,18 +1741,35 @@ def create_file_browser(initial_file_list):
     # 2. 鎖定 UI 避免在初次載入時被操作
     set_ui_state(tk.DISABLED)
 
-    # 在 create_file_browser 結尾處的初始化邏輯
-    def initial_setup():
-        # 1. 啟動時強制切換到雙鏡頭 (par=2)
-        set_camera_view(2)
-        # 2. 接著執行原本的檔案清單獲取
+    # 啟動流程：視窗立即顯示，初始查詢同時在背景送出
+    # 1. 一次 cmd=3037 同時取得模式與錄影狀態；設備回應後立即開始讀取列表
+    def startup_status_done(_):
+        # 模式與錄影按鈕已由狀態變更通知更新
+        startup_mark("status")
         refresh_file_list()
 
-    # 原本是 root.after(100, refresh_file_list) 改為：
-    root.after(1000, initial_setup)
-    # Check schedule
-    root.after(10000, check_connection)
+    def startup_status_failed(e):
+        startup_mark("status")
+        startup_mark("listing")
+        print(f"Startup status check failed: {e}")
+        tree.delete(*tree.get_children())
+        set_ui_state(tk.NORMAL)
+        messagebox.showerror(
+            TEXTS["error_msg"], TEXTS["error_connection_failed_message"])
+
+    jobs.submit(device_state.refresh, name="startup_status",
+                on_done=startup_status_done, on_error=startup_status_failed)
+    # 2. 啟動時強制切換到雙鏡頭 (par=2)，與狀態查詢並行
+    set_camera_view(2)
+    root.after_idle(lambda: startup_mark("window"))
+
+    # 背景輪詢設備狀態 (同時作為連線保持)
+    device_state.start()
     root.mainloop()
+    if watchdog:
+        print(watchdog.summary())
 
 if __name__ == "__main__":
+    # Needed by the thumbnail decode process pool in frozen (PyInstaller) builds
+    multiprocessing.freeze_support()
     create_file_browser([])
@@ -0,0 +1,234 @@
+'''
+Per-command request metrics.
+
+DeviceClient records every HTTP attempt here: the command id (cmd=..., or
+"file" for plain file transfers), the time until the response headers arrived,
+the bytes received, the HTTP status code or the transport error, and the
+device's <Status> answer. Counts and sums are kept in fixed-bucket histograms
+(the Prometheus model) plus a window of recent latencies for percentiles, all
+in memory. snapshot() feeds the diagnostics window, to_json() and
+to_prometheus() export the same data for comparing firmware versions or
+camera models.
+'''
+import json
+import re
+import threading
+import time
+from collections import deque
+
+from health import percentile
+
+# Histogram upper bounds; the last (+Inf) bucket is implicit
+LATENCY_BUCKETS = (0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+BYTES_BUCKETS = (1024, 16 * 1024, 128 * 1024, 1024 ** 2, 16 * 1024 ** 2, 128 * 1024 ** 2)
+
+# Label of requests that are not ?custom=1&cmd=... commands
+FILE_LABEL = "file"
+
+_CMD_RE = re.compile(r"[?&]cmd=(\w+)")
+
+
+def command_label(url):
+    """
+    Metrics label of a device URL.
+
+    Args:
+        url (str): Requested URL.
+
+    Returns:
+        str: The cmd=... id, or FILE_LABEL for file downloads.
+    """
+
+    match = _CMD_RE.search(url)
+    return match.group(1) if match else FILE_LABEL
+
+
+class Histogram:
+    """
+    Cumulative-bucket histogram.
+
+    Args:
+        bounds (tuple): Ascending bucket upper bounds, +Inf is added.
+    """
+
+    def __init__(self, bounds):
+        self.bounds = tuple(bounds)
+        self.counts = [0] * (len(self.bounds) + 1)
+        self.count = 0
+        self.sum = 0
+
+    def observe(self, value):
+        for i, bound in enumerate(self.bounds):
+            if value <= bound:
+                break
+        else:
+            i = len(self.bounds)
+        self.counts[i] += 1
+        self.count += 1
+        self.sum += value
+
+    def cumulative(self):
+        """
+        Returns:
+            list: (upper bound, observations <= bound) pairs, the last bound is float("inf").
+        """
+
+        total = 0
+        result = []
+        for bound, count in zip(self.bounds + (float("inf"),), self.counts):
+            total += count
+            result.append((bound, total))
+        return result
+
+
+class CommandStats:
+    """Metrics of one command id."""
+
+    def __init__(self, window):
+        self.latency = Histogram(LATENCY_BUCKETS)
+        self.bytes = Histogram(BYTES_BUCKETS)
+        self.recent = deque(maxlen=window)
+        self.http_status = {}  # HTTP status code (or error class name) -> count
+        self.device_status = {}  # <Status> value -> count
+        self.errors = 0
+
+    def summary(self):
+        count = self.latency.count
+        return {
+            "count": count,
+            "errors": self.errors,
+            "latency_sum": self.latency.sum,
+            "latency_avg": self.latency.sum / count if count else None,
+            "latency_p50": percentile(self.recent, 50),
+            "latency_p90": percentile(self.recent, 90),
+            "latency_p99": percentile(self.recent, 99),
+            "latency_buckets": self.latency.cumulative(),
+            "bytes_sum": self.bytes.sum,
+            "bytes_buckets": self.bytes.cumulative(),
+            "http_status": dict(self.http_status),
+            "device_status": dict(self.device_status),
+        }
+
+
+class CommandMetrics:
+    """
+    Thread-safe metrics of all device requests, keyed by command id.
+
+    Args:
+        window (int): Recent latencies kept per command for the percentiles.
+    """
+
+    def __init__(self, window=200):
+        self.window = window
+        self.started = time.time()
+        self._commands = {}
+        self._lock = threading.Lock()
+
+    def _stats(self, cmd):
+        stats = self._commands.get(cmd)
+        if stats is None:
+            stats = self._commands[cmd] = CommandStats(self.window)
+        return stats
+
+    def record(self, cmd, latency, nbytes=0, http_status=None, error=None):
+        """
+        Records one HTTP attempt.
+
+        Args:
+            cmd (str): Command label (see command_label()).
+            latency (float): Seconds until the response headers (or the error).
+            nbytes (int): Response body bytes received.
+            http_status (int): HTTP status code, None if no response arrived.
+            error (str): Name of the transport error, if any.
+        """
+
+        with self._lock:
+            stats = self._stats(cmd)
+            stats.latency.observe(latency)
+            stats.bytes.observe(nbytes)
+            stats.recent.append(latency)
+            key = str(http_status) if http_status is not None else error or "error"
+            stats.http_status[key] = stats.http_status.get(key, 0) + 1
+            if error is not None or (http_status is not None and http_status >= 400):
+                stats.errors += 1
+
+    def record_status(self, cmd, status):
+        """
+        Records the <Status> value of a parsed answer.
+
+        Args:
+            cmd (str): Command id.
+            status (str): The <Status> text, None if the answer had none.
+        """
+
+        key = "none" if status is None else status
+        with self._lock:
+            stats = self._stats(cmd)
+            stats.device_status[key] = stats.device_status.get(key, 0) + 1
+
+    def reset(self):
+        with self._lock:
+            self._commands.clear()
+            self.started = time.time()
+
+    def snapshot(self):
+        """
+        Returns:
+            dict: command label -> summary dict (count, errors, latency
+                sum/avg/p50/p90/p99 in seconds, cumulative latency and bytes
+                buckets, bytes_sum, http_status and device_status counts).
+        """
+
+        with self._lock:
+            return {cmd: stats.summary() for cmd, stats in sorted(self._commands.items())}
+
+    def to_json(self, indent=None):
+        """
+        Returns:
+            str: The snapshot with its collection period, as JSON.
+        """
+
+        document = {"started": self.started, "exported": time.time(), "commands": {}}
+        for cmd, summary in self.snapshot().items():
+            for name in ("latency_buckets", "bytes_buckets"):
+                summary[name] = {_bound_text(bound): count for bound, count in summary[name]}
+            document["commands"][cmd] = summary
+        return json.dumps(document, indent=indent)
+
+    def to_prometheus(self):
+        """
+        Returns:
+            str: The metrics in the Prometheus text exposition format.
+        """
+
+        snapshot = self.snapshot()
+        lines = []
+
+        def histogram(name, help_text, key, sum_key):
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} histogram")
+            for cmd, summary in snapshot.items():
+                for bound, count in summary[key]:
+                    lines.append(f'{name}_bucket{{cmd="{cmd}",le="{_bound_text(bound)}"}} {count}')
+                lines.append(f'{name}_sum{{cmd="{cmd}"}} {summary[sum_key]}')
+                lines.append(f'{name}_count{{cmd="{cmd}"}} {summary["count"]}')
+
+        def counter(name, help_text, key, label):
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} counter")
+            for cmd, summary in snapshot.items():
+                for value, count in sorted(summary[key].items()):
+                    lines.append(f'{name}{{cmd="{cmd}",{label}="{value}"}} {count}')
+
+        histogram("db5_request_latency_seconds",
+                  "Time until the response headers arrived.", "latency_buckets", "latency_sum")
+        histogram("db5_response_bytes", "Response body size.", "bytes_buckets", "bytes_sum")
+        counter("db5_requests_total", "Requests by HTTP status or transport error.",
+                "http_status", "code")
+        counter("db5_device_status_total", "Answers by <Status> value.",
+                "device_status", "status")
+        return "\n".join(lines) + "\n"
+
+
+def _bound_text(bound):
+    return "+Inf" if bound == float("inf") else repr(bound)
@@ -0,0 +1,169 @@
+'''
+Incremental card-to-disk mirror.
+
+A local manifest remembers the FPATH, SIZE and TIME of every file already
+copied to the archive. A mirror run compares the cmd=3015 listing against it
+and only transfers new or changed files, protected / event clips first, then
+the oldest clips (the first ones loop recording will overwrite). The manifest
+is rewritten atomically after each completed file, and the downloader keeps
+partial files resumable, so an interrupted run continues where it stopped.
+'''
+import json
+import os
+
+from cleanup import is_protected
+from downloader import DownloadCancelled
+
+MANIFEST_NAME = "db5_manifest.json"
+MANIFEST_VERSION = 1
+
+
+def local_relpath(filepath):
+    """
+    Maps a device FPATH to a path inside the archive, keeping the card's folders.
+
+    Args:
+        filepath (str): FPATH, e.g. A:\\Novatek\\Movie\\2024_0131_123456_F.MP4
+
+    Returns:
+        str: Relative local path, e.g. Novatek/Movie/2024_0131_123456_F.MP4
+    """
+
+    parts = [p for p in filepath.replace("\\", "/").split("/") if p]
+    if parts and parts[0].endswith(":"):
+        parts = parts[1:]  # Drop the drive letter
+    # Never let a listing entry escape the archive folder
+    parts = [p for p in parts if p not in (".", "..")]
+    return os.path.join(*parts) if parts else ""
+
+
+class MirrorManifest:
+    """
+    Record of the files present in the local archive.
+
+    Args:
+        dest_root (str): Archive folder; the manifest is stored inside it.
+    """
+
+    def __init__(self, dest_root):
+        self.dest_root = dest_root
+        self.path = os.path.join(dest_root, MANIFEST_NAME)
+        self.files = {}  # FPATH -> {"size", "time", "path"}
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            if data.get("version") == MANIFEST_VERSION:
+                self.files = data.get("files", {})
+        except (OSError, ValueError, AttributeError):
+            pass
+
+    def is_current(self, record):
+        """
+        Checks whether the archive already holds this version of a file.
+
+        Args:
+            record (FileRecord): Listing entry.
+
+        Returns:
+            bool: True if SIZE and TIME match and the local copy is complete.
+        """
+
+        entry = self.files.get(record.filepath)
+        if not entry or entry.get("size") != record.filebytes or entry.get("time") != record.filetime:
+            return False
+        try:
+            return os.path.getsize(os.path.join(self.dest_root, entry["path"])) == record.filebytes
+        except (OSError, KeyError):
+            return False
+
+    def mark(self, record, relpath):
+        """Records a completed file and saves the manifest."""
+
+        self.files[record.filepath] = {
+            "size": record.filebytes, "time": record.filetime, "path": relpath}
+        self.save()
+
+    def save(self):
+        """Writes the manifest atomically (temporary file + rename)."""
+
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"version": MANIFEST_VERSION, "files": self.files}, f)
+        os.replace(tmp_path, self.path)
+
+
+def plan_mirror(records, manifest):
+    """
+    Lists the files a mirror run has to transfer, in transfer order.
+
+    Args:
+        records (iterable): FileRecord of the current listing.
+        manifest (MirrorManifest): State of the archive.
+
+    Returns:
+        list: New or changed records; protected / event clips first, then oldest first.
+    """
+
+    todo = [record for record in records if not manifest.is_current(record)]
+    todo.sort(key=lambda r: (not is_protected(r), r.timestamp))
+    return todo
+
+
+def mirror_card(downloader, records, dest_root, progress=None, cancel_event=None):
+    """
+    Copies new and changed files of the listing into the archive. Blocking.
+
+    Args:
+        downloader (DownloadManager): Downloader used for the transfers.
+        records (iterable): FileRecord of the current listing (cmd=3015).
+        dest_root (str): Archive folder.
+        progress (callable): progress(position, count, record, done, total, rate)
+            for the file being transferred, called from worker threads.
+        cancel_event (threading.Event): Set to stop after the current transfer state is saved.
+
+    Returns:
+        dict: files (transferred), bytes, skipped (already current), failed
+            (dict of FPATH -> error text), seconds.
+
+    Raises:
+        DownloadCancelled: The run was cancelled; completed files stay recorded.
+    """
+
+    os.makedirs(dest_root, exist_ok=True)
+    manifest = MirrorManifest(dest_root)
+    records = list(records)
+    todo = plan_mirror(records, manifest)
+    summary = {"files": 0, "bytes": 0, "skipped": len(records) - len(todo),
+               "failed": {}, "seconds": 0.0}
+
+    for position, record in enumerate(todo, 1):
+        if cancel_event is not None and cancel_event.is_set():
+            raise DownloadCancelled(record.filepath)
+        relpath = local_relpath(record.filepath)
+        if not relpath:
+            continue
+        dest = os.path.join(dest_root, relpath)
+        os.makedirs(os.path.dirname(dest), exist_ok=True)
+
+        def report(done, total, rate, position=position, record=record):
+            if progress:
+                progress(position, len(todo), record, done, total, rate)
+
+        try:
+            result = downloader.download(
+                record.filepath, os.path.dirname(dest), size=record.filebytes,
+                progress=report, cancel_event=cancel_event,
+                # Changed on the device since the last run: the old copy stays
+                # until the new one is complete (.part, then os.replace)
+                overwrite=record.filepath in manifest.files)
+        except DownloadCancelled:
+            raise
+        except Exception as e:
+            print(f"Mirror of {record.filepath} failed: {e}")
+            summary["failed"][record.filepath] = str(e)
+            continue
+        manifest.mark(record, relpath)
+        summary["files"] += 1
+        summary["bytes"] += result["transferred"]
+        summary["seconds"] += result["seconds"]
+    return summary
@@ -0,0 +1,476 @@
+'''
+Minimal MP4 (ISO base media) reader working over HTTP Range requests.
+
+Dashcam clips are hundreds of MB, but everything needed to find a frame is in
+the small "moov" index: the sample tables give the file offset, size and time
+of every video frame and which frames are keyframes. The reader finds and
+reads moov, and from then on only the bytes of the wanted samples are fetched.
+
+Novatek firmware writes moov at the end of the file, after mdat (and the GPS
+boxes), so the last TAIL_PROBE_BYTES are read first: if they end with a
+complete moov, one request is enough. Otherwise the top-level box headers are
+walked (a 16-byte read each) and moov is read in one more request.
+'''
+import struct
+
+from device import DeviceError
+from governor import PRIORITY_INTERACTIVE
+
+# Boxes whose payload is a list of child boxes
+CONTAINER_BOXES = {b"moov", b"trak", b"mdia", b"minf", b"stbl", b"edts", b"dinf", b"udta"}
+
+# Upper bound of the moov box read into memory
+MAX_MOOV_BYTES = 32 * 1024 * 1024
+# Bytes read from the end of the file when looking for a trailing moov
+TAIL_PROBE_BYTES = 128 * 1024
+
+
+class Mp4Error(Exception):
+    """Raised when a file is not an MP4 this reader understands."""
+
+
+class RangeReader:
+    """
+    Reads byte ranges of a device file.
+
+    Args:
+        client (DeviceClient): Shared device client.
+        filepath (str): FPATH of the file.
+        size (int): File size from the listing, learned from the first answer if None.
+        priority (int): Governor priority class of the reads.
+
+    Attributes:
+        bytes_read (int): Body bytes received so far.
+        requests (int): Range requests sent so far.
+    """
+
+    def __init__(self, client, filepath, size=None, priority=PRIORITY_INTERACTIVE):
+        self.client = client
+        self.url = client.file_url(filepath)
+        self.size = size
+        self.priority = priority
+        self.bytes_read = 0
+        self.requests = 0
+
+    def read(self, offset, length):
+        """
+        Reads up to length bytes at offset (fewer at the end of the file).
+
+        Returns:
+            bytes: The data.
+        """
+
+        if self.size is not None:
+            length = min(length, self.size - offset)
+        if length <= 0:
+            return b""
+        headers = {"Range": f"bytes={offset}-{offset + length - 1}"}
+        response = self.client.open_stream(self.url, headers=headers, priority=self.priority)
+        self.requests += 1
+        try:
+            if response.status_code == 206:
+                content_range = response.headers.get("Content-Range", "")
+                if self.size is None and "/" in content_range:
+                    self.size = int(content_range.rsplit("/", 1)[1])
+            elif offset:
+                raise DeviceError(f"Range requests not supported by {self.url}")
+            elif self.size is None and response.headers.get("Content-Length", "").isdigit():
+                # A 200 answer carries the whole file
+                self.size = int(response.headers["Content-Length"])
+            # A 200 answer to a read at offset 0 still starts with the wanted bytes
+            chunks = []
+            received = 0
+            for chunk in response.iter_content(64 * 1024):
+                chunks.append(chunk)
+                received += len(chunk)
+                if received >= length:
+                    break
+        finally:
+            response.close()
+        data = b"".join(chunks)[:length]
+        self.bytes_read += len(data)
+        return data
+
+
+class FileReader:
+    """RangeReader interface over a local file (e.g. a downloaded or mirrored clip)."""
+
+    def __init__(self, path):
+        self.path = path
+        self.file = open(path, "rb")
+        self.file.seek(0, 2)
+        self.size = self.file.tell()
+        self.bytes_read = 0
+        self.requests = 0
+
+    def read(self, offset, length):
+        self.file.seek(offset)
+        data = self.file.read(length)
+        self.bytes_read += len(data)
+        self.requests += 1
+        return data
+
+    def close(self):
+        self.file.close()
+
+
+def top_level_boxes(reader):
+    """
+    Walks the top-level boxes of a file by reading only their headers.
+
+    Args:
+        reader (RangeReader): Source of the file.
+
+    Yields:
+        tuple: (type, offset, header_size, box_size)
+    """
+
+    offset = 0
+    while reader.size is None or offset + 8 <= reader.size:
+        header = reader.read(offset, 16)
+        if len(header) < 8:
+            return
+        box_size, box_type = struct.unpack(">I4s", header[:8])
+        header_size = 8
+        if box_size == 1:
+            if len(header) < 16:
+                raise Mp4Error("Truncated 64-bit box header")
+            box_size = struct.unpack(">Q", header[8:16])[0]
+            header_size = 16
+        elif box_size == 0:
+            if reader.size is None:
+                raise Mp4Error(f"Box at offset {offset} runs to the end of a file of unknown size")
+            box_size = reader.size - offset  # Box runs to the end of the file
+        if box_size < header_size:
+            raise Mp4Error(f"Invalid box size {box_size} at offset {offset}")
+        yield box_type, offset, header_size, box_size
+        offset += box_size
+
+
+def read_moov(reader):
+    """
+    Locates and reads the moov box.
+
+    Args:
+        reader (RangeReader): Source of the file.
+
+    Returns:
+        tuple: (moov payload bytes, file offset of the payload)
+    """
+
+    if reader.size is None:
+        reader.read(0, 16)  # Learns the size from Content-Range
+    if reader.size:
+        found = _trailing_moov(reader)
+        if found:
+            return found
+    for box_type, offset, header_size, box_size in top_level_boxes(reader):
+        if box_type == b"moov":
+            if box_size > MAX_MOOV_BYTES:
+                raise Mp4Error(f"moov box too large ({box_size} bytes)")
+            payload = reader.read(offset + header_size, box_size - header_size)
+            if len(payload) < box_size - header_size:
+                raise Mp4Error("Truncated moov box")
+            return payload, offset + header_size
+    raise Mp4Error("No moov box (recording still in progress?)")
+
+
+def _trailing_moov(reader):
+    # A moov ending exactly at the end of the file: its size field is the
+    # distance from its start to the end of the tail
+    length = min(TAIL_PROBE_BYTES, reader.size)
+    start = reader.size - length
+    tail = reader.read(start, length)
+    pos = tail.rfind(b"moov")
+    while pos >= 4:
+        if struct.unpack_from(">I", tail, pos - 4)[0] == len(tail) - (pos - 4):
+            return tail[pos + 4:], start + pos + 4
+        pos = tail.rfind(b"moov", 0, pos)
+    return None
+
+
+def iter_boxes(data, start=0, end=None):
+    """
+    Iterates over the boxes in a buffer.
+
+    Yields:
+        tuple: (type, payload_start, box_end)
+    """
+
+    end = len(data) if end is None else end
+    offset = start
+    while offset + 8 <= end:
+        box_size, box_type = struct.unpack_from(">I4s", data, offset)
+        header_size = 8
+        if box_size == 1:
+            box_size = struct.unpack_from(">Q", data, offset + 8)[0]
+            header_size = 16
+        elif box_size == 0:
+            box_size = end - offset
+        if box_size < header_size or offset + box_size > end:
+            raise Mp4Error(f"Invalid {box_type!r} box at {offset}")
+        yield box_type, offset + header_size, offset + box_size
+        offset += box_size
+
+
+def _find(data, path, start=0, end=None):
+    """Payload range (start, end) of the first box along path (list of types), None if absent."""
+
+    for box_type, payload, box_end in iter_boxes(data, start, end):
+        if box_type == path[0]:
+            if len(path) == 1:
+                return payload, box_end
+            found = _find(data, path[1:], payload, box_end)
+            if found:
+                return found
+    return None
+
+
+def _full_box(data, start):
+    """Version of a full box and the offset after its version/flags."""
+
+    return data[start], start + 4
+
+
+class Track:
+    """
+    One track of a movie with its sample tables.
+
+    Attributes:
+        handler (bytes): b"vide", b"soun", ...
+        timescale (int): Units per second of the track times.
+        duration (int): Track duration in timescale units.
+        width (int), height (int): Frame size of video tracks.
+        codec (bytes): Sample entry type, e.g. b"avc1" or b"hvc1".
+        codec_config (bytes): Payload of the avcC / hvcC box (decoder extradata).
+    """
+
+    def __init__(self):
+        self.handler = None
+        self.timescale = 1
+        self.duration = 0
+        self.width = 0
+        self.height = 0
+        self.codec = None
+        self.codec_config = None
+        self.stts = []  # (sample count, delta)
+        self.stss = None  # 1-based keyframe numbers, None if every sample is a keyframe
+        self.stsc = []  # (first chunk, samples per chunk, description index)
+        self.sample_sizes = []
+        self.chunk_offsets = []
+
+    @property
+    def seconds(self):
+        return self.duration / self.timescale if self.timescale else 0.0
+
+    @property
+    def sample_count(self):
+        return len(self.sample_sizes)
+
+    def sample_times(self):
+        """Decode time (seconds) of every sample."""
+
+        times = []
+        t = 0
+        for count, delta in self.stts:
+            for _ in range(count):
+                times.append(t / self.timescale)
+                t += delta
+        return times[:self.sample_count]
+
+    def sample_offsets(self):
+        """File offset of every sample, from the chunk offsets and sample-to-chunk runs."""
+
+        offsets = []
+        sample = 0
+        runs = self.stsc + [(len(self.chunk_offsets) + 1, 0, 0)]
+        for (first, per_chunk, _), (next_first, _, _) in zip(runs, runs[1:]):
+            for chunk in range(first - 1, min(next_first - 1, len(self.chunk_offsets))):
+                offset = self.chunk_offsets[chunk]
+                for _ in range(per_chunk):
+                    if sample >= self.sample_count or sample >= len(self.sample_sizes):
+                        return offsets
+                    offsets.append(offset)
+                    offset += self.sample_sizes[sample]
+                    sample += 1
+        return offsets
+
+    def keyframes(self):
+        """0-based indexes of the keyframes."""
+
+        if self.stss is None:
+            return list(range(self.sample_count))
+        return [number - 1 for number in self.stss if 0 < number <= self.sample_count]
+
+
+class Movie:
+    """
+    Parsed moov box.
+
+    Attributes:
+        timescale (int), duration (int): Movie header values.
+        tracks (list): Track objects.
+        boxes (dict): Raw payload of the other moov children by type, e.g. b"gps ".
+        moov_offset (int): File offset of the moov payload.
+    """
+
+    def __init__(self):
+        self.timescale = 1
+        self.duration = 0
+        self.tracks = []
+        self.boxes = {}
+        self.moov_offset = 0
+
+    @property
+    def seconds(self):
+        return self.duration / self.timescale if self.timescale else 0.0
+
+    def video_track(self):
+        """First video track, None if the file has none."""
+
+        for track in self.tracks:
+            if track.handler == b"vide":
+                return track
+        return None
+
+
+def _parse_time_header(data, start):
+    # mvhd / mdhd: version 1 uses 64-bit times
+    version, pos = _full_box(data, start)
+    if version == 1:
+        return struct.unpack_from(">QQIQ", data, pos)[2:]
+    return struct.unpack_from(">IIII", data, pos)[2:]
+
+
+def _parse_sample_entry(track, data, start, end):
+    # stsd: entry count, then sample entries; the first one describes the codec
+    pos = start + 8
+    for box_type, payload, box_end in iter_boxes(data, pos, end):
+        track.codec = box_type
+        if track.handler == b"vide":
+            # VisualSampleEntry: 6 reserved + 2 index + 16 predefined, then width/height
+            track.width, track.height = struct.unpack_from(">HH", data, payload + 24)
+            for child, child_payload, child_end in iter_boxes(data, payload + 78, box_end):
+                if child in (b"avcC", b"hvcC"):
+                    track.codec_config = data[child_payload:child_end]
+        return
+
+
+def _parse_track(data, start, end):
+    track = Track()
+    mdia = _find(data, [b"mdia"], start, end)
+    if mdia is None:
+        return None
+    found = _find(data, [b"mdhd"], *mdia)
+    if found:
+        track.timescale, track.duration = _parse_time_header(data, found[0])
+    found = _find(data, [b"hdlr"], *mdia)
+    if found:
+        track.handler = data[found[0] + 8:found[0] + 12]
+    stbl = _find(data, [b"minf", b"stbl"], *mdia)
+    if stbl is None:
+        return track
+    for box_type, payload, box_end in iter_boxes(data, *stbl):
+        _, pos = _full_box(data, payload)
+        if box_type == b"stsd":
+            _parse_sample_entry(track, data, payload, box_end)
+        elif box_type == b"stts":
+            count = struct.unpack_from(">I", data, pos)[0]
+            values = struct.unpack_from(f">{2 * count}I", data, pos + 4)
+            track.stts = list(zip(values[0::2], values[1::2]))
+        elif box_type == b"stss":
+            count = struct.unpack_from(">I", data, pos)[0]
+            track.stss = list(struct.unpack_from(f">{count}I", data, pos + 4))
+        elif box_type == b"stsc":
+            count = struct.unpack_from(">I", data, pos)[0]
+            values = struct.unpack_from(f">{3 * count}I", data, pos + 4)
+            track.stsc = list(zip(values[0::3], values[1::3], values[2::3]))
+        elif box_type == b"stsz":
+            uniform, count = struct.unpack_from(">II", data, pos)
+            if uniform:
+                track.sample_sizes = [uniform] * count
+            else:
+                track.sample_sizes = list(struct.unpack_from(f">{count}I", data, pos + 8))
+        elif box_type in (b"stco", b"co64"):
+            count = struct.unpack_from(">I", data, pos)[0]
+            fmt = "I" if box_type == b"stco" else "Q"
+            track.chunk_offsets = list(struct.unpack_from(f">{count}{fmt}", data, pos + 4))
+    return track
+
+
+def parse_moov(payload, moov_offset=0):
+    """
+    Parses a moov payload.
+
+    Args:
+        payload (bytes): Payload of the moov box (without its header).
+        moov_offset (int): File offset of the payload, kept for boxes that point into it.
+
+    Returns:
+        Movie: The parsed movie.
+    """
+
+    movie = Movie()
+    movie.moov_offset = moov_offset
+    try:
+        for box_type, start, end in iter_boxes(payload):
+            if box_type == b"mvhd":
+                movie.timescale, movie.duration = _parse_time_header(payload, start)
+            elif box_type == b"trak":
+                track = _parse_track(payload, start, end)
+                if track is not None:
+                    movie.tracks.append(track)
+            else:
+                movie.boxes[box_type] = payload[start:end]
+    except struct.error as e:
+        raise Mp4Error(f"Malformed moov: {e}") from e
+    return movie
+
+
+def read_movie(reader):
+    """
+    Reads and parses the moov index of a file.
+
+    Args:
+        reader (RangeReader): Source of the file.
+
+    Returns:
+        Movie: The parsed movie.
+    """
+
+    payload, offset = read_moov(reader)
+    return parse_moov(payload, offset)
+
+
+def pick_keyframes(track, count):
+    """
+    Chooses keyframes evenly spread over a track.
+
+    For each of count equal slices of the clip the keyframe nearest to the
+    slice's middle is taken; duplicates (clips with few keyframes) are dropped.
+
+    Args:
+        track (Track): Video track.
+        count (int): Wanted number of frames.
+
+    Returns:
+        list: (seconds, offset, size) of the chosen keyframes, in time order;
+            empty if the sample tables list no usable keyframe (e.g. a clip
+            still being written).
+    """
+
+    times = track.sample_times()
+    offsets = track.sample_offsets()
+    # Truncated tables may list keyframes past the samples they describe
+    usable = min(len(times), len(offsets), len(track.sample_sizes))
+    keyframes = [index for index in track.keyframes() if index < usable]
+    if not keyframes or count <= 0:
+        return []
+    duration = track.seconds or (times[-1] if times else 0)
+    chosen = []
+    for slot in range(count):
+        target = (slot + 0.5) / count * duration
+        index = min(keyframes, key=lambda i: abs(times[i] - target))
+        if index not in chosen:
+            chosen.append(index)
+    return [(times[i], offsets[i], track.sample_sizes[i]) for i in sorted(chosen)]
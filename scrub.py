@@ -0,0 +1,97 @@
+'''
+Scrub-preview strip: a row of frames spread across a clip.
+
+The keyframe positions come from the clip's moov index (see mp4.py); only the
+index and the chosen keyframes are fetched with Range requests, typically a few
+hundred KB for a 10-frame strip of a 300 MB clip. Keyframes decode on their own,
+without the frames before them. Decoding H.264 / H.265 needs PyAV
+("pip install av"), which is imported only when a strip is built.
+'''
+from mp4 import Mp4Error, pick_keyframes, read_movie
+
+# Sample entry type -> decoder name
+DECODERS = {
+    b"avc1": "h264",
+    b"avc3": "h264",
+    b"hvc1": "hevc",
+    b"hev1": "hevc",
+}
+
+STRIP_FRAMES = 10
+FRAME_SIZE = (160, 90)
+
+
+class DecoderUnavailable(ImportError):
+    """Raised when PyAV is not installed."""
+
+
+def _open_decoder(track):
+    try:
+        import av
+    except ImportError as e:
+        raise DecoderUnavailable("Frame decoding needs PyAV: pip install av") from e
+    name = DECODERS.get(track.codec)
+    if name is None or track.codec_config is None:
+        raise Mp4Error(f"Unsupported video codec {track.codec!r}")
+    context = av.CodecContext.create(name, "r")
+    # avcC / hvcC carry the parameter sets; samples stay length-prefixed
+    context.extradata = track.codec_config
+    return av, context
+
+
+def decode_keyframe(track, data, size=FRAME_SIZE):
+    """
+    Decodes one keyframe sample to a thumbnail.
+
+    Args:
+        track (Track): Video track the sample belongs to.
+        data (bytes): The sample as stored in the file.
+        size (tuple): Bounding box of the result.
+
+    Returns:
+        tuple: ((width, height), rgb_bytes), as thumb_decode.to_photo() expects.
+    """
+
+    av, context = _open_decoder(track)
+    frames = list(context.decode(av.Packet(data))) + list(context.decode(None))
+    if not frames:
+        raise Mp4Error("Keyframe did not decode")
+    img = frames[0].to_image()
+    img.thumbnail(size, reducing_gap=2.0)
+    return img.size, img.tobytes()
+
+
+def build_strip(reader, frames=STRIP_FRAMES, size=FRAME_SIZE, on_frame=None, cancel_event=None):
+    """
+    Builds a scrub strip of a clip. Blocking.
+
+    Args:
+        reader (RangeReader): Source of the clip.
+        frames (int): Number of frames across the clip.
+        size (tuple): Bounding box of each frame.
+        on_frame (callable): Called as on_frame(position, count, seconds, frame)
+            as soon as each frame is decoded.
+        cancel_event (threading.Event): Set to stop early.
+
+    Returns:
+        list: (seconds, ((width, height), rgb_bytes)) per frame, in time order.
+    """
+
+    movie = read_movie(reader)
+    track = movie.video_track()
+    if track is None:
+        raise Mp4Error("No video track")
+    # Fail before any keyframe transfer if the frames cannot be decoded
+    _open_decoder(track)
+    keyframes = pick_keyframes(track, frames)
+    if not keyframes:
+        raise Mp4Error("No keyframes in the index")
+    strip = []
+    for position, (seconds, offset, sample_size) in enumerate(keyframes):
+        if cancel_event is not None and cancel_event.is_set():
+            break
+        frame = decode_keyframe(track, reader.read(offset, sample_size), size)
+        strip.append((seconds, frame))
+        if on_frame:
+            on_frame(position, len(keyframes), seconds, frame)
+    return strip
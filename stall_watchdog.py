@@ -0,0 +1,160 @@
+'''
+Stall watchdog for the Tk main loop (opt-in, see DB5_STALL_MS in main.py).
+
+A heartbeat scheduled with after() on the Tk thread stamps the time it ran and
+measures how late it ran. A monitor thread checks the stamp; once the main loop
+has not serviced events for longer than the threshold, it captures the Tk
+thread's stack with sys._current_frames() while the stall is still going on.
+When the heartbeat runs again the stall is logged with its duration and the
+callback that was running, i.e. the first frame of our code called from
+tkinter's event dispatch.
+'''
+import os
+import sys
+import threading
+import time
+import tkinter
+import traceback
+from collections import deque
+
+from health import percentile
+
+_TKINTER_DIR = os.path.dirname(tkinter.__file__)
+
+
+def _callback_frame(frames):
+    """
+    Finds the event handler in a stack.
+
+    Args:
+        frames (traceback.StackSummary): Stack of the Tk thread, outermost first.
+
+    Returns:
+        traceback.FrameSummary: The first frame entered from tkinter (the
+            callback that blocks the loop), the innermost frame if none is.
+    """
+
+    for previous, frame in zip(frames, frames[1:]):
+        if previous.filename.startswith(_TKINTER_DIR) and not frame.filename.startswith(_TKINTER_DIR):
+            return frame
+    return frames[-1] if frames else None
+
+
+class StallWatchdog:
+    """
+    Detects and logs stalls of the Tk event loop.
+
+    Args:
+        root (tk.Tk): The application window.
+        threshold (float): Seconds without serviced events that count as a stall.
+        heartbeat_ms (int): Heartbeat interval.
+        keep (int): Stall reports and durations kept for stats().
+        log (callable): log(text) for each stall, print by default.
+    """
+
+    def __init__(self, root, threshold=0.2, heartbeat_ms=50, keep=100, log=print):
+        self.root = root
+        self.threshold = threshold
+        self.heartbeat = heartbeat_ms / 1000
+        self.log = log
+        self.reports = deque(maxlen=keep)
+        self.durations = deque(maxlen=keep)
+        self.callbacks = {}  # "function (file:line)" -> [count, total seconds, max seconds]
+        self.count = 0
+        self._beat_at = None
+        self._captured = None  # (beat time, stack) of the ongoing stall
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread_id = None
+
+    def start(self):
+        """Starts the heartbeat and the monitor thread; call it from the Tk thread."""
+
+        self._thread_id = threading.get_ident()
+        self._beat_at = time.monotonic()
+        self.root.after(int(self.heartbeat * 1000), self._beat)
+        threading.Thread(target=self._monitor, name="stall-watchdog", daemon=True).start()
+
+    def stop(self):
+        self._stop.set()
+
+    def _beat(self):
+        now = time.monotonic()
+        with self._lock:
+            lag = now - self._beat_at - self.heartbeat
+            captured = self._captured if self._captured and self._captured[0] == self._beat_at else None
+            self._captured = None
+            self._beat_at = now
+        if lag > self.threshold:
+            self._report(lag, captured[1] if captured else None)
+        if not self._stop.is_set():
+            self.root.after(int(self.heartbeat * 1000), self._beat)
+
+    def _monitor(self):
+        while not self._stop.wait(self.threshold / 4):
+            with self._lock:
+                beat_at = self._beat_at
+                if self._captured and self._captured[0] == beat_at:
+                    continue  # This stall's stack is already captured
+            if time.monotonic() - beat_at - self.heartbeat <= self.threshold:
+                continue
+            frame = sys._current_frames().get(self._thread_id)
+            if frame is None:
+                continue
+            stack = traceback.extract_stack(frame)
+            with self._lock:
+                if self._beat_at == beat_at:  # Still the same stall
+                    self._captured = (beat_at, stack)
+
+    def _report(self, duration, stack):
+        callback = _callback_frame(stack) if stack else None
+        name = (f"{callback.name} ({os.path.basename(callback.filename)}:{callback.lineno})"
+                if callback else "unknown")
+        with self._lock:
+            self.count += 1
+            self.durations.append(duration)
+            entry = self.callbacks.setdefault(name, [0, 0.0, 0.0])
+            entry[0] += 1
+            entry[1] += duration
+            entry[2] = max(entry[2], duration)
+            self.reports.append({"time": time.time(), "duration": duration, "callback": name,
+                                 "stack": traceback.format_list(stack) if stack else []})
+        text = f"UI stall: event loop blocked for {duration * 1000:.0f} ms in {name}"
+        if stack:
+            text += "\n" + "".join(traceback.format_list(stack)).rstrip()
+        self.log(text)
+
+    def stats(self):
+        """
+        Stall statistics.
+
+        Returns:
+            dict: count, p50, p90 and max duration (seconds, None without stalls)
+                of the recent stalls, and callbacks: (name, count, total, max)
+                tuples sorted by total blocked time.
+        """
+
+        with self._lock:
+            durations = list(self.durations)
+            callbacks = sorted(((name, *entry) for name, entry in self.callbacks.items()),
+                               key=lambda item: item[2], reverse=True)
+            count = self.count
+        return {
+            "count": count,
+            "p50": percentile(durations, 50),
+            "p90": percentile(durations, 90),
+            "max": max(durations) if durations else None,
+            "callbacks": callbacks,
+        }
+
+    def summary(self):
+        """Multi-line text of stats() for logs."""
+
+        stats = self.stats()
+        if not stats["count"]:
+            return "UI stalls: none"
+        lines = [f"UI stalls: {stats['count']}, p50 {stats['p50'] * 1000:.0f} ms, "
+                 f"p90 {stats['p90'] * 1000:.0f} ms, max {stats['max'] * 1000:.0f} ms"]
+        for name, count, total, longest in stats["callbacks"]:
+            lines.append(f"  {name}: {count}x, {total:.2f} s total, max {longest * 1000:.0f} ms")
+        return "\n".join(lines)
@@ -0,0 +1,163 @@
+'''
+Disk-backed thumbnail cache.
+
+Thumbnails are keyed by the file's stable identity (FPATH + SIZE + TIME from
+the cmd=3015 listing), so they survive app restarts and list refreshes, and a
+file that is re-recorded under the same name gets a new entry.
+'''
+import hashlib
+import os
+import sys
+import threading
+from collections import OrderedDict
+
+# Default size cap of the on-disk cache (bytes)
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+
+
+def default_cache_dir():
+    """
+    Returns the per-user cache directory used for thumbnails.
+
+    Returns:
+        str: Path of the thumbnail cache directory.
+    """
+
+    if sys.platform == "win32":
+        base = os.environ.get("LOCALAPPDATA") or os.path.expanduser("~")
+    elif sys.platform == "darwin":
+        base = os.path.expanduser("~/Library/Caches")
+    else:
+        base = os.environ.get("XDG_CACHE_HOME") or os.path.expanduser("~/.cache")
+    return os.path.join(base, "bob_db5_toolbox", "thumbnails")
+
+
+class ThumbnailCache:
+    """
+    Size-capped on-disk store with least-recently-used eviction.
+
+    Recency is kept in memory and mirrored to the files' mtime, so the LRU
+    order is restored from the directory on the next start.
+    """
+
+    SUFFIX = ".jpg"
+
+    def __init__(self, cache_dir=None, max_bytes=DEFAULT_MAX_BYTES):
+        self.cache_dir = cache_dir or default_cache_dir()
+        self.max_bytes = max_bytes
+        self.total_bytes = 0
+        self._entries = OrderedDict()  # key -> size, oldest first
+        self._lock = threading.Lock()
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            self._load_index()
+        except OSError as e:
+            print(f"Thumbnail cache disabled: {e}")
+            self.cache_dir = None
+
+    @staticmethod
+    def make_key(filepath, filesize, filetime):
+        """
+        Builds the cache key of a file from its listing identity.
+
+        Args:
+            filepath (str): FPATH of the file.
+            filesize (int): SIZE of the file in bytes.
+            filetime (str): TIME of the file.
+
+        Returns:
+            str: Hex digest usable as a file name.
+        """
+
+        identity = f"{filepath}|{filesize}|{filetime}"
+        return hashlib.sha1(identity.encode("utf-8")).hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, key + self.SUFFIX)
+
+    def _load_index(self):
+        entries = []
+        for name in os.listdir(self.cache_dir):
+            if not name.endswith(self.SUFFIX):
+                continue
+            try:
+                st = os.stat(os.path.join(self.cache_dir, name))
+            except OSError:
+                continue
+            entries.append((st.st_mtime, name[:-len(self.SUFFIX)], st.st_size))
+        for _, key, size in sorted(entries):
+            self._entries[key] = size
+            self.total_bytes += size
+        self._evict()
+
+    def get(self, key):
+        """
+        Reads a cached thumbnail and marks it as recently used.
+
+        Args:
+            key (str): Key from make_key().
+
+        Returns:
+            bytes: Encoded thumbnail, or None on a miss.
+        """
+
+        if self.cache_dir is None:
+            return None
+        with self._lock:
+            if key not in self._entries:
+                return None
+            self._entries.move_to_end(key)
+        path = self._path(key)
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+            os.utime(path)
+            return data
+        except OSError:
+            with self._lock:
+                size = self._entries.pop(key, None)
+                if size is not None:
+                    self.total_bytes -= size
+            return None
+
+    def put(self, key, data):
+        """
+        Stores an encoded thumbnail, evicting old entries above the size cap.
+
+        Args:
+            key (str): Key from make_key().
+            data (bytes): Encoded thumbnail.
+        """
+
+        if self.cache_dir is None:
+            return
+        path = self._path(key)
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        try:
+            with open(tmp_path, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            print(f"Thumbnail cache write failed: {e}")
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+            return
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self.total_bytes -= old
+            self._entries[key] = len(data)
+            self.total_bytes += len(data)
+            self._evict()
+
+    def _evict(self):
+        # Caller holds the lock (or runs during __init__)
+        while self.total_bytes > self.max_bytes and self._entries:
+            key, size = self._entries.popitem(last=False)
+            self.total_bytes -= size
+            try:
+                os.remove(self._path(key))
+            except OSError:
+                pass
@@ -0,0 +1,122 @@
+'''
+Thumbnail decode stage.
+
+Previews are decoded with Pillow's JPEG draft mode, which lets libjpeg scale
+the image down by 1/2, 1/4 or 1/8 while decoding instead of decoding the full
+1080p/4K frame first. Decoding runs in a process pool (or a thread pool on
+small machines) and returns raw RGB buffers; the PhotoImage itself must be
+created on the Tk thread with to_photo().
+'''
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from io import BytesIO
+
+from PIL import Image
+
+# Size of the thumbnails shown in the browser
+THUMB_SIZE = (160, 90)
+CACHE_QUALITY = 85
+
+
+def decode_preview(data, size=THUMB_SIZE):
+    """
+    Decodes a device preview down to thumbnail size.
+
+    Args:
+        data (bytes): Encoded preview (usually JPEG) from cmd=4002.
+        size (tuple): Bounding box of the thumbnail.
+
+    Returns:
+        tuple: ((width, height), rgb_bytes, jpeg_bytes), the JPEG being the
+            re-encoded thumbnail for the disk cache.
+    """
+
+    img = Image.open(BytesIO(data))
+    # Let libjpeg decode at the smallest scale that still covers the target
+    img.draft("RGB", size)
+    img = img.convert("RGB")
+    img.thumbnail(size, reducing_gap=2.0)
+    buf = BytesIO()
+    img.save(buf, format="JPEG", quality=CACHE_QUALITY)
+    return img.size, img.tobytes(), buf.getvalue()
+
+
+def decode_cached(data):
+    """
+    Decodes a thumbnail read from the disk cache.
+
+    Args:
+        data (bytes): JPEG produced by decode_preview().
+
+    Returns:
+        tuple: ((width, height), rgb_bytes)
+    """
+
+    img = Image.open(BytesIO(data)).convert("RGB")
+    return img.size, img.tobytes()
+
+
+def to_photo(size, rgb):
+    """
+    Wraps a decoded RGB buffer in a PhotoImage. Call on the Tk thread only.
+
+    Args:
+        size (tuple): (width, height) of the buffer.
+        rgb (bytes): Packed RGB pixels.
+
+    Returns:
+        ImageTk.PhotoImage: Image usable in Tk widgets.
+    """
+
+    from PIL import ImageTk
+    return ImageTk.PhotoImage(Image.frombuffer("RGB", size, rgb, "raw", "RGB", 0, 1))
+
+
+class ThumbDecoder:
+    """
+    Runs thumbnail decodes on a worker pool.
+
+    Args:
+        workers (int): Pool size, defaults to the number of cores minus one.
+        use_processes (bool): Use a process pool; defaults to True when more
+            than two cores are available. Falls back to threads on failure.
+    """
+
+    def __init__(self, workers=None, use_processes=None):
+        cores = os.cpu_count() or 1
+        self.workers = workers or max(1, min(4, cores - 1))
+        if use_processes is None:
+            use_processes = cores > 2
+        self.executor = None
+        if use_processes:
+            try:
+                # Workers start lazily from threads of the running Tk process;
+                # a forked child could inherit a lock held by another thread
+                self.executor = ProcessPoolExecutor(
+                    max_workers=self.workers, mp_context=multiprocessing.get_context("spawn"))
+            except (OSError, NotImplementedError) as e:
+                print(f"Process pool unavailable, decoding on threads: {e}")
+        if self.executor is None:
+            self.executor = ThreadPoolExecutor(
+                max_workers=self.workers, thread_name_prefix="thumb-decode")
+
+    def _run(self, func, *args):
+        try:
+            return self.executor.submit(func, *args).result()
+        except RuntimeError:
+            # Pool broken or shut down (e.g. a worker process died); decode here
+            return func(*args)
+
+    def decode_preview(self, data, size=THUMB_SIZE):
+        """Blocking decode_preview() on the pool; call from a worker thread."""
+
+        return self._run(decode_preview, data, size)
+
+    def decode_cached(self, data):
+        """Blocking decode_cached() on the pool; call from a worker thread."""
+
+        return self._run(decode_cached, data)
+
+    def shutdown(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,77 @@
+'''
+Viewport-aware priority scheduler for thumbnail loads.
+
+A fixed pool of worker threads pulls jobs from a priority queue. The browser
+replaces the whole wanted set on every viewport change, so jobs for rows that
+scrolled away are dropped before they start and the rows the user is looking
+at always go first.
+'''
+import heapq
+import itertools
+import threading
+
+
+class ThumbnailScheduler:
+    """
+    Bounded worker pool with a replaceable priority queue.
+
+    Args:
+        load (callable): load(key, payload), run on a worker thread.
+        workers (int): Number of worker threads.
+    """
+
+    def __init__(self, load, workers=3):
+        self.load = load
+        self._heap = []  # (priority, seq, key)
+        self._pending = {}  # key -> (priority, payload)
+        self._running = set()
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+        for i in range(workers):
+            threading.Thread(target=self._worker, name=f"thumb-{i}", daemon=True).start()
+
+    def schedule(self, jobs):
+        """
+        Replaces the queued jobs; lower priority numbers run first.
+
+        Queued jobs missing from the new set are cancelled. Jobs already running
+        are left to finish and are not queued again.
+
+        Args:
+            jobs (iterable): (key, priority, payload) tuples.
+        """
+
+        with self._cond:
+            self._pending = {}
+            self._heap = []
+            for key, priority, payload in jobs:
+                if key in self._running or key in self._pending:
+                    continue
+                self._pending[key] = (priority, payload)
+                self._heap.append((priority, next(self._seq), key))
+            heapq.heapify(self._heap)
+            self._cond.notify_all()
+
+    def is_busy(self, key):
+        """True if the job is queued or running."""
+
+        with self._cond:
+            return key in self._pending or key in self._running
+
+    def _worker(self):
+        while True:
+            with self._cond:
+                while not self._heap:
+                    self._cond.wait()
+                _, _, key = heapq.heappop(self._heap)
+                entry = self._pending.pop(key, None)
+                if entry is None:
+                    continue
+                self._running.add(key)
+            try:
+                self.load(key, entry[1])
+            except Exception as e:
+                print(f"Thumbnail job failed: {e}")
+            finally:
+                with self._cond:
+                    self._running.discard(key)
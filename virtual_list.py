@@ -0,0 +1,191 @@
+'''
+Virtualized display mode for the file browser's Treeview.
+
+Only the records in (and just around) the viewport exist as Treeview items.
+Scrolling slides that window over the full record list, and the scrollbar is
+driven from the dataset size, so inserting, sorting and scrolling cost the same
+for 50 files as for 5,000.
+'''
+import tkinter as tk
+from tkinter import ttk
+
+
+class VirtualTreeview:
+    """
+    Renders a sliding window of records into an existing Treeview.
+
+    Items keep the record's FPATH as item id, so selection and click handlers
+    work the same as in the normal (fully populated) mode.
+
+    Args:
+        tree (ttk.Treeview): Treeview to render into.
+        scrollbar (ttk.Scrollbar): Vertical scrollbar next to the tree.
+        row_values (callable): Maps a record to the row's column values.
+        placeholder_text (str): #0 text shown until a thumbnail is loaded.
+        image_for (callable): Returns a cached PhotoImage for a record, or None.
+        on_render (callable): Called after every window change (e.g. to load thumbnails).
+        overscan (int): Extra rows kept below the viewport.
+    """
+
+    def __init__(self, tree, scrollbar, row_values, placeholder_text="",
+                 image_for=None, on_render=None, overscan=2):
+        self.tree = tree
+        self.scrollbar = scrollbar
+        self.row_values = row_values
+        self.placeholder_text = placeholder_text
+        self.image_for = image_for
+        self.on_render = on_render
+        self.overscan = overscan
+        self.records = []
+        self.offset = 0
+        self.active = False
+        self._selection = set()
+
+    def enable(self, records):
+        """Switches the tree to virtual mode and shows the given records."""
+
+        self.active = True
+        self.tree.delete(*self.tree.get_children())
+        # The tree only ever holds the window, so its own scroll range is meaningless
+        self.tree.configure(yscrollcommand=lambda *args: None)
+        self.set_records(records)
+
+    def disable(self):
+        """Leaves virtual mode; the caller repopulates the tree."""
+
+        self.active = False
+        self.tree.delete(*self.tree.get_children())
+        self.tree.configure(yscrollcommand=self.scrollbar.set)
+        self._selection.clear()
+
+    def set_records(self, records, changed=()):
+        """
+        Replaces the dataset (e.g. after a refresh or sort) and re-renders.
+
+        Args:
+            records (list): Full, already sorted record list.
+            changed (iterable): Item ids whose content changed and must be rebuilt.
+        """
+
+        stale = [iid for iid in changed if self.tree.exists(iid)]
+        if stale:
+            self.tree.delete(*stale)
+        self.records = records
+        self.render()
+
+    def append(self, records):
+        """Adds records at the end, e.g. while the listing is still streaming in."""
+
+        # Copy instead of extend: the current list may be the caller's file list
+        self.records = self.records + list(records)
+        self.render()
+
+    def selection(self):
+        """Item ids of every selected record, including rows scrolled out of the window."""
+
+        current = set(self.tree.get_children())
+        kept = {iid for iid in self._selection if iid not in current}
+        return kept | set(self.tree.selection())
+
+    def selection_set(self, items):
+        """
+        Replaces the whole selection, forgetting rows selected earlier that
+        have scrolled out of the window.
+
+        Args:
+            items (iterable): Item ids (FPATH) to select.
+        """
+
+        self._selection = set(items)
+        current = set(self.tree.get_children())
+        self.tree.selection_set([iid for iid in self._selection if iid in current])
+
+    def _row_height(self):
+        try:
+            return int(ttk.Style().lookup("Treeview", "rowheight")) or 20
+        except (tk.TclError, ValueError):
+            return 20
+
+    def visible_count(self):
+        """Number of rows that fit in the viewport."""
+
+        height = self.tree.winfo_height()
+        return max(1, height // self._row_height())
+
+    def _clamp(self, offset):
+        return max(0, min(offset, len(self.records) - self.visible_count()))
+
+    def render(self):
+        """Materializes the rows of the current window, reusing items still in it."""
+
+        if not self.active:
+            return
+        tree = self.tree
+        visible = self.visible_count()
+        self.offset = self._clamp(self.offset)
+        window = self.records[self.offset:self.offset + visible + self.overscan]
+        wanted = {record.filepath for record in window}
+
+        current = tree.get_children()
+        # Remember selections of rows that scroll out, and pick up new ones
+        self._selection = {iid for iid in self._selection if iid not in current}
+        self._selection.update(tree.selection())
+        stale = [iid for iid in current if iid not in wanted]
+        if stale:
+            tree.delete(*stale)
+
+        for position, record in enumerate(window):
+            item_id = record.filepath
+            if tree.exists(item_id):
+                tree.move(item_id, "", position)
+                continue
+            image = self.image_for(record) if self.image_for else None
+            if image:
+                tree.insert("", position, iid=item_id, image=image, text="",
+                            values=self.row_values(record))
+            else:
+                tree.insert("", position, iid=item_id, text=self.placeholder_text,
+                            values=self.row_values(record))
+
+        selected = [record.filepath for record in window if record.filepath in self._selection]
+        if tuple(selected) != tree.selection():
+            tree.selection_set(selected)
+        tree.yview_moveto(0)
+
+        total = len(self.records)
+        if total:
+            self.scrollbar.set(self.offset / total, min(1.0, (self.offset + visible) / total))
+        else:
+            self.scrollbar.set(0.0, 1.0)
+        if self.on_render:
+            self.on_render()
+
+    def yview(self, *args):
+        """Scrollbar command: accepts moveto/scroll arguments like Treeview.yview."""
+
+        if not args:
+            return
+        if args[0] == "moveto":
+            offset = int(float(args[1]) * len(self.records))
+        elif args[0] == "scroll":
+            step = self.visible_count() if args[2] == "pages" else 1
+            offset = self.offset + int(args[1]) * step
+        else:
+            return
+        offset = self._clamp(offset)
+        if offset != self.offset:
+            self.offset = offset
+            self.render()
+
+    def on_mousewheel(self, event):
+        """Scrolls the window on wheel events; returns "break" to stop native scrolling."""
+
+        if event.num == 4:
+            units = -1
+        elif event.num == 5:
+            units = 1
+        else:
+            units = -1 if event.delta > 0 else 1
+            units *= max(1, abs(event.delta) // 120)
+        self.yview("scroll", units, "units")
+        return "break"